@@ -0,0 +1,278 @@
+import numpy as np
+from typing import Optional, Sequence
+
+from miner_core import (
+    ELEVATOR_COST, GRID_HEIGHT, GRID_WIDTH, Action, BUY_ACTIONS, MOVE_DELTAS,
+    Equipment, MineGenerator, Player, TileType, TownManager,
+)
+
+# Game state codes used in BatchMineEnv.state
+TOWN = 0
+MINE = 1
+GAME_OVER = 2
+VICTORY = 3
+
+# Equipment columns of BatchMineEnv.equipment
+EQUIPMENT_COLUMNS = {equipment: i for i, equipment in enumerate(Equipment)}
+
+# Mineral columns of BatchMineEnv.minerals, in Player.minerals order
+MINERALS = list(Player().minerals)
+
+# Per tile id mineral column it rewards (-1 for none), as in
+# Simulation._handle_tile_rewards
+_MINERAL_COLUMN = np.full(len(TileType), -1, dtype=np.int64)
+_MINERAL_COLUMN[[TileType.SILVER.value, TileType.GOLD.value,
+                 TileType.PLATINUM.value, TileType.DIAMOND.value]] = [0, 1, 2, 3]
+
+# Per tile id base dig cost, as in Simulation._calculate_dig_cost
+_BASE_DIG_COST = np.full(len(TileType), 20, dtype=np.int64)
+_BASE_DIG_COST[TileType.SANDSTONE.value] = 10
+_BASE_DIG_COST[TileType.VOLCANIC.value] = 30
+
+# Market rate ranges per mineral column, as in TownManager.sell_minerals
+_RATE_LOW = np.array([9.0, 45.0, 225.0, 1000.0])
+_RATE_HIGH = np.array([20.0, 63.0, 279.0, 1000.0])
+
+# Equipment cost per buy action id
+_EQUIPMENT_COSTS = TownManager().equipment_costs
+_BUY_COST = np.zeros(len(Action), dtype=np.int64)
+_BUY_COLUMN = np.full(len(Action), -1, dtype=np.int64)
+for _action, _equipment in BUY_ACTIONS.items():
+    _BUY_COST[_action] = _EQUIPMENT_COSTS[_equipment]
+    _BUY_COLUMN[_action] = EQUIPMENT_COLUMNS[_equipment]
+
+# Movement per action id
+_MOVE_DX = np.zeros(len(Action), dtype=np.int64)
+_MOVE_DY = np.zeros(len(Action), dtype=np.int64)
+for _action, (_dx, _dy) in MOVE_DELTAS.items():
+    _MOVE_DX[_action], _MOVE_DY[_action] = _dx, _dy
+
+# Cell offsets of the largest cave-in (5x5) and of a spring flood (3x3)
+_CAVE_DY, _CAVE_DX = (a.ravel() for a in np.mgrid[-2:3, -2:3])
+_FLOOD_DY, _FLOOD_DX = (a.ravel() for a in np.mgrid[-1:2, -1:2])
+
+class BatchMineEnv:
+    """N independent games stepped in lockstep as array operations
+
+    Holds every game's state as stacked arrays (grids are N x H x W tile
+    ids, everything else N-length or N x k) and applies one `Action` per game
+    per `step`. Hazard and reward randomness comes from one seeded NumPy
+    generator, so a whole batch is reproducible from its seed, though
+    individual games do not replay the same random draws as a `Simulation`
+    would.
+
+    The rules are a simplified `Simulation`: digging costs, rewards, town
+    actions and the win and lose checks match, but there are no ticks, so
+    spring floods stay where they land instead of flowing; only the
+    tiles a player enters are revealed, with no field of view; dynamite does
+    nothing; and cave-ins fill a plain square of dirt for 30 damage without
+    setting off volcanic tiles.
+    """
+
+    def __init__(self, n: int, seed: Optional[int] = None,
+                 width: int = GRID_WIDTH, height: int = GRID_HEIGHT):
+        self.n = n
+        self.width = width
+        self.height = height
+        self.rng = np.random.default_rng(seed)
+        self._generator = MineGenerator(width, height)
+
+        self.grids = np.zeros((n, height, width), dtype=np.uint8)
+        self.revealed = np.zeros((n, height, width), dtype=bool)
+        self.seeds = np.zeros(n, dtype=np.uint64)
+        self.money = np.zeros(n, dtype=np.int64)
+        self.health = np.zeros(n, dtype=np.int64)
+        self.max_health = Player().max_health
+        self.x = np.zeros(n, dtype=np.int64)
+        self.y = np.zeros(n, dtype=np.int64)
+        self.minerals = np.zeros((n, len(MINERALS)), dtype=np.int64)
+        self.has_ring = np.zeros(n, dtype=bool)
+        self.equipment = np.zeros((n, len(EQUIPMENT_COLUMNS)), dtype=bool)
+        self.state = np.zeros(n, dtype=np.int8)
+        self.steps = 0
+
+        self.reset()
+
+    def reset(self, games: Optional[np.ndarray] = None,
+              seeds: Optional[Sequence[int]] = None) -> None:
+        """Start fresh games, for all games or just the indices in `games`"""
+        games = np.arange(self.n) if games is None else np.asarray(games)
+        if seeds is None:
+            seeds = self.rng.integers(0, 2 ** 63, len(games), dtype=np.uint64)
+        player = Player()
+
+        self.seeds[games] = seeds
+        self.grids[games] = self._generator.generate_batch(len(games), [int(s) for s in seeds])
+        self.revealed[games] = False
+        self.money[games] = player.money
+        self.health[games] = player.health
+        self.x[games] = self.width // 2
+        self.y[games] = player.position[1]
+        self.minerals[games] = 0
+        self.has_ring[games] = False
+        self.equipment[games] = False
+        self.state[games] = TOWN
+
+    def step(self, actions: np.ndarray) -> np.ndarray:
+        """Apply one action per game; returns which games' actions had an effect"""
+        actions = np.asarray(actions, dtype=np.int64)
+        applied = np.zeros(self.n, dtype=bool)
+        self.steps += 1
+
+        town = np.flatnonzero(self.state == TOWN)
+        mine = np.flatnonzero(self.state == MINE)
+        over = np.flatnonzero(self.state >= GAME_OVER)
+
+        if len(town):
+            self._step_town(town, actions[town], applied)
+        if len(mine):
+            self._step_mine(mine, actions[mine], applied)
+        if len(over):
+            restart = over[actions[over] == Action.RESTART]
+            if len(restart):
+                self.reset(restart)
+                applied[restart] = True
+
+        self._update()
+        return applied
+
+    def _step_town(self, games: np.ndarray, actions: np.ndarray, applied: np.ndarray) -> None:
+        """Apply town actions (buy, sell, heal, saloon, enter mine)"""
+        # Buying: the price is taken whenever affordable, even for owned
+        # equipment, matching TownManager.buy_equipment
+        column = _BUY_COLUMN[actions]
+        buying = column >= 0
+        pays = buying & (self.money[games] >= _BUY_COST[actions])
+        self.money[games[pays]] -= _BUY_COST[actions[pays]]
+        new = pays & ~self.equipment[games, np.maximum(column, 0)]
+        self.equipment[games[new], column[new]] = True
+        applied[games[new]] = True
+
+        sell = games[(actions == Action.SELL) & self.minerals[games].any(axis=1)]
+        if len(sell):
+            rates = self.rng.uniform(_RATE_LOW, _RATE_HIGH, (len(sell), len(MINERALS)))
+            value = (self.minerals[sell] * rates).astype(np.int64).sum(axis=1)
+            self.money[sell] += value
+            self.minerals[sell] = 0
+            applied[sell] = value > 0
+
+        heal = games[(actions == Action.HEAL) & (self.health[games] < self.max_health)]
+        cost = (self.max_health - self.health[heal]) * 2
+        heal, cost = heal[self.money[heal] >= cost], cost[self.money[heal] >= cost]
+        self.money[heal] -= cost
+        self.health[heal] = self.max_health
+        applied[heal] = True
+
+        # Saloon audience: only heals with at least $10000
+        saloon = games[(actions == Action.SALOON) & (self.money[games] >= 10000) &
+                       (self.health[games] < self.max_health)]
+        self.health[saloon] = np.minimum(self.max_health, self.health[saloon] + 2)
+        applied[saloon] = True
+
+        enter = games[(actions == Action.ENTER_MINE) & (self.money[games] >= ELEVATOR_COST)]
+        self.money[enter] -= ELEVATOR_COST
+        self.state[enter] = MINE
+        applied[enter] = True
+
+    def _step_mine(self, games: np.ndarray, actions: np.ndarray, applied: np.ndarray) -> None:
+        """Apply mine actions (moves with digging, teleport, leave)"""
+        teleport = games[actions == Action.TELEPORT]
+        self.y[teleport] = 0
+        applied[teleport] = True
+
+        leave = games[actions == Action.LEAVE_MINE]
+        self.state[leave] = TOWN
+        applied[leave] = True
+
+        dx, dy = _MOVE_DX[actions], _MOVE_DY[actions]
+        moving = (dx != 0) | (dy != 0)
+        games, dx, dy = games[moving], dx[moving], dy[moving]
+        nx, ny = self.x[games] + dx, self.y[games] + dy
+        inside = (nx >= 0) & (nx < self.width) & (ny >= 0) & (ny < self.height)
+        games, nx, ny = games[inside], nx[inside], ny[inside]
+
+        tiles = self.grids[games, ny, nx].astype(np.int64)
+        empty = tiles == TileType.EMPTY.value
+        dug = self._dig(games[~empty], nx[~empty], ny[~empty], tiles[~empty])
+
+        moved = empty.copy()
+        moved[~empty] = dug
+        games, nx, ny = games[moved], nx[moved], ny[moved]
+        self.x[games] = nx
+        self.y[games] = ny
+        self.revealed[games, ny, nx] = True
+        applied[games] = True
+
+    def _dig(self, games: np.ndarray, x: np.ndarray, y: np.ndarray, tiles: np.ndarray) -> np.ndarray:
+        """Dig one tile per game, returning which digs succeeded"""
+        money = self.money[games]
+        granite = tiles == TileType.GRANITE.value
+        water = tiles == TileType.WATER.value
+        spring = tiles == TileType.SPRING.value
+        regular = ~(granite | water | spring)
+
+        cost = _BASE_DIG_COST[tiles]
+        shovel = self.equipment[games, EQUIPMENT_COLUMNS[Equipment.SHOVEL]]
+        pick = self.equipment[games, EQUIPMENT_COLUMNS[Equipment.PICK]]
+        cost = np.where(shovel, np.maximum(8, cost - 12), cost)
+        cost = np.where(pick, np.maximum(5, cost - 5), cost)
+        cost[granite | water] = 150
+        cost[spring] = 0
+
+        ok = money >= cost
+        ok &= ~granite | self.equipment[games, EQUIPMENT_COLUMNS[Equipment.DRILL]]
+        ok &= ~water | self.equipment[games, EQUIPMENT_COLUMNS[Equipment.BUCKET]]
+        games, x, y, tiles, cost, spring = games[ok], x[ok], y[ok], tiles[ok], cost[ok], spring[ok]
+        self.money[games] -= cost
+
+        # Springs flood the empty cells around them and hurt the player
+        flooded = games[spring]
+        if len(flooded):
+            self._fill(flooded, x[spring], y[spring], _FLOOD_DX, _FLOOD_DY,
+                       TileType.WATER.value, only=TileType.EMPTY.value)
+            self.health[flooded] = np.maximum(0, self.health[flooded] - 20)
+
+        # Rewards
+        column = _MINERAL_COLUMN[tiles]
+        rewarded = column >= 0
+        amount = np.where(tiles == TileType.DIAMOND.value, 1, self.rng.integers(1, 7, len(games)))
+        np.add.at(self.minerals, (games[rewarded], column[rewarded]), amount[rewarded])
+        self.has_ring[games[tiles == TileType.RING.value]] = True
+
+        # Random cave-ins of size 3 or 5
+        caved = self.rng.random(len(games)) < 0.05
+        if caved.any():
+            half = np.where(self.rng.random(caved.sum()) < 0.5, 1, 2)
+            within = ((np.abs(_CAVE_DX)[None, :] <= half[:, None]) &
+                      (np.abs(_CAVE_DY)[None, :] <= half[:, None]))
+            self._fill(games[caved], x[caved], y[caved], _CAVE_DX, _CAVE_DY,
+                       TileType.DIRT.value, within=within)
+            self.health[games[caved]] = np.maximum(0, self.health[games[caved]] - 30)
+
+        # Clear the tile
+        self.grids[games, y, x] = TileType.EMPTY.value
+        return ok
+
+    def _fill(self, games: np.ndarray, x: np.ndarray, y: np.ndarray,
+              offset_x: np.ndarray, offset_y: np.ndarray, tile: int,
+              only: Optional[int] = None, within: Optional[np.ndarray] = None) -> None:
+        """Set the cells at (x, y) + offsets of each game to `tile`"""
+        cx = x[:, None] + offset_x[None, :]
+        cy = y[:, None] + offset_y[None, :]
+        valid = (cx >= 0) & (cx < self.width) & (cy >= 0) & (cy < self.height)
+        if within is not None:
+            valid &= within
+        cg = np.broadcast_to(games[:, None], cx.shape)[valid]
+        cx, cy = cx[valid], cy[valid]
+        if only is not None:
+            keep = self.grids[cg, cy, cx] == only
+            cg, cx, cy = cg[keep], cx[keep], cy[keep]
+        self.grids[cg, cy, cx] = tile
+
+    def _update(self) -> None:
+        """Apply the win and lose checks to games in town"""
+        town = self.state == TOWN
+        won = town & self.has_ring & (self.money >= 20000)
+        lost = town & ~won & ((self.health <= 0) | (self.money < -100))
+        self.state[won] = VICTORY
+        self.state[lost] = GAME_OVER
@@ -0,0 +1,303 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Render without a window; must be set before pygame is imported
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+from miner_core import (
+    DYNAMITE_BLAST, LANTERN_LIGHT, TORCH_LIGHT, Action, Equipment, GameState, MineGenerator, Simulation,
+    TileType,
+)
+
+# A scenario builds its state from a seed and returns (operation, ops per call)
+Scenario = Callable[[int], Tuple[Callable[[], None], int]]
+
+@dataclass
+class BenchResult:
+    """Timing summary of one scenario"""
+    name: str
+    ops_per_sec: float
+    p50_us: float
+    p90_us: float
+    p99_us: float
+    samples: int
+
+def measure(name: str, operation: Callable[[], None], ops_per_call: int,
+            min_time: float, min_samples: int) -> BenchResult:
+    """Time repeated calls of `operation` and summarize per-op times"""
+    # Warm up caches, lazily built surfaces and the like
+    for _ in range(3):
+        operation()
+
+    samples: List[float] = []
+    started = time.perf_counter()
+    while len(samples) < min_samples or time.perf_counter() - started < min_time:
+        t0 = time.perf_counter()
+        operation()
+        samples.append((time.perf_counter() - t0) / ops_per_call)
+
+    samples.sort()
+    def percentile(q: float) -> float:
+        return samples[min(len(samples) - 1, int(q / 100 * len(samples)))] * 1e6
+
+    return BenchResult(
+        name=name,
+        ops_per_sec=len(samples) / sum(samples),
+        p50_us=percentile(50),
+        p90_us=percentile(90),
+        p99_us=percentile(99),
+        samples=len(samples),
+    )
+
+def bench_generate_mine(seed: int):
+    mine = MineGenerator()
+    seeds = iter(range(seed, seed + 10 ** 9))
+    return lambda: mine.generate_mine(next(seeds)), 1
+
+def bench_generate_batch(seed: int):
+    mine = MineGenerator()
+    batch = 1000
+    seeds = list(range(seed, seed + batch))
+    return lambda: mine.generate_batch(batch, seeds), batch
+
+def bench_cave_in(seed: int):
+    random.seed(seed)
+    mine = MineGenerator()
+    mine.generate_mine(seed)
+    positions = [(random.randrange(mine.width), random.randrange(mine.height)) for _ in range(256)]
+    def operation():
+        for x, y in positions:
+            mine.cave_in(x, y)
+    return operation, len(positions)
+
+def bench_dynamite(seed: int):
+    """Dynamite blasts with their chain reactions, on a fresh mine each round"""
+    random.seed(seed)
+    mine = MineGenerator()
+    positions = [(random.randrange(mine.width), random.randrange(mine.height)) for _ in range(256)]
+    def operation():
+        mine.generate_mine(seed)
+        for x, y in positions:
+            mine.blast(x, y, DYNAMITE_BLAST)
+    return operation, len(positions)
+
+def bench_flood_area(seed: int):
+    random.seed(seed)
+    mine = MineGenerator()
+    mine.generate_mine(seed)
+    positions = [(random.randrange(mine.width), random.randrange(mine.height)) for _ in range(256)]
+    def operation():
+        for x, y in positions:
+            mine.fill_region(x - 1, y - 1, x + 2, y + 2, TileType.EMPTY)
+            mine.flood_area(x, y)
+    return operation, len(positions)
+
+def bench_water_flow(seed: int):
+    """Ticks of water pouring from the top rows into a mine dug out everywhere"""
+    sim = Simulation(seed)
+    mine = sim.mine
+    mine.fill_region(0, 0, mine.width, mine.height, TileType.EMPTY, where=TileType.DIRT)
+    grid, revealed = mine.grid.copy(), mine.revealed.copy()
+    ticks = 20
+    def operation():
+        mine.restore(grid.copy(), revealed, mine.ring_position, mine.seed)
+        mine.fill_region(0, 0, mine.width, 10, TileType.WATER, where=TileType.EMPTY)
+        for _ in range(ticks):
+            sim.tick()
+    return operation, ticks
+
+def bench_field_of_view(seed: int):
+    """Lantern and torch light cast from every tile of a dug-out cross, uncached"""
+    sim = Simulation(seed)
+    mine = sim.mine
+    cx, cy = mine.width // 2, mine.height // 2
+    mine.fill_region(0, cy, mine.width, cy + 1, TileType.EMPTY)
+    mine.fill_region(cx, 0, cx + 1, mine.height, TileType.EMPTY)
+    positions = [(x, cy) for x in range(mine.width)] + [(cx, y) for y in range(cy - 20, cy + 20)]
+    def operation():
+        sim.fov._cache.clear()
+        for x, y in positions:
+            sim.fov.visible(x, y, LANTERN_LIGHT)
+            sim.fov.visible(x, y, TORCH_LIGHT)
+    return operation, len(positions)
+
+def bench_server_tick(seed: int):
+    """One server tick across many sessions, a tenth of them with a queued action"""
+    from server import Session
+    rng = random.Random(seed)
+    sessions = [Session(index, seed + index, None) for index in range(1000)]
+    for session in sessions:
+        session.sim.step(Action.ENTER_MINE)
+    moves = [Action.MOVE_DOWN, Action.MOVE_DOWN, Action.MOVE_LEFT, Action.MOVE_RIGHT]
+    def operation():
+        for session in sessions:
+            sim = session.sim
+            if sim.state is not GameState.MINE or sim.player.health < 50 or sim.player.money < 100:
+                sim._restart_game(sim.seed)
+                sim.step(Action.ENTER_MINE)
+            if rng.random() < 0.1:
+                session.queue({'action': rng.choice(moves)})
+            session.tick()
+    return operation, len(sessions)
+
+def bench_dig_descent(seed: int):
+    """Dig straight from the surface to the bottom, restarting at the bottom"""
+    random.seed(seed)
+    sim = Simulation(seed)
+    sim.step(Action.ENTER_MINE)
+    for equipment in (Equipment.SHOVEL, Equipment.PICK, Equipment.DRILL, Equipment.BUCKET):
+        sim.player.add_equipment(equipment)
+    def operation():
+        sim.mine.generate_mine(seed)
+        sim.player.position = (sim.mine.width // 2, 0)
+        for _ in range(sim.mine.height):
+            sim.player.money = 10 ** 9
+            sim.player.health = sim.player.max_health
+            sim._move_player(0, 1)
+    return operation, sim.mine.height
+
+def _make_game(seed: int):
+    import minerSVGA
+    random.seed(seed)
+    game = minerSVGA.Game(seed)
+    game.player.money = 10 ** 9
+    game.sim.step(Action.ENTER_MINE)
+    return game
+
+def bench_get_tile_color(seed: int):
+    game = _make_game(seed)
+    tiles = list(TileType) * 8
+    color = game.renderer._get_tile_color
+    def operation():
+        for tile_type in tiles:
+            color(tile_type, False)
+            color(tile_type, True)
+    return operation, 2 * len(tiles)
+
+def bench_render_mine(seed: int):
+    game = _make_game(seed)
+    def operation():
+        game.renderer.render_mine(game.player, game.mine)
+    return operation, 1
+
+def bench_render_mine_rebuild(seed: int):
+    """render_mine with the atlas rebuilt every time, as after a new mine"""
+    game = _make_game(seed)
+    def operation():
+        game.renderer._atlas_key = None
+        game.renderer.render_mine(game.player, game.mine)
+    return operation, 1
+
+def bench_full_frame(seed: int):
+    """One handle_input/update/render/present cycle with a key press per frame"""
+    import pygame
+    game = _make_game(seed)
+    rng = random.Random(seed)
+    keys = [pygame.K_DOWN, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP]
+    def operation():
+        game.player.money = 10 ** 9
+        game.player.health = game.player.max_health
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=rng.choice(keys)))
+        game.handle_input()
+        game.update()
+        game.render()
+        game.renderer.present()
+    return operation, 1
+
+def bench_idle_frame(seed: int):
+    """One frame with no input, as while the player stands still"""
+    game = _make_game(seed)
+    def operation():
+        game.handle_input()
+        game.update()
+        game.render()
+        game.renderer.present()
+    return operation, 1
+
+SCENARIOS: Dict[str, Scenario] = {
+    'generate_mine': bench_generate_mine,
+    'generate_batch': bench_generate_batch,
+    'cave_in': bench_cave_in,
+    'dynamite': bench_dynamite,
+    'flood_area': bench_flood_area,
+    'water_flow': bench_water_flow,
+    'field_of_view': bench_field_of_view,
+    'server_tick': bench_server_tick,
+    'dig_descent': bench_dig_descent,
+    'get_tile_color': bench_get_tile_color,
+    'render_mine': bench_render_mine,
+    'render_mine_rebuild': bench_render_mine_rebuild,
+    'full_frame': bench_full_frame,
+    'idle_frame': bench_idle_frame,
+}
+
+def compare(results: List[BenchResult], baseline: dict, tolerance: float) -> List[str]:
+    """Return a message for every scenario slower than baseline by more than `tolerance`"""
+    regressions = []
+    for result in results:
+        base = baseline.get('results', {}).get(result.name)
+        if not base:
+            continue
+        change = result.p50_us / base['p50_us'] - 1
+        marker = 'REGRESSION' if change > tolerance else 'ok'
+        print(f"  {result.name:<22} p50 {base['p50_us']:>10.2f}us -> {result.p50_us:>10.2f}us "
+              f"({change:+.1%}) {marker}")
+        if change > tolerance:
+            regressions.append(f"{result.name}: p50 {change:+.1%}")
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark generation, digging and rendering hot paths")
+    parser.add_argument('scenarios', nargs='*', help="scenarios to run (default: all): %s" % ', '.join(SCENARIOS))
+    parser.add_argument('--seed', type=int, default=1234, help="seed for every scenario")
+    parser.add_argument('--min-time', type=float, default=1.0, help="seconds to sample each scenario")
+    parser.add_argument('--min-samples', type=int, default=20, help="minimum samples per scenario")
+    parser.add_argument('--baseline', help="baseline JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="allowed p50 slowdown against the baseline before failing")
+    parser.add_argument('--save', help="write results as a baseline JSON")
+    args = parser.parse_args(argv)
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    results = []
+    print(f"{'scenario':<22} {'ops/sec':>12} {'p50 us':>10} {'p90 us':>10} {'p99 us':>10} {'samples':>8}")
+    for name in names:
+        operation, ops_per_call = SCENARIOS[name](args.seed)
+        result = measure(name, operation, ops_per_call, args.min_time, args.min_samples)
+        results.append(result)
+        print(f"{name:<22} {result.ops_per_sec:>12.1f} {result.p50_us:>10.2f} {result.p90_us:>10.2f} "
+              f"{result.p99_us:>10.2f} {result.samples:>8}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'seed': args.seed,
+                'results': {result.name: asdict(result) for result in results},
+            }, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\nAgainst {args.baseline}:")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): " + '; '.join(regressions))
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+import os
+import random
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+from miner_core import GRID_HEIGHT, GRID_WIDTH, TILE_TYPES, MineGenerator, TileType, seeded_uniforms
+
+# Rows per chunk, and the default depth of a chunked mine
+CHUNK_HEIGHT = 64
+DEEP_MINE_HEIGHT = 100000
+
+# Spreads chunk indices across the seed space before hashing
+CHUNK_SEED_STRIDE = 0xD1B54A32D192ED03
+
+class WholeMineError(TypeError):
+    """Raised for operations that need a whole-mine grid, which a ChunkedMine does not keep"""
+
+@dataclass
+class MineChunk:
+    """Tiles and fog for rows [index * CHUNK_HEIGHT, (index + 1) * CHUNK_HEIGHT)"""
+    grid: np.ndarray
+    revealed: np.ndarray
+    modified: bool = False
+
+class ChunkedMine(MineGenerator):
+    """A mine generated in fixed-height chunks as they are first touched
+
+    Each chunk is generated from (seed, chunk index) alone, so any chunk can
+    be dropped and regenerated identically. At most `max_chunks` chunks stay
+    in memory: the least recently used unmodified chunk is evicted first.
+    Modified chunks (dug or revealed) are spilled to `spill_dir` when one is
+    given and kept in memory otherwise. Startup cost and memory use do not
+    depend on the mine's height.
+
+    Veins are cut off at chunk boundaries. There is no whole-mine `grid` or
+    `revealed` array; use the region accessors instead.
+    """
+
+    def __init__(self, width: int = GRID_WIDTH, height: int = DEEP_MINE_HEIGHT,
+                 ring_depth: int = GRID_HEIGHT, max_chunks: int = 32,
+                 spill_dir: Optional[str] = None):
+        self.width = width
+        self.height = height
+        self.ring_depth = min(ring_depth, height)
+        self.max_chunks = max_chunks
+        self.spill_dir = spill_dir
+        self.tile_data = self._create_tile_data()
+        self.ring_position = (0, 0)
+        self.seed: Optional[int] = None
+        self._listeners = []
+        self._chunks: 'OrderedDict[int, MineChunk]' = OrderedDict()
+        self._spilled: Dict[int, str] = {}
+
+    @property
+    def loaded_chunks(self) -> int:
+        """Number of chunks currently in memory"""
+        return len(self._chunks)
+
+    def generate_mine(self, seed: Optional[int] = None) -> None:
+        """Start a new mine; chunks are generated later, when first touched"""
+        if seed is None:
+            seed = random.getrandbits(63)
+        self.seed = seed
+        self._chunks.clear()
+        self._discard_spilled()
+
+        # Ring rows follow the fixed-size mine: [50, ring_depth)
+        ring_top = min(50, self.ring_depth - 1)
+        ring_x, ring_y = seeded_uniforms([seed], 2)[0]
+        self.ring_position = (int(ring_x * self.width), ring_top + int(ring_y * (self.ring_depth - ring_top)))
+        self._notify(0, 0, self.width, self.height)
+
+    def restore(self, grid: np.ndarray, revealed: np.ndarray, ring_position: Tuple[int, int],
+                seed: Optional[int] = None) -> None:
+        """Not supported: saves hold a whole-mine grid"""
+        raise WholeMineError("Chunked mines cannot be restored from a save; load it into a MineGenerator")
+
+    def generate_batch(self, n, seeds=None) -> np.ndarray:
+        """Not supported: use MineGenerator.generate_batch for batches of whole mines"""
+        raise WholeMineError("Chunked mines are generated chunk by chunk; use MineGenerator.generate_batch")
+
+    def tile_mask(self, tile_type: TileType) -> np.ndarray:
+        """Not supported: a whole-mine mask would generate every chunk"""
+        raise WholeMineError("Chunked mines have no whole-mine grid; use get_region on the rows needed")
+
+    def modified_chunks(self) -> Iterator[Tuple[int, MineChunk]]:
+        """Yield (index, chunk) for every chunk dug or revealed since generation, in index order
+
+        Every other chunk is exactly as its seed generates it. Spilled chunks
+        are read without being loaded back.
+        """
+        modified = {index for index, chunk in self._chunks.items() if chunk.modified}
+        for index in sorted(modified | set(self._spilled)):
+            chunk = self._chunks.get(index)
+            yield index, chunk if chunk is not None else self._read_chunk(self._spilled[index])
+
+    def close(self) -> None:
+        """Delete spilled chunk files"""
+        self._discard_spilled()
+
+    def _chunk(self, index: int) -> MineChunk:
+        """Return a chunk, loading or generating it if needed"""
+        chunk = self._chunks.get(index)
+        if chunk is not None:
+            self._chunks.move_to_end(index)
+            return chunk
+
+        path = self._spilled.pop(index, None)
+        if path is not None:
+            chunk = self._read_chunk(path)
+        else:
+            chunk = self._generate_chunk(index)
+        self._chunks[index] = chunk
+        self._evict()
+        return chunk
+
+    def _chunk_seed(self, index: int) -> int:
+        return (self.seed + (index + 1) * CHUNK_SEED_STRIDE) % (1 << 64)
+
+    def _generate_chunk(self, index: int) -> MineChunk:
+        """Generate a chunk from the mine seed and its index"""
+        grid = self._generate_grids([self._chunk_seed(index)], CHUNK_HEIGHT, place_ring=False)[0][0]
+        ring_x, ring_y = self.ring_position
+        if ring_y // CHUNK_HEIGHT == index:
+            grid[ring_y % CHUNK_HEIGHT, ring_x] = TileType.RING.value
+        return MineChunk(grid, np.zeros((CHUNK_HEIGHT, self.width), dtype=bool))
+
+    def _evict(self) -> None:
+        """Drop or spill least recently used chunks until within the budget"""
+        excess = len(self._chunks) - self.max_chunks
+        if excess <= 0:
+            return
+        for index in list(self._chunks)[:-1]:
+            chunk = self._chunks[index]
+            if chunk.modified:
+                if self.spill_dir is None:
+                    continue
+                self._spilled[index] = self._write_chunk(index, chunk)
+            del self._chunks[index]
+            excess -= 1
+            if not excess:
+                return
+
+    def _write_chunk(self, index: int, chunk: MineChunk) -> str:
+        path = os.path.join(self.spill_dir, f"chunk_{self.seed}_{index}.bin")
+        with open(path, 'wb') as f:
+            f.write(chunk.grid.tobytes())
+            f.write(np.packbits(chunk.revealed, axis=None).tobytes())
+        return path
+
+    def _read_chunk(self, path: str) -> MineChunk:
+        data = np.fromfile(path, dtype=np.uint8)
+        cells = CHUNK_HEIGHT * self.width
+        grid = data[:cells].reshape(CHUNK_HEIGHT, self.width)
+        revealed = np.unpackbits(data[cells:], count=cells).reshape(CHUNK_HEIGHT, self.width).astype(bool)
+        return MineChunk(grid, revealed, modified=True)
+
+    def _discard_spilled(self) -> None:
+        for path in self._spilled.values():
+            if os.path.exists(path):
+                os.remove(path)
+        self._spilled.clear()
+
+    def get_tile(self, x: int, y: int) -> TileType:
+        """Get tile at position"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return TILE_TYPES[self._chunk(y // CHUNK_HEIGHT).grid.item(y % CHUNK_HEIGHT, x)]
+        return TileType.DIRT
+
+    def get_tile_id(self, x: int, y: int) -> int:
+        """Get the raw tile id at position (DIRT outside the grid, as in MineGenerator)"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self._chunk(y // CHUNK_HEIGHT).grid.item(y % CHUNK_HEIGHT, x)
+        return TileType.DIRT.value
+
+    def set_tile(self, x: int, y: int, tile_type: TileType) -> None:
+        """Set tile at position"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            chunk = self._chunk(y // CHUNK_HEIGHT)
+            if chunk.grid.item(y % CHUNK_HEIGHT, x) != tile_type.value:
+                chunk.grid[y % CHUNK_HEIGHT, x] = tile_type.value
+                chunk.modified = True
+                self._notify(x, y, x + 1, y + 1)
+
+    def reveal_tile(self, x: int, y: int) -> None:
+        """Reveal tile at position"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            chunk = self._chunk(y // CHUNK_HEIGHT)
+            if not chunk.revealed.item(y % CHUNK_HEIGHT, x):
+                chunk.revealed[y % CHUNK_HEIGHT, x] = True
+                chunk.modified = True
+                self._notify(x, y, x + 1, y + 1)
+
+    def is_revealed(self, x: int, y: int) -> bool:
+        """Check if tile is revealed"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self._chunk(y // CHUNK_HEIGHT).revealed.item(y % CHUNK_HEIGHT, x)
+        return False
+
+    def _chunk_spans(self, y0: int, y1: int):
+        """Yield (chunk, row0, row1, y) covering rows [y0, y1), y being the first row's mine row"""
+        y = y0
+        while y < y1:
+            index = y // CHUNK_HEIGHT
+            row0 = y - index * CHUNK_HEIGHT
+            row1 = min(CHUNK_HEIGHT, y1 - index * CHUNK_HEIGHT)
+            yield self._chunk(index), row0, row1, y
+            y += row1 - row0
+
+    def _gather(self, x0: int, y0: int, x1: int, y1: int, field: str) -> np.ndarray:
+        x0, y0, x1, y1 = self.clip_region(x0, y0, x1, y1)
+        parts = [getattr(chunk, field)[row0:row1, x0:x1] for chunk, row0, row1, _ in self._chunk_spans(y0, y1)]
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            dtype = np.uint8 if field == 'grid' else bool
+            return np.empty((0, max(0, x1 - x0)), dtype=dtype)
+        return np.concatenate(parts)
+
+    def get_rows(self, y0: int, y1: int) -> np.ndarray:
+        """Get the tile ids in rows [y0, y1); a view only when they share a chunk"""
+        return self._gather(0, y0, self.width, y1, 'grid')
+
+    def get_region(self, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+        """Get the tile ids in a rectangle; a view only when it lies in one chunk"""
+        return self._gather(x0, y0, x1, y1, 'grid')
+
+    def get_revealed_region(self, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+        """Get the revealed mask in a rectangle; a view only when it lies in one chunk"""
+        return self._gather(x0, y0, x1, y1, 'revealed')
+
+    def fill_region(self, x0: int, y0: int, x1: int, y1: int, tile_type: TileType,
+                    where: Optional[TileType] = None) -> None:
+        """Fill a rectangle with a tile type, optionally only over tiles of type `where`"""
+        x0, y0, x1, y1 = self.clip_region(x0, y0, x1, y1)
+        for chunk, row0, row1, _ in self._chunk_spans(y0, y1):
+            region = chunk.grid[row0:row1, x0:x1]
+            if where is None:
+                region[...] = tile_type.value
+            else:
+                region[region == where.value] = tile_type.value
+            chunk.modified = True
+        self._notify(x0, y0, x1, y1)
+
+    def set_region(self, x0: int, y0: int, tiles: np.ndarray, reveal: Optional[np.ndarray] = None) -> None:
+        """Write a block of tile ids with its top-left corner at (x0, y0), notifying listeners once
+
+        Tiles where the optional `reveal` mask is set are revealed as well.
+        """
+        height, width = tiles.shape
+        for chunk, row0, row1, y in self._chunk_spans(y0, y0 + height):
+            chunk.grid[row0:row1, x0:x0 + width] = tiles[y - y0:y - y0 + row1 - row0]
+            if reveal is not None:
+                chunk.revealed[row0:row1, x0:x0 + width] |= reveal[y - y0:y - y0 + row1 - row0]
+            chunk.modified = True
+        self._notify(x0, y0, x0 + width, y0 + height)
+
+    def reveal_region(self, x0: int, y0: int, x1: int, y1: int,
+                      mask: Optional[np.ndarray] = None) -> None:
+        """Reveal a rectangle, optionally only where `mask` is set"""
+        x0, y0, x1, y1 = self.clip_region(x0, y0, x1, y1)
+        for chunk, row0, row1, y in self._chunk_spans(y0, y1):
+            region = chunk.revealed[row0:row1, x0:x1]
+            if mask is None:
+                region[...] = True
+            else:
+                region |= mask[y - y0:y - y0 + row1 - row0]
+            chunk.modified = True
+        self._notify(x0, y0, x1, y1)
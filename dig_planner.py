@@ -0,0 +1,338 @@
+import heapq
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from miner_core import TILE_TYPES, Action, Equipment, Simulation, TileType
+
+# Every move costs this on top of the money it takes, so among equally
+# priced routes the shortest wins and distance is an admissible heuristic
+STEP_COST = 1
+
+# A spring does 20 damage, priced as healing it back at the hospital
+SPRING_COST = 20 * 2
+
+# Costs of digging through granite and water, from Simulation._dig_tile
+GRANITE_COST = 150
+WATER_COST = 150
+
+INF = math.inf
+
+# Stands in for INF in the vectorized solve, where INF - INF would give NaN;
+# far above any real route cost
+BLOCKED = 1e12
+
+# Moves between neighbouring tiles as (dx, dy, action)
+MOVES = [(-1, 0, Action.MOVE_LEFT), (1, 0, Action.MOVE_RIGHT),
+         (0, -1, Action.MOVE_UP), (0, 1, Action.MOVE_DOWN)]
+
+class DigPlanner:
+    """Cheapest digging route from the player to a target tile, kept current with D* Lite
+
+    Entering a tile costs what `Simulation._dig_tile` would charge with the
+    player's equipment (granite and water are impassable without drill and
+    bucket), plus STEP_COST. The search runs backward from the target, so
+    when the player moves or tiles change (cave-ins, floods, digging) only
+    the affected part of the search is repaired on the next query instead
+    of replanning from scratch. Buying equipment changes every cost and
+    starts a new search.
+
+    Needs a mine with a whole-mine `grid`, not a ChunkedMine.
+    """
+
+    def __init__(self, sim: Simulation):
+        self.sim = sim
+        self.mine = sim.mine
+        self.target: Optional[Tuple[int, int]] = None
+        # Why the last walk gave up before reaching its target, if it did
+        self.stopped: Optional[str] = None
+        self._width = self.mine.width
+        self._neighbors: List[List[int]] = []
+        self._costs: List[float] = []
+        self._cost_table: List[float] = []
+        self._equipment: Optional[tuple] = None
+        self._g: List[float] = []
+        self._rhs: List[float] = []
+        self._queued: List[Optional[tuple]] = []
+        self._queue: List[tuple] = []
+        self._km = 0
+        self._last_start = 0
+        self._pending: List[Tuple[int, int, int, int]] = []
+        self.mine.add_listener(self._on_change)
+
+    def close(self) -> None:
+        """Stop following the mine"""
+        self.mine.remove_listener(self._on_change)
+
+    def set_target(self, target: Optional[Tuple[int, int]]) -> None:
+        """Plan toward a new target tile, or stop planning with None"""
+        if target is not None and not self.mine.in_bounds(*target):
+            target = None
+        if target is not None:
+            self.stopped = None
+        if target != self.target:
+            self.target = target
+            self._equipment = None  # Start a fresh search on the next query
+
+    def stop(self, reason: str) -> None:
+        """Give up on the target, keeping `reason` in `stopped`"""
+        self.target = None
+        self.stopped = reason
+
+    def path(self) -> Optional[List[Tuple[int, int]]]:
+        """Tiles from the player (exclusive) to the target, or None if unreachable"""
+        if not self._update():
+            return None
+        start, goal = self._index(self.sim.player.position), self._index(self.target)
+        tiles = []
+        node = start
+        while node != goal:
+            node = self._best_successor(node)
+            if node is None or len(tiles) > len(self._g):
+                return None
+            tiles.append(divmod(node, self._width)[::-1])
+        return tiles
+
+    def cost(self) -> float:
+        """Planned cost from the player to the target (INF if unreachable)"""
+        if not self._update():
+            return INF
+        return self._rhs[self._index(self.sim.player.position)]
+
+    def next_action(self) -> Optional[Action]:
+        """The move toward the target, or None once there or if it cannot be reached or paid for
+
+        Why it cannot is kept in `stopped`.
+        """
+        if not self._update():
+            return None
+        start = self._index(self.sim.player.position)
+        if start == self._index(self.target):
+            return None
+        node = self._best_successor(start)
+        if node is None:
+            self.stopped = "no route"
+            return None
+        if self.sim.player.money < self._dig_cost(node):
+            self.stopped = "no money"
+            return None
+        for dx, dy, action in MOVES:
+            if node == start + dy * self._width + dx:
+                return action
+        return None
+
+    def step(self) -> bool:
+        """Take one step toward the target through the simulation, giving up on it if the step fails"""
+        action = self.next_action()
+        if action is None:
+            self.target = None
+            return False
+        position = self.sim.player.position
+        self.sim.step(action)
+        if self.sim.player.position == position:
+            self.stop("blocked")
+            return False
+        return True
+
+    def _index(self, position: Tuple[int, int]) -> int:
+        return position[1] * self._width + position[0]
+
+    def _heuristic(self, a: int, b: int) -> int:
+        ay, ax = divmod(a, self._width)
+        by, bx = divmod(b, self._width)
+        return (abs(ax - bx) + abs(ay - by)) * STEP_COST
+
+    def _dig_cost(self, node: int) -> float:
+        """Money it takes to enter a tile, leaving out the health a spring costs"""
+        y, x = divmod(node, self._width)
+        tile_id = self.mine.get_tile_id(x, y)
+        if tile_id in (TileType.EMPTY.value, TileType.SPRING.value):
+            return 0
+        return self._cost_table[tile_id] - STEP_COST
+
+    def _tile_costs(self) -> List[float]:
+        """Cost of entering each tile type with the player's current equipment"""
+        player = self.sim.player
+        costs = []
+        for tile_type in TILE_TYPES:
+            if tile_type == TileType.EMPTY:
+                cost = 0
+            elif tile_type == TileType.GRANITE:
+                cost = GRANITE_COST if player.has_equipment(Equipment.DRILL) else INF
+            elif tile_type == TileType.WATER:
+                cost = WATER_COST if player.has_equipment(Equipment.BUCKET) else INF
+            elif tile_type == TileType.SPRING:
+                cost = SPRING_COST
+            else:
+                cost = self.sim._calculate_dig_cost(tile_type)
+            costs.append(cost + STEP_COST)
+        return costs
+
+    def _update(self) -> bool:
+        """Bring the search up to date; False when there is nothing to plan"""
+        if self.target is None:
+            return False
+        if self.mine is not self.sim.mine:
+            self.close()
+            self.mine = self.sim.mine
+            self.mine.add_listener(self._on_change)
+            self._equipment = None
+        if not self.mine.in_bounds(*self.sim.player.position):
+            return False
+
+        equipment = tuple(sorted(item.value for item, owned in self.sim.player.inventory.items() if owned))
+        start = self._index(self.sim.player.position)
+        if equipment != self._equipment or len(self._costs) != self.mine.grid.size:
+            self._equipment = equipment
+            self._initialize()
+        else:
+            if start != self._last_start:
+                self._km += self._heuristic(self._last_start, start)
+                self._last_start = start
+            if self._pending:
+                self._apply_changes()
+        self._compute_shortest_path(start)
+        return True
+
+    def _initialize(self) -> None:
+        """Start a new search toward the target"""
+        height, width = self.mine.grid.shape
+        self._width = width
+        size = width * height
+        if len(self._neighbors) != size:
+            self._neighbors = [
+                [(y + dy) * width + x + dx for dx, dy, _ in MOVES if 0 <= x + dx < width and 0 <= y + dy < height]
+                for y in range(height) for x in range(width)
+            ]
+        self._cost_table = self._tile_costs()
+        costs = np.asarray(self._cost_table)[self.mine.grid]
+        self._costs = costs.ravel().tolist()
+
+        # Solve every tile's cost to the target at once; the result is a
+        # consistent D* Lite state with nothing left to expand
+        g = self._solve(costs, self.target)
+        self._g = g.ravel().tolist()
+        self._rhs = list(self._g)
+        self._queued = [None] * size
+        self._queue = []
+        self._km = 0
+        self._last_start = self._index(self.sim.player.position)
+        self._pending.clear()
+
+    @staticmethod
+    def _solve(costs: np.ndarray, target: Tuple[int, int]) -> np.ndarray:
+        """Cost to reach `target` from every tile, given the cost of entering each tile
+
+        Sweeps rows and columns in both directions until nothing improves. A
+        sweep relaxes whole straight runs at once: moving right from x to k
+        costs C[k] - C[x] for inclusive prefix sums C, so the best over all k
+        is a running minimum of g + C. Routes need about one round per turn.
+        """
+        costs = np.where(np.isinf(costs), BLOCKED, costs)
+        g = np.full(costs.shape, np.inf)
+        g[target[1], target[0]] = 0
+        while True:
+            previous = g
+            for axis in (1, 0):
+                inclusive = np.cumsum(costs, axis=axis)
+                exclusive = inclusive - costs
+                ahead = np.flip(np.minimum.accumulate(np.flip(g + inclusive, axis), axis=axis), axis) - inclusive
+                behind = exclusive + np.minimum.accumulate(g - exclusive, axis=axis)
+                g = np.minimum(g, np.minimum(ahead, behind))
+            if np.array_equal(g, previous):
+                break
+        g[g >= BLOCKED] = np.inf
+        return g
+
+    def _on_change(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        """Queue a changed region; costs are refreshed at the next query"""
+        if (x1 - x0) * (y1 - y0) >= len(self._costs):
+            self._equipment = None  # A new mine: start over
+        elif self._equipment is not None:
+            self._pending.append((x0, y0, x1, y1))
+
+    def _apply_changes(self) -> None:
+        """Update edge costs for changed tiles and the vertices that lead into them"""
+        width, table, costs = self._width, self._cost_table, self._costs
+        g, rhs, goal = self._g, self._rhs, self._index(self.target)
+        for x0, y0, x1, y1 in self._pending:
+            region = self.mine.grid[y0:y1, x0:x1]
+            for dy, row in enumerate(region.tolist()):
+                base = (y0 + dy) * width + x0
+                for dx, tile_id in enumerate(row):
+                    v = base + dx
+                    old, new = costs[v], table[tile_id]
+                    if old == new:
+                        continue
+                    costs[v] = new
+                    for u in self._neighbors[v]:
+                        if u == goal:
+                            continue
+                        if new < old:
+                            rhs[u] = min(rhs[u], new + g[v])
+                        elif rhs[u] == old + g[v]:
+                            rhs[u] = self._min_successor(u)
+                        self._update_vertex(u)
+        self._pending.clear()
+
+    def _key(self, node: int) -> tuple:
+        k = min(self._g[node], self._rhs[node])
+        return (k + self._heuristic(self._last_start, node) + self._km, k)
+
+    def _push(self, node: int, key: tuple) -> None:
+        self._queued[node] = key
+        heapq.heappush(self._queue, (key, node))
+
+    def _update_vertex(self, node: int) -> None:
+        if self._g[node] != self._rhs[node]:
+            self._push(node, self._key(node))
+        else:
+            self._queued[node] = None
+
+    def _min_successor(self, node: int) -> float:
+        costs, g = self._costs, self._g
+        return min(costs[s] + g[s] for s in self._neighbors[node])
+
+    def _best_successor(self, node: int) -> Optional[int]:
+        costs, g = self._costs, self._g
+        best, best_cost = None, INF
+        for s in self._neighbors[node]:
+            cost = costs[s] + g[s]
+            if cost < best_cost:
+                best, best_cost = s, cost
+        return best
+
+    def _compute_shortest_path(self, start: int) -> None:
+        queue, queued, g, rhs, costs = self._queue, self._queued, self._g, self._rhs, self._costs
+        neighbors, goal = self._neighbors, self._index(self.target)
+        while queue:
+            key, u = queue[0]
+            if queued[u] != key:
+                heapq.heappop(queue)  # Superseded or removed entry
+                continue
+            if key >= self._key(start) and rhs[start] <= g[start]:
+                break
+
+            new_key = self._key(u)
+            if key < new_key:
+                heapq.heappop(queue)
+                self._push(u, new_key)
+            elif g[u] > rhs[u]:
+                heapq.heappop(queue)
+                queued[u] = None
+                g[u] = rhs[u]
+                cost = costs[u] + g[u]
+                for s in neighbors[u]:
+                    if s != goal and cost < rhs[s]:
+                        rhs[s] = cost
+                        self._update_vertex(s)
+            else:
+                g_old = g[u]
+                g[u] = INF
+                cost_old = costs[u] + g_old
+                for s in neighbors[u]:
+                    if s != goal and rhs[s] == cost_old:
+                        rhs[s] = self._min_successor(s)
+                    self._update_vertex(s)
+                self._update_vertex(u)
@@ -0,0 +1,125 @@
+import argparse
+import asyncio
+import base64
+import json
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from miner_core import BUY_ACTIONS, Action
+
+# Actions the simulated players pick from: mostly digging, with trips to town
+MINE_ACTIONS = [Action.MOVE_DOWN] * 4 + [Action.MOVE_LEFT, Action.MOVE_RIGHT, Action.MOVE_UP] * 2 + \
+               [Action.DYNAMITE, Action.LEAVE_MINE]
+TOWN_ACTIONS = [Action.ENTER_MINE] * 4 + [Action.SELL, Action.HEAL] + list(BUY_ACTIONS)
+
+@dataclass
+class ClientStats:
+    """What one simulated player sent, received and waited for"""
+    actions: int = 0
+    messages: int = 0
+    received_bytes: int = 0
+    tile_changes: int = 0
+    snapshots: int = 0
+    latencies: List[float] = field(default_factory=list)
+
+async def play(host: str, port: int, duration: float, rate: float, seed: int, stats: ClientStats) -> None:
+    """Connect as one player and send random actions at `rate` per second, tracking the mine it is sent"""
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+    sent: Dict[int, float] = {}
+    tiles: Optional[np.ndarray] = None
+    state = 'town'
+
+    async def receive() -> None:
+        nonlocal tiles, state
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            now = time.perf_counter()
+            message = json.loads(line)
+            stats.messages += 1
+            stats.received_bytes += len(line)
+            if message['type'] in ('welcome', 'snapshot'):
+                tiles = np.frombuffer(base64.b64decode(message['tiles']), dtype=np.uint8).copy()
+                stats.snapshots += 1
+            changes = message.get('tiles')
+            if isinstance(changes, list):
+                tiles[changes[0::2]] = changes[1::2]
+                stats.tile_changes += len(changes) // 2
+            if 'status' in message:
+                state = message['status']['state']
+            if 'ack' in message:
+                stats.latencies.append(now - sent.pop(message['ack'], now))
+
+    receiver = asyncio.ensure_future(receive())
+    ended = time.perf_counter() + duration
+    seq = 0
+    try:
+        await asyncio.sleep(rng.random() / rate)
+        while time.perf_counter() < ended and not receiver.done():
+            action = rng.choice(MINE_ACTIONS if state == 'mine' else TOWN_ACTIONS)
+            if state in ('game_over', 'victory'):
+                action = Action.RESTART
+            seq += 1
+            sent[seq] = time.perf_counter()
+            writer.write(json.dumps({'action': action.name, 'seq': seq}).encode() + b'\n')
+            stats.actions += 1
+            await asyncio.sleep(rng.expovariate(rate))
+    finally:
+        receiver.cancel()
+        writer.close()
+
+def percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))] if values else float('nan')
+
+async def run(host: str, port: int, sessions: int, duration: float, rate: float, seed: int,
+              ramp: float) -> List[ClientStats]:
+    """Play `sessions` players at once, connecting them over `ramp` seconds"""
+    stats = [ClientStats() for _ in range(sessions)]
+
+    async def start(index: int) -> None:
+        await asyncio.sleep(ramp * index / sessions)
+        await play(host, port, duration, rate, seed + index, stats[index])
+
+    results = await asyncio.gather(*(start(index) for index in range(sessions)), return_exceptions=True)
+    failed = [result for result in results if isinstance(result, Exception)]
+    if failed:
+        print(f"{len(failed)} players failed, first: {failed[0]!r}")
+    return stats
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load a game server with many simulated players")
+    parser.add_argument('--host', default='127.0.0.1', help="server address")
+    parser.add_argument('--port', type=int, default=8765, help="server port")
+    parser.add_argument('--sessions', type=int, default=1000, help="players connected at once")
+    parser.add_argument('--duration', type=float, default=30.0, help="seconds each player plays")
+    parser.add_argument('--rate', type=float, default=2.0, help="actions per second per player")
+    parser.add_argument('--ramp', type=float, default=5.0, help="seconds over which players connect")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the players' choices")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    stats = asyncio.run(run(args.host, args.port, args.sessions, args.duration, args.rate, args.seed, args.ramp))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for client in stats for latency in client.latencies]
+    actions = sum(client.actions for client in stats)
+    received = sum(client.received_bytes for client in stats)
+    print(f"{args.sessions} players for {elapsed:.1f}s: {actions:,} actions ({actions / elapsed:,.0f}/s), "
+          f"{sum(client.messages for client in stats):,} messages, {received / elapsed / 1024:,.0f} KiB/s received "
+          f"({received / max(1, actions):,.0f} bytes per action), "
+          f"{sum(client.tile_changes for client in stats):,} tile changes, "
+          f"{sum(client.snapshots for client in stats):,} snapshots")
+    print(f"action to update latency: p50 {percentile(latencies, 50) * 1e3:.1f}ms "
+          f"p90 {percentile(latencies, 90) * 1e3:.1f}ms p99 {percentile(latencies, 99) * 1e3:.1f}ms")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,390 +1,190 @@
+import time
+IMPORT_STARTED = time.perf_counter()  # Start of the startup timings (--measure-startup)
+
+import argparse
 import pygame
-import random
+import numpy as np
 import sys
-from enum import Enum
-from dataclasses import dataclass
 from typing import Dict, List, Tuple, Optional
-import json
 import os
+from collections import OrderedDict
+
+# Equipment is not used here but stays importable from this module
+from miner_core import (
+    TICK_RATE, TILE_TYPES, TILE_COLORS, TILE_PALETTE,
+    Action, Colors, Equipment, GameState, MineGenerator, Player,
+    Simulation, TileType, TownManager,
+)
+from chunked_mine import ChunkedMine
+from dig_planner import DigPlanner
+from profiler import FrameProfiler
+from replay import InputRecorder, save_recording
+from savegame import SaveFormatError, load_game, restore_simulation, save_game
+from shared_state import StatePublisher
+from telemetry import TelemetryRecorder
 
 # Constants
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 TILE_SIZE = 16
-GRID_WIDTH = 39
-GRID_HEIGHT = 114
 TOWN_HEIGHT = 50
 FPS = 60
+VISIBLE_ROWS = (SCREEN_HEIGHT - TOWN_HEIGHT) // TILE_SIZE
+VIEWPORT_HEIGHT = (VISIBLE_ROWS + 1) * TILE_SIZE
+ATLAS_MAX_ROWS = 512
+SAVE_PATH = 'minerSVGA.sav'
 
-# Colors
-class Colors:
-    DIRT = (139, 69, 19)
-    EMPTY = (0, 0, 0)
-    SILVER = (192, 192, 192)
-    GOLD = (255, 215, 0)
-    PLATINUM = (229, 228, 226)
-    DIAMOND = (0, 255, 255)
-    GRANITE = (128, 128, 128)
-    WATER = (0, 0, 255)
-    SPRING = (0, 255, 0)
-    SANDSTONE = (244, 164, 96)
-    VOLCANIC = (255, 0, 0)
-    CLOVER = (0, 128, 0)
-    PUMP = (128, 0, 128)
-    RING = (255, 255, 0)
-    PLAYER = (255, 255, 255)
-    TOWN_BG = (100, 100, 100)
-    WHITE = (255, 255, 255)
-    BLACK = (0, 0, 0)
-    RED = (255, 0, 0)
-    GREEN = (0, 255, 0)
-    YELLOW = (255, 255, 0)
-    GRAY = (100, 100, 100)
+# Ticks between steps while auto-digging toward a clicked tile
+AUTO_DIG_INTERVAL = 1
 
-# Tile types
-class TileType(Enum):
-    DIRT = 0
-    EMPTY = 1
-    SILVER = 2
-    GOLD = 3
-    PLATINUM = 4
-    DIAMOND = 5
-    GRANITE = 6
-    WATER = 7
-    SPRING = 8
-    SANDSTONE = 9
-    VOLCANIC = 10
-    CLOVER = 11
-    PUMP = 12
-    RING = 13
+# Most simulation ticks run before drawing a frame; beyond this a stalled
+# game drops time rather than freezing to catch up
+MAX_TICKS_PER_FRAME = 25
 
-# Equipment
-class Equipment(Enum):
-    SHOVEL = 'shovel'
-    PICK = 'pick'
-    DRILL = 'drill'
-    LANTERN = 'lantern'
-    BUCKET = 'bucket'
-    DYNAMITE = 'dynamite'
-    TORCH = 'torch'
+# Longest wait for input while idle, in milliseconds
+IDLE_TIMEOUT = 500
 
-# Buildings
-class Building(Enum):
-    STORE = 0
-    BANK = 1
-    HOSPITAL = 2
-    SALOON = 3
+# Screen areas that can be repainted on their own
+HUD_RECT = pygame.Rect(0, SCREEN_HEIGHT - 30, SCREEN_WIDTH, 30)
+TOWN_STATUS_RECT = pygame.Rect(0, 80, SCREEN_WIDTH, 20)
 
-@dataclass
-class TileData:
-    """Data class for tile information"""
-    type: TileType
-    color: Tuple[int, int, int]
-    dig_cost: int
-    value: int
-    revealed: bool = False
+# Frames between refreshes of the profiler overlay text
+PROFILER_OVERLAY_INTERVAL = 30
 
-@dataclass
-class EquipmentData:
-    """Data class for equipment information"""
-    name: str
-    cost: int
-    description: str
-    effect: str
+# Rendered strings kept by the text cache
+TEXT_CACHE_SIZE = 256
 
-class GameState(Enum):
-    TOWN = "town"
-    MINE = "mine"
-    MENU = "menu"
-    GAME_OVER = "game_over"
-    VICTORY = "victory"
+# Labels that never change, rendered once when the renderer starts
+BUILDING_LABELS = ['Store', 'Bank', 'Hospital', 'Saloon', 'Enter Mine']
+TOWN_INSTRUCTIONS = "Press 1-7 for equipment, B for bank, H for heal, S for saloon, E for mine"
+RESTART_PROMPT = "Press R to restart or Q to quit"
 
-class Player:
-    """Player class to manage player state and actions"""
-    
-    def __init__(self):
-        self.money = 1500
-        self.health = 100
-        self.max_health = 100
-        self.inventory: Dict[Equipment, bool] = {}
-        self.minerals: Dict[str, int] = {
-            'silver': 0, 
-            'gold': 0, 
-            'platinum': 0, 
-            'diamonds': 0
-        }
-        self.has_ring = False
-        self.position = (GRID_WIDTH // 2, 0)
-        self.camera_y = 0
-        
-    def add_money(self, amount: int) -> None:
-        """Add money to player's account"""
-        self.money += amount
-        
-    def spend_money(self, amount: int) -> bool:
-        """Spend money if player has enough"""
-        if self.money >= amount:
-            self.money -= amount
-            return True
-        return False
-        
-    def take_damage(self, amount: int) -> None:
-        """Take damage and ensure health doesn't go below 0"""
-        self.health = max(0, self.health - amount)
-        
-    def heal(self, amount: int) -> None:
-        """Heal player up to max health"""
-        self.health = min(self.max_health, self.health + amount)
-        
-    def has_equipment(self, equipment: Equipment) -> bool:
-        """Check if player has specific equipment"""
-        return equipment in self.inventory
-        
-    def add_equipment(self, equipment: Equipment) -> None:
-        """Add equipment to inventory"""
-        self.inventory[equipment] = True
-        
-    def add_mineral(self, mineral_type: str, amount: int) -> None:
-        """Add minerals to inventory"""
-        if mineral_type in self.minerals:
-            self.minerals[mineral_type] += amount
-            
-    def clear_minerals(self) -> None:
-        """Clear all minerals from inventory"""
-        self.minerals = {k: 0 for k in self.minerals}
-        
-    def get_total_mineral_value(self) -> int:
-        """Calculate total value of minerals"""
-        # This would be calculated with current market rates
-        return sum(self.minerals.values()) * 10  # Simplified
+_fonts: Dict[int, pygame.font.Font] = {}
 
-class MineGenerator:
-    """Handles mine generation and tile management"""
+def load_font(size: int) -> pygame.font.Font:
+    """pygame's bundled font at `size`, loaded once per process
     
-    def __init__(self):
-        self.grid: List[List[TileType]] = []
-        self.revealed: List[List[bool]] = []
-        self.tile_data = self._create_tile_data()
-        self.ring_position = (0, 0)
-        
-    def _create_tile_data(self) -> Dict[TileType, TileData]:
-        """Create tile data dictionary"""
-        return {
-            TileType.DIRT: TileData(TileType.DIRT, Colors.DIRT, 20, 0),
-            TileType.EMPTY: TileData(TileType.EMPTY, Colors.EMPTY, 0, 0),
-            TileType.SILVER: TileData(TileType.SILVER, Colors.SILVER, 20, 15),
-            TileType.GOLD: TileData(TileType.GOLD, Colors.GOLD, 20, 50),
-            TileType.PLATINUM: TileData(TileType.PLATINUM, Colors.PLATINUM, 20, 250),
-            TileType.DIAMOND: TileData(TileType.DIAMOND, Colors.DIAMOND, 20, 1000),
-            TileType.GRANITE: TileData(TileType.GRANITE, Colors.GRANITE, 150, 0),
-            TileType.WATER: TileData(TileType.WATER, Colors.WATER, 150, 0),
-            TileType.SPRING: TileData(TileType.SPRING, Colors.SPRING, 20, 0),
-            TileType.SANDSTONE: TileData(TileType.SANDSTONE, Colors.SANDSTONE, 10, 0),
-            TileType.VOLCANIC: TileData(TileType.VOLCANIC, Colors.VOLCANIC, 30, 0),
-            TileType.CLOVER: TileData(TileType.CLOVER, Colors.CLOVER, 20, 0),
-            TileType.PUMP: TileData(TileType.PUMP, Colors.PUMP, 20, 0),
-            TileType.RING: TileData(TileType.RING, Colors.RING, 20, 0),
-        }
-        
-    def generate_mine(self) -> None:
-        """Generate the mine with random mineral deposits"""
-        # Initialize grid with dirt
-        self.grid = [[TileType.DIRT for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
-        self.revealed = [[False for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
-        
-        # Generate mineral veins
-        self._generate_mineral_veins()
-        
-        # Place special items
-        self._place_special_items()
-        
-    def _generate_mineral_veins(self) -> None:
-        """Generate random mineral veins in the mine"""
-        vein_configs = [
-            (TileType.SILVER, 15, 1, 6, 10),
-            (TileType.GOLD, 12, 1, 5, 8),
-            (TileType.PLATINUM, 8, 1, 4, 1),
-            (TileType.DIAMOND, 5, 1, 3, 0.1),
-            (TileType.GRANITE, 10, 2, 8, 5),
-            (TileType.WATER, 8, 1, 4, 3),
-            (TileType.SPRING, 6, 1, 3, 2),
-            (TileType.SANDSTONE, 12, 1, 5, 10),
-            (TileType.VOLCANIC, 8, 1, 4, 5),
-            (TileType.CLOVER, 4, 1, 2, 0.5),
-            (TileType.PUMP, 3, 1, 2, 0.5),
-        ]
-        
-        for tile_type, count, min_length, max_length, weight in vein_configs:
-            for _ in range(count):
-                self._create_vein(tile_type, min_length, max_length, weight)
-                
-    def _create_vein(self, tile_type: TileType, min_length: int, max_length: int, weight: float) -> None:
-        """Create a single mineral vein"""
-        if random.random() > weight / 10:  # Weight-based probability
-            return
-            
-        x = random.randint(0, GRID_WIDTH - 1)
-        y = random.randint(0, GRID_HEIGHT - 1)
-        length = random.randint(min_length, max_length)
-        direction = random.choice(['horizontal', 'vertical', 'diagonal'])
-        
-        for i in range(length):
-            if direction == 'horizontal':
-                nx, ny = x + i, y
-            elif direction == 'vertical':
-                nx, ny = x, y + i
-            else:  # diagonal
-                nx, ny = x + i, y + i
-                
-            if 0 <= nx < GRID_WIDTH and 0 <= ny < GRID_HEIGHT:
-                self.grid[ny][nx] = tile_type
-                
-    def _place_special_items(self) -> None:
-        """Place special items like the ring"""
-        # Place ring in a random deep location
-        self.ring_position = (
-            random.randint(0, GRID_WIDTH - 1),
-            random.randint(50, GRID_HEIGHT - 1)
-        )
-        self.grid[self.ring_position[1]][self.ring_position[0]] = TileType.RING
-        
-    def get_tile(self, x: int, y: int) -> TileType:
-        """Get tile type at position"""
-        if 0 <= x < GRID_WIDTH and 0 <= y < GRID_HEIGHT:
-            return self.grid[y][x]
-        return TileType.DIRT
-        
-    def set_tile(self, x: int, y: int, tile_type: TileType) -> None:
-        """Set tile type at position"""
-        if 0 <= x < GRID_WIDTH and 0 <= y < GRID_HEIGHT:
-            self.grid[y][x] = tile_type
-            
-    def reveal_tile(self, x: int, y: int) -> None:
-        """Reveal a tile"""
-        if 0 <= x < GRID_WIDTH and 0 <= y < GRID_HEIGHT:
-            self.revealed[y][x] = True
-            
-    def is_revealed(self, x: int, y: int) -> bool:
-        """Check if tile is revealed"""
-        if 0 <= x < GRID_WIDTH and 0 <= y < GRID_HEIGHT:
-            return self.revealed[y][x]
-        return False
-        
-    def flood_area(self, x: int, y: int) -> None:
-        """Flood area around a spring"""
-        for dy in range(-1, 2):
-            for dx in range(-1, 2):
-                nx, ny = x + dx, y + dy
-                if (0 <= nx < GRID_WIDTH and 0 <= ny < GRID_HEIGHT and 
-                    self.grid[ny][nx] == TileType.EMPTY):
-                    self.grid[ny][nx] = TileType.WATER
-                    
-    def cave_in(self, x: int, y: int) -> None:
-        """Create a cave-in at position"""
-        size = random.choice([3, 5])
-        half = size // 2
-        
-        for dy in range(-half, half + 1):
-            for dx in range(-half, half + 1):
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < GRID_WIDTH and 0 <= ny < GRID_HEIGHT:
-                    self.grid[ny][nx] = TileType.DIRT
+    `pygame.font.SysFont(None, size)` gives the same font, but only after
+    scanning every font installed on the system.
+    """
+    if not pygame.font.get_init():
+        pygame.font.init()
+        _fonts.clear()
+    font = _fonts.get(size)
+    if font is None:
+        font = _fonts[size] = pygame.font.Font(None, size)
+    return font
 
-class TownManager:
-    """Manages town interactions and buildings"""
+class TextCache:
+    """LRU cache of rendered text surfaces
     
-    def __init__(self):
-        self.equipment_costs = {
-            Equipment.SHOVEL: 100,
-            Equipment.PICK: 150,
-            Equipment.DRILL: 250,
-            Equipment.LANTERN: 300,
-            Equipment.BUCKET: 200,
-            Equipment.TORCH: 100,
-            Equipment.DYNAMITE: 300,
-        }
-        
-        self.equipment_descriptions = {
-            Equipment.SHOVEL: "Reduces dig cost by 12",
-            Equipment.PICK: "Reduces dig cost by 5",
-            Equipment.DRILL: "Allows digging through granite",
-            Equipment.LANTERN: "Reveals unknown tiles",
-            Equipment.BUCKET: "Removes water tiles",
-            Equipment.TORCH: "Helps find hidden treasures",
-            Equipment.DYNAMITE: "Explodes large areas",
-        }
-        
-    def buy_equipment(self, player: Player, equipment: Equipment) -> bool:
-        """Buy equipment from store"""
-        if (equipment in self.equipment_costs and 
-            player.spend_money(self.equipment_costs[equipment]) and
-            not player.has_equipment(equipment)):
-            player.add_equipment(equipment)
-            return True
-        return False
-        
-    def sell_minerals(self, player: Player) -> int:
-        """Sell minerals at bank with random rates"""
-        if not any(player.minerals.values()):
-            return 0
-            
-        # Random market rates
-        rates = {
-            'silver': random.uniform(9, 20),
-            'gold': random.uniform(45, 63),
-            'platinum': random.uniform(225, 279),
-            'diamonds': 1000
-        }
-        
-        total_value = 0
-        for mineral, amount in player.minerals.items():
-            if amount > 0:
-                value = int(amount * rates[mineral])
-                total_value += value
-                
-        player.add_money(total_value)
-        player.clear_minerals()
-        return total_value
-        
-    def heal_player(self, player: Player) -> bool:
-        """Heal player at hospital"""
-        if player.health >= player.max_health:
-            return False
-            
-        cost = (player.max_health - player.health) * 2
-        if player.spend_money(cost):
-            player.heal(player.max_health - player.health)
-            return True
-        return False
-        
-    def saloon_interaction(self, player: Player, option: str) -> str:
-        """Handle saloon interactions"""
-        if player.money < 5000:
-            return "You need $5000 to enter the saloon!"
+    Keyed on (font, text, color, antialias), so a label is rasterized once
+    and a changing value such as money is only re-rendered when it changes.
+    """
+    
+    def __init__(self, max_size: int = TEXT_CACHE_SIZE):
+        self.max_size = max_size
+        self._surfaces: 'OrderedDict[tuple, pygame.Surface]' = OrderedDict()
+        
+    def render(self, font: pygame.font.Font, text: str, color: Tuple[int, int, int],
+               antialias: bool = True) -> pygame.Surface:
+        """Return `text` rendered in `font`, rasterizing it only on a cache miss"""
+        key = (font, text, color, antialias)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            return surface
             
-        if option == 'audience':
-            if player.money >= 10000:
-                player.heal(2)
-                return "You enjoyed the show and feel better!"
-            else:
-                return "You need $10000 for the audience!"
-        elif option == 'night':
-            if player.has_equipment(Equipment.SHOVEL):  # Using shovel as condom substitute
-                player.heal(10)
-                return "You had a good night!"
-            else:
-                player.take_damage(20)
-                return "You caught something! Take damage!"
-        return "Invalid option!"
+        surface = self._surfaces[key] = font.render(text, antialias, color)
+        if len(self._surfaces) > self.max_size:
+            self._surfaces.popitem(last=False)
+        return surface
+        
+    def clear(self) -> None:
+        """Drop every cached surface"""
+        self._surfaces.clear()
 
 class Renderer:
-    """Handles all rendering operations"""
+    """Handles all rendering operations
     
-    def __init__(self, screen: pygame.Surface):
+    Frames are either full redraws or dirty-rectangle updates: tile changes
+    reported through `mark_tiles_dirty` and HUD value changes repaint only
+    the affected screen areas, and `present` pushes just those rects.
+    """
+    
+    def __init__(self, screen: pygame.Surface, use_surfarray: bool = True, smooth_scroll: bool = False):
         self.screen = screen
-        self.font = pygame.font.SysFont(None, 24)
-        self.small_font = pygame.font.SysFont(None, 18)
-        self.title_font = pygame.font.SysFont(None, 36)
+        self.use_surfarray = use_surfarray
+        self.smooth_scroll = smooth_scroll
+        self._tile_surfaces: Dict[Tuple[int, int], Tuple[pygame.Surface, pygame.Surface]] = {}
+        self.font = load_font(24)
+        self.small_font = load_font(18)
+        self.title_font = load_font(36)
+        self.text_cache = TextCache()
+        self._prerender_labels()
+        
+        # Dirty-rectangle state; _update_rects is None when the whole screen changed
+        self.full_redraw = True
+        self._dirty_tiles: List[Tuple[int, int, int, int]] = []
+        self._update_rects: Optional[List[pygame.Rect]] = None
+        self._hud_key: Optional[tuple] = None
+        self._town_key: Optional[tuple] = None
+        # Short message shown at the end of the HUD, such as why auto-dig stopped
+        self.notice: Optional[str] = None
+        
+        # Pre-rendered mine rows [_atlas_top, _atlas_top + _atlas_rows) and
+        # the viewport's offset into the mine in pixels
+        self._atlas: Optional[pygame.Surface] = None
+        self._atlas_key: Optional[tuple] = None
+        self._atlas_top = 0
+        self._atlas_rows = 0
+        self._atlas_dirty: List[Tuple[int, int, int, int]] = []
+        self.scroll_y = 0
+        self._scroll_target = 0
+        
+        # Cached profiler overlay and the frame count it was built at
+        self._profiler_overlay: Optional[pygame.Surface] = None
+        self._profiler_overlay_frame = 0
+        
+    def _prerender_labels(self) -> None:
+        """Rasterize the fixed labels up front so no frame pays for them"""
+        for building in BUILDING_LABELS:
+            self.text_cache.render(self.font, building, Colors.WHITE)
+        self.text_cache.render(self.small_font, TOWN_INSTRUCTIONS, Colors.WHITE)
+        self.text_cache.render(self.font, "Has Ring!", Colors.YELLOW)
+        self.text_cache.render(self.title_font, "You Win! Married Mimi!", Colors.GREEN)
+        self.text_cache.render(self.title_font, "Game Over!", Colors.RED)
+        self.text_cache.render(self.font, RESTART_PROMPT, Colors.WHITE)
+        
+    def invalidate(self) -> None:
+        """Repaint the whole screen on the next frame"""
+        self.full_redraw = True
+        
+    def mark_tiles_dirty(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        """Queue the mine tiles in [x0, x1) x [y0, y1) for repainting"""
+        self._atlas_dirty.append((x0, y0, x1, y1))
+        if not self.full_redraw:
+            self._dirty_tiles.append((x0, y0, x1, y1))
+            
+    def begin_full_redraw(self) -> None:
+        """Clear the screen and drop queued updates ahead of a full redraw"""
+        self.screen.fill(Colors.BLACK)
+        self.full_redraw = False
+        self._dirty_tiles.clear()
+        self._update_rects = None
+        
+    def present(self) -> None:
+        """Push this frame's changes to the display"""
+        if self._update_rects is None:
+            pygame.display.flip()
+        elif self._update_rects:
+            pygame.display.update(self._update_rects)
+        self._update_rects = []
+        
+    def _add_update_rect(self, rect: pygame.Rect) -> None:
+        """Record a screen area that changed this frame"""
+        if self._update_rects is not None:
+            self._update_rects.append(rect)
         
     def render_town(self, player: Player) -> None:
         """Render the town interface"""
@@ -392,317 +192,596 @@ class Renderer:
         pygame.draw.rect(self.screen, Colors.TOWN_BG, (0, 0, SCREEN_WIDTH, TOWN_HEIGHT))
         
         # Building buttons
-        buildings = ['Store', 'Bank', 'Hospital', 'Saloon', 'Enter Mine']
-        for i, building in enumerate(buildings):
+        for i, building in enumerate(BUILDING_LABELS):
             x = i * 150 + 50
-            text = self.font.render(building, True, Colors.WHITE)
+            text = self.text_cache.render(self.font, building, Colors.WHITE)
             self.screen.blit(text, (x, 10))
             
         # Instructions
-        instructions = [
-            "Press 1-7 for equipment, B for bank, H for heal, S for saloon, E for mine",
-            f"Money: ${player.money} | Health: {player.health}% | Minerals: {sum(player.minerals.values())}"
-        ]
-        
-        for i, instruction in enumerate(instructions):
-            text = self.small_font.render(instruction, True, Colors.WHITE)
-            self.screen.blit(text, (10, 60 + i * 20))
+        text = self.text_cache.render(self.small_font, TOWN_INSTRUCTIONS, Colors.WHITE)
+        self.screen.blit(text, (10, 60))
+        self._render_town_status(player)
+        
+    def _render_town_status(self, player: Player) -> None:
+        """Render the money/health/minerals line of the town screen"""
+        self._town_key = self._get_town_key(player)
+        status = f"Money: ${player.money} | Health: {player.health}% | Minerals: {sum(player.minerals.values())}"
+        text = self.text_cache.render(self.small_font, status, Colors.WHITE)
+        self.screen.blit(text, TOWN_STATUS_RECT.move(10, 0))
+        
+    def _get_town_key(self, player: Player) -> tuple:
+        """Values shown on the town status line"""
+        return (player.money, player.health, sum(player.minerals.values()))
+        
+    def update_town(self, player: Player) -> None:
+        """Repaint the town status line if its values changed"""
+        if self._town_key != self._get_town_key(player):
+            self.screen.fill(Colors.BLACK, TOWN_STATUS_RECT)
+            self._render_town_status(player)
+            self._add_update_rect(TOWN_STATUS_RECT)
             
+    def update_scroll(self, player: Player) -> int:
+        """Move the viewport toward the camera and return its offset in pixels"""
+        target = self._scroll_target = player.camera_y * TILE_SIZE
+        distance = target - self.scroll_y
+        if not self.smooth_scroll or abs(distance) >= VIEWPORT_HEIGHT:
+            self.scroll_y = target
+        elif distance:
+            step = max(1, abs(distance) // 4)
+            self.scroll_y += step if distance > 0 else -step
+        return self.scroll_y
+        
+    @property
+    def is_scrolling(self) -> bool:
+        """Whether a smooth scroll is still in progress"""
+        return self.scroll_y != self._scroll_target
+        
     def render_mine(self, player: Player, mine: MineGenerator) -> None:
         """Render the mine interface"""
-        visible_height = (SCREEN_HEIGHT - TOWN_HEIGHT) // TILE_SIZE
-        start_y = player.camera_y
-        end_y = min(GRID_HEIGHT, start_y + visible_height + 1)
-        
-        # Render tiles
-        for y in range(start_y, end_y):
-            for x in range(GRID_WIDTH):
-                screen_x = x * TILE_SIZE
-                screen_y = (y - start_y) * TILE_SIZE + TOWN_HEIGHT
+        self._sync_atlas(mine)
+        self._add_update_rect(self._blit_viewport(player, self._viewport_rect(mine)))
+        
+    def update_mine(self, player: Player, mine: MineGenerator) -> None:
+        """Repaint the mine tiles queued since the last frame"""
+        if self._sync_atlas(mine):
+            self._dirty_tiles = [(0, 0, mine.width, mine.height)]
+            
+        viewport = self._viewport_rect(mine)
+        for x0, y0, x1, y1 in self._dirty_tiles:
+            rect = self._tile_screen_rect(x0, y0, x1, y1).clip(viewport)
+            if rect:
+                self._add_update_rect(self._blit_viewport(player, rect))
                 
-                tile_type = mine.get_tile(x, y)
-                color = self._get_tile_color(tile_type, mine.is_revealed(x, y), player)
+                # Tiles drawn over the HUD need the HUD drawn back on top
+                if rect.colliderect(HUD_RECT):
+                    self._hud_key = None
+        self._dirty_tiles.clear()
+        
+    def _viewport_rect(self, mine: MineGenerator) -> pygame.Rect:
+        """Screen area covered by the mine viewport"""
+        height = min(VIEWPORT_HEIGHT, mine.height * TILE_SIZE - self.scroll_y)
+        return pygame.Rect(0, TOWN_HEIGHT, mine.width * TILE_SIZE, height)
+        
+    def _tile_screen_rect(self, x0: int, y0: int, x1: int, y1: int) -> pygame.Rect:
+        """Screen area of the mine tiles [x0, x1) x [y0, y1) at the current scroll"""
+        return pygame.Rect(x0 * TILE_SIZE, y0 * TILE_SIZE - self.scroll_y + TOWN_HEIGHT,
+                           (x1 - x0) * TILE_SIZE, (y1 - y0) * TILE_SIZE)
+        
+    def screen_to_tile(self, pos: Tuple[int, int], mine: MineGenerator) -> Optional[Tuple[int, int]]:
+        """Mine tile under a screen position, or None outside the viewport"""
+        if not self._viewport_rect(mine).collidepoint(pos):
+            return None
+        return pos[0] // TILE_SIZE, (pos[1] - TOWN_HEIGHT + self.scroll_y) // TILE_SIZE
+        
+    def _blit_viewport(self, player: Player, rect: pygame.Rect) -> pygame.Rect:
+        """Copy a screen area of the viewport from the atlas and draw the player over it"""
+        area = rect.move(0, self.scroll_y - TOWN_HEIGHT - self._atlas_top * TILE_SIZE)
+        self.screen.blit(self._atlas, rect, area)
+        
+        px, py = player.position
+        player_rect = self._tile_screen_rect(px, py, px + 1, py + 1).clip(rect)
+        if player_rect:
+            self.screen.fill(Colors.PLAYER, player_rect)
+        return rect
+        
+    def _sync_atlas(self, mine: MineGenerator) -> bool:
+        """Bring the atlas up to date with the mine, returning True if it was rebuilt
+        
+        The atlas is one persistent surface holding up to ATLAS_MAX_ROWS rows
+        of the mine, so drawing the viewport is a single blit. Changed tiles
+        are patched in place; it is only rebuilt when the visible rows leave
+        it or the mine is replaced.
+        """
+        key = (id(mine), mine.width, mine.height)
+        first_row = self.scroll_y // TILE_SIZE
+        last_row = min(mine.height, -(-(self.scroll_y + VIEWPORT_HEIGHT) // TILE_SIZE))
+        
+        if (self._atlas is not None and key == self._atlas_key and
+                self._atlas_top <= first_row and last_row <= self._atlas_top + self._atlas_rows):
+            for x0, y0, x1, y1 in self._atlas_dirty:
+                y0, y1 = max(y0, self._atlas_top), min(y1, self._atlas_top + self._atlas_rows)
+                if y0 < y1:
+                    self._render_tiles(self._atlas, mine, x0, y0, x1, y1)
+            self._atlas_dirty.clear()
+            return False
+            
+        # Center the visible rows in the atlas window
+        rows = min(mine.height, ATLAS_MAX_ROWS)
+        top = first_row - (rows - (last_row - first_row)) // 2
+        self._atlas_top = max(0, min(top, mine.height - rows))
+        self._atlas_rows = rows
+        self._atlas_key = key
+        
+        size = (mine.width * TILE_SIZE, rows * TILE_SIZE)
+        if self._atlas is None or self._atlas.get_size() != size:
+            self._atlas = pygame.Surface(size, 0, self.screen)
+        self._render_tiles(self._atlas, mine, 0, self._atlas_top, mine.width, self._atlas_top + rows)
+        self._atlas_dirty.clear()
+        return True
+        
+    def _render_tiles(self, target: pygame.Surface, mine: MineGenerator,
+                      x0: int, y0: int, x1: int, y1: int) -> None:
+        """Render the mine tiles in [x0, x1) x [y0, y1) onto the atlas"""
+        tiles = mine.get_region(x0, y0, x1, y1)
+        revealed = mine.get_revealed_region(x0, y0, x1, y1)
+        atlas_pos = (x0 * TILE_SIZE, (y0 - self._atlas_top) * TILE_SIZE)
+        
+        if self.use_surfarray:
+            self._render_tiles_surfarray(target, tiles, revealed, atlas_pos)
+        else:
+            self._render_tiles_rects(target, tiles, revealed, atlas_pos)
+        
+    def _render_tiles_rects(self, target: pygame.Surface, tiles: np.ndarray,
+                            revealed: np.ndarray, pos: Tuple[int, int]) -> None:
+        """Render a block of tiles with one rect per tile"""
+        for row, (tile_row, revealed_row) in enumerate(zip(tiles.tolist(), revealed.tolist())):
+            target_y = row * TILE_SIZE + pos[1]
+            for column, (tile_id, tile_revealed) in enumerate(zip(tile_row, revealed_row)):
+                target_x = column * TILE_SIZE + pos[0]
+                color = self._get_tile_color(TILE_TYPES[tile_id], tile_revealed)
                 
-                pygame.draw.rect(self.screen, color, 
-                               (screen_x, screen_y, TILE_SIZE, TILE_SIZE))
+                pygame.draw.rect(target, color, 
+                               (target_x, target_y, TILE_SIZE, TILE_SIZE))
                 
-        # Render player
-        px = player.position[0] * TILE_SIZE
-        py = (player.position[1] - start_y) * TILE_SIZE + TOWN_HEIGHT
-        pygame.draw.rect(self.screen, Colors.PLAYER, (px, py, TILE_SIZE, TILE_SIZE))
-        
-    def _get_tile_color(self, tile_type: TileType, revealed: bool, player: Player) -> Tuple[int, int, int]:
+    def _render_tiles_surfarray(self, target: pygame.Surface, tiles: np.ndarray,
+                                revealed: np.ndarray, pos: Tuple[int, int]) -> None:
+        """Render a block of tiles as one palette-mapped image"""
+        hidden = ~revealed & (tiles != TileType.EMPTY.value)
+        tiles = np.where(hidden, TileType.DIRT.value, tiles)
+            
+        # One pixel per tile, scaled up to TILE_SIZE in a single blit
+        small, scaled = self._get_tile_surfaces(tiles.shape[1], tiles.shape[0])
+        pygame.surfarray.blit_array(small, TILE_PALETTE[tiles.T])
+        pygame.transform.scale(small, scaled.get_size(), scaled)
+        target.blit(scaled, pos)
+        
+    def _get_tile_surfaces(self, columns: int, rows: int) -> Tuple[pygame.Surface, pygame.Surface]:
+        """Get the cached tile-sized and screen-sized surfaces for a viewport size"""
+        surfaces = self._tile_surfaces.get((columns, rows))
+        if surfaces is None:
+            small = pygame.Surface((columns, rows), 0, self.screen)
+            scaled = pygame.Surface((columns * TILE_SIZE, rows * TILE_SIZE), 0, self.screen)
+            surfaces = self._tile_surfaces[(columns, rows)] = (small, scaled)
+        return surfaces
+        
+    def _get_tile_color(self, tile_type: TileType, revealed: bool) -> Tuple[int, int, int]:
         """Get color for tile based on type and visibility"""
         if tile_type == TileType.EMPTY:
             return Colors.EMPTY
             
-        if not revealed and not player.has_equipment(Equipment.LANTERN):
+        if not revealed:
             return Colors.DIRT
             
-        color_map = {
-            TileType.DIRT: Colors.DIRT,
-            TileType.SILVER: Colors.SILVER,
-            TileType.GOLD: Colors.GOLD,
-            TileType.PLATINUM: Colors.PLATINUM,
-            TileType.DIAMOND: Colors.DIAMOND,
-            TileType.GRANITE: Colors.GRANITE,
-            TileType.WATER: Colors.WATER,
-            TileType.SPRING: Colors.SPRING,
-            TileType.SANDSTONE: Colors.SANDSTONE,
-            TileType.VOLCANIC: Colors.VOLCANIC,
-            TileType.CLOVER: Colors.CLOVER,
-            TileType.PUMP: Colors.PUMP,
-            TileType.RING: Colors.RING,
-        }
-        
-        return color_map.get(tile_type, Colors.DIRT)
+        return TILE_COLORS[tile_type]
         
     def render_hud(self, player: Player, game_state: GameState) -> None:
         """Render heads-up display"""
+        self._hud_key = self._get_hud_key(player, game_state)
+        
         # Status bar
         status_text = f"Money: ${player.money} | Health: {player.health}%"
-        text = self.font.render(status_text, True, Colors.WHITE)
+        text = self.text_cache.render(self.font, status_text, Colors.WHITE)
         self.screen.blit(text, (10, SCREEN_HEIGHT - 30))
         
         # Ring indicator
         if player.has_ring:
-            ring_text = self.font.render("Has Ring!", True, Colors.YELLOW)
+            ring_text = self.text_cache.render(self.font, "Has Ring!", Colors.YELLOW)
             self.screen.blit(ring_text, (300, SCREEN_HEIGHT - 30))
             
         # Equipment indicator
         if game_state == GameState.MINE:
             equipment_text = f"Equipment: {len(player.inventory)} items"
-            text = self.small_font.render(equipment_text, True, Colors.WHITE)
+            text = self.text_cache.render(self.small_font, equipment_text, Colors.WHITE)
             self.screen.blit(text, (500, SCREEN_HEIGHT - 30))
             
+        if self.notice:
+            text = self.text_cache.render(self.small_font, self.notice, Colors.YELLOW)
+            self.screen.blit(text, (640, SCREEN_HEIGHT - 30))
+            
+    def _get_hud_key(self, player: Player, game_state: GameState) -> tuple:
+        """Values shown on the HUD"""
+        return (player.money, player.health, player.has_ring, len(player.inventory), game_state, self.notice)
+        
+    def update_hud(self, player: Player, game_state: GameState, mine: MineGenerator) -> None:
+        """Repaint the HUD if its values changed, along with any mine tiles beneath it"""
+        if self._hud_key == self._get_hud_key(player, game_state):
+            return
+            
+        self.screen.fill(Colors.BLACK, HUD_RECT)
+        self._add_update_rect(HUD_RECT)
+        if game_state == GameState.MINE:
+            self._sync_atlas(mine)
+            under_hud = HUD_RECT.clip(self._viewport_rect(mine))
+            if under_hud:
+                self._blit_viewport(player, under_hud)
+        self.render_hud(player, game_state)
+        
+    def render_profiler_overlay(self, profiler: FrameProfiler) -> None:
+        """Draw frame timings in the top-right corner
+        
+        The overlay covers whatever is beneath it, so the next frame is a
+        full redraw while it is shown.
+        """
+        if (self._profiler_overlay is None or
+                profiler.frames >= self._profiler_overlay_frame + PROFILER_OVERLAY_INTERVAL):
+            self._profiler_overlay = self._build_profiler_overlay(profiler)
+            self._profiler_overlay_frame = profiler.frames
+            
+        rect = self._profiler_overlay.get_rect(topright=(SCREEN_WIDTH - 10, 10))
+        self.screen.blit(self._profiler_overlay, rect)
+        self._add_update_rect(rect)
+        self.invalidate()
+        
+    def _build_profiler_overlay(self, profiler: FrameProfiler) -> pygame.Surface:
+        """Render FPS, frame times and the per-phase breakdown onto a translucent panel"""
+        stats = profiler.summary()
+        lines = [f"FPS {profiler.fps():.1f}"]
+        if stats:
+            lines.append(f"frame p50 {stats['frame']['p50']:.2f} p99 {stats['frame']['p99']:.2f} ms")
+            lines.append(f"work  p50 {stats['work']['p50']:.2f} p99 {stats['work']['p99']:.2f} ms")
+            for phase in profiler.phases:
+                if stats[phase]['p99'] > 0:
+                    lines.append(f"{phase:<14} {stats[phase]['p50']:6.2f} {stats[phase]['p99']:6.2f}")
+                    
+        texts = [self.small_font.render(line, True, Colors.WHITE) for line in lines]
+        line_height = self.small_font.get_linesize()
+        width = max(text.get_width() for text in texts) + 12
+        panel = pygame.Surface((width, line_height * len(texts) + 8), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 180))
+        for i, text in enumerate(texts):
+            panel.blit(text, (6, 4 + i * line_height))
+        return panel
+        
     def render_game_over(self, victory: bool) -> None:
         """Render game over screen"""
         if victory:
-            text = self.title_font.render("You Win! Married Mimi!", True, Colors.GREEN)
+            text = self.text_cache.render(self.title_font, "You Win! Married Mimi!", Colors.GREEN)
         else:
-            text = self.title_font.render("Game Over!", True, Colors.RED)
+            text = self.text_cache.render(self.title_font, "Game Over!", Colors.RED)
             
         text_rect = text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
         self.screen.blit(text, text_rect)
         
-        restart_text = self.font.render("Press R to restart or Q to quit", True, Colors.WHITE)
+        restart_text = self.text_cache.render(self.font, RESTART_PROMPT, Colors.WHITE)
         restart_rect = restart_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50))
         self.screen.blit(restart_text, restart_rect)
 
+# Keys mapped to simulation actions, per game state
+TOWN_KEYS: Dict[int, Action] = {
+    pygame.K_1: Action.BUY_SHOVEL,
+    pygame.K_2: Action.BUY_PICK,
+    pygame.K_3: Action.BUY_DRILL,
+    pygame.K_4: Action.BUY_LANTERN,
+    pygame.K_5: Action.BUY_BUCKET,
+    pygame.K_6: Action.BUY_TORCH,
+    pygame.K_7: Action.BUY_DYNAMITE,
+    pygame.K_b: Action.SELL,
+    pygame.K_h: Action.HEAL,
+    pygame.K_s: Action.SALOON,
+    pygame.K_e: Action.ENTER_MINE,
+}
+
+MINE_KEYS: Dict[int, Action] = {
+    pygame.K_LEFT: Action.MOVE_LEFT,
+    pygame.K_RIGHT: Action.MOVE_RIGHT,
+    pygame.K_UP: Action.MOVE_UP,
+    pygame.K_DOWN: Action.MOVE_DOWN,
+    pygame.K_t: Action.TELEPORT,
+    pygame.K_ESCAPE: Action.LEAVE_MINE,
+    pygame.K_d: Action.DYNAMITE,
+}
+
+GAME_OVER_KEYS: Dict[int, Action] = {
+    pygame.K_r: Action.RESTART,
+}
+
 class Game:
-    """Main game class"""
+    """Main game class
+    
+    A pygame front end over `Simulation`: it turns key presses into actions,
+    follows the player with the camera and draws the result. While nothing
+    is animating it sleeps until the next input instead of drawing frames.
+    """
     
-    def __init__(self):
-        pygame.init()
+    def __init__(self, seed: Optional[int] = None, profile: bool = False,
+                 profile_dump: Optional[str] = None, record: Optional[str] = None,
+                 mine: Optional[MineGenerator] = None, idle: bool = True, share: Optional[str] = None,
+                 measure_startup: bool = False, telemetry: Optional[str] = None):
+        # Seconds spent in each startup phase, up to the first frame
+        self.startup: Dict[str, float] = {}
+        self.measure_startup = measure_startup
+        self._lap_started = time.perf_counter()
+        if measure_startup:
+            self.startup['import'] = self._lap_started - IMPORT_STARTED
+        
+        # Only the modules the game uses; pygame.init() would also start audio and joysticks
+        pygame.display.init()
+        pygame.font.init()
+        self._lap('pygame_init')
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Miner Tribute - Enhanced Edition")
         self.clock = pygame.time.Clock()
+        self._lap('set_mode')
         
         # Game components
-        self.player = Player()
-        self.mine = MineGenerator()
-        self.town = TownManager()
+        self.sim = Simulation(seed, mine)
+        self._lap('simulation')
         self.renderer = Renderer(self.screen)
+        self.mine.add_listener(self.renderer.mark_tiles_dirty)
+        self._lap('renderer')
         
         # Game state
-        self.game_state = GameState.TOWN
         self.running = True
+        self.frame = 0
+        self._tick_time = 0.0  # Game time not yet simulated, in seconds
+        self._last_update: Optional[float] = None
+        self._rendered_view: Optional[Tuple[GameState, int]] = None
+        self._rendered_position = self.player.position
+        
+        # Frame profiling: always on with `profile`, otherwise while the
+        # overlay is shown (F3)
+        self.profiler = FrameProfiler()
+        self.profile = profile
+        self.profile_dump = profile_dump
+        self.show_profiler = False
+        if profile:
+            self.profiler.enable(self, self.renderer)
+            
+        # Auto-dig toward a clicked tile; needs a whole-mine grid
+        self.planner = None if isinstance(self.mine, ChunkedMine) else DigPlanner(self.sim)
         
-        # Initialize game
-        self.mine.generate_mine()
+        # Input recording for exact replays (see replay.py)
+        self.record_path = record
+        self.recorder = InputRecorder(self.sim.seed) if record else None
+        
+        # Live state in shared memory for spectators and bots (see shared_state.py)
+        self.publisher = StatePublisher(self.sim, share) if share else None
+        
+        # Gameplay events for later analysis (see telemetry.py)
+        self.telemetry = TelemetryRecorder(self.sim, telemetry) if telemetry else None
+        
+        # While nothing animates, wait for input instead of drawing frames
+        self.idle = idle
+        self._pending_events: List[pygame.event.Event] = []
+        
+    def _lap(self, phase: str) -> None:
+        """Record the time since the previous startup phase ended as `phase`"""
+        now = time.perf_counter()
+        self.startup[phase] = now - self._lap_started
+        self._lap_started = now
+        
+    def startup_report(self) -> str:
+        """The startup phases timed so far, one line each"""
+        lines = [f"Startup: {sum(self.startup.values()) * 1e3:.1f} ms"]
+        lines += [f"  {phase:<14} {seconds * 1e3:>8.1f} ms" for phase, seconds in self.startup.items()]
+        return '\n'.join(lines)
+        
+    @property
+    def player(self) -> Player:
+        return self.sim.player
+        
+    @property
+    def mine(self) -> MineGenerator:
+        return self.sim.mine
+        
+    @property
+    def town(self) -> TownManager:
+        return self.sim.town
+        
+    @property
+    def game_state(self) -> GameState:
+        return self.sim.state
+        
+    @game_state.setter
+    def game_state(self, state: GameState) -> None:
+        self.sim.state = state
         
     def handle_input(self) -> None:
         """Handle all input events"""
-        for event in pygame.event.get():
+        events = self._pending_events + pygame.event.get()
+        self._pending_events = []
+        for event in events:
             if event.type == pygame.QUIT:
                 self.running = False
                 
+            if event.type == pygame.WINDOWEXPOSED:
+                self.renderer.invalidate()
+                
             if event.type == pygame.KEYDOWN:
                 self._handle_keydown(event.key)
                 
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                self._handle_click(event.pos)
+                
     def _handle_keydown(self, key: int) -> None:
         """Handle key press events"""
+        if key == pygame.K_F3:
+            self.toggle_profiler()
+            return
+        if key in (pygame.K_F5, pygame.K_F9) and isinstance(self.mine, ChunkedMine):
+            return  # Chunked mines have no whole-mine grid to save
+        if key == pygame.K_F5:
+            save_game(SAVE_PATH, self.sim)
+            return
+        if key == pygame.K_F9:
+            # A recording replays from its seed, so it cannot include a load
+            if self.recorder is None:
+                self.load(SAVE_PATH)
+            return
+            
         if self.game_state == GameState.TOWN:
-            self._handle_town_input(key)
+            action = TOWN_KEYS.get(key)
         elif self.game_state == GameState.MINE:
-            self._handle_mine_input(key)
-        elif self.game_state in [GameState.GAME_OVER, GameState.VICTORY]:
-            self._handle_game_over_input(key)
+            action = MINE_KEYS.get(key)
+        else:
+            if key == pygame.K_q:
+                self.running = False
+            action = GAME_OVER_KEYS.get(key)
             
-    def _handle_town_input(self, key: int) -> None:
-        """Handle input while in town"""
-        if key == pygame.K_1:
-            self.town.buy_equipment(self.player, Equipment.SHOVEL)
-        elif key == pygame.K_2:
-            self.town.buy_equipment(self.player, Equipment.PICK)
-        elif key == pygame.K_3:
-            self.town.buy_equipment(self.player, Equipment.DRILL)
-        elif key == pygame.K_4:
-            self.town.buy_equipment(self.player, Equipment.LANTERN)
-        elif key == pygame.K_5:
-            self.town.buy_equipment(self.player, Equipment.BUCKET)
-        elif key == pygame.K_6:
-            self.town.buy_equipment(self.player, Equipment.TORCH)
-        elif key == pygame.K_7:
-            self.town.buy_equipment(self.player, Equipment.DYNAMITE)
-        elif key == pygame.K_b:
-            self.town.sell_minerals(self.player)
-        elif key == pygame.K_h:
-            self.town.heal_player(self.player)
-        elif key == pygame.K_s:
-            self.town.saloon_interaction(self.player, 'audience')
-        elif key == pygame.K_e:
-            if self.player.spend_money(30):  # Elevator cost
-                self.game_state = GameState.MINE
-                
-    def _handle_mine_input(self, key: int) -> None:
-        """Handle input while in mine"""
-        dx, dy = 0, 0
-        
-        if key == pygame.K_LEFT:
-            dx = -1
-        elif key == pygame.K_RIGHT:
-            dx = 1
-        elif key == pygame.K_UP:
-            dy = -1
-        elif key == pygame.K_DOWN:
-            dy = 1
-        elif key == pygame.K_t:  # Teleport glitch tribute
-            self.player.position = (self.player.position[0], 0)
-        elif key == pygame.K_ESCAPE:
-            self.game_state = GameState.TOWN
+        if action is not None:
+            # Keys take over from auto-dig
+            if self.planner is not None:
+                self.planner.set_target(None)
+            self.renderer.notice = None
+            self._apply_action(action)
             
-        if dx or dy:
-            self._move_player(dx, dy)
+    def _handle_click(self, pos: Tuple[int, int]) -> None:
+        """Start auto-digging toward a clicked mine tile"""
+        if self.planner is not None and self.game_state == GameState.MINE:
+            self.planner.set_target(self.renderer.screen_to_tile(pos, self.mine))
+            self.renderer.notice = None
             
-        # Update camera
-        self._update_camera()
-        
-    def _handle_game_over_input(self, key: int) -> None:
-        """Handle input on game over screen"""
-        if key == pygame.K_r:
-            self._restart_game()
-        elif key == pygame.K_q:
-            self.running = False
+    def _apply_action(self, action: Action) -> bool:
+        """Step the simulation, recording the action and following with the camera; returns whether it had an effect"""
+        in_mine = self.game_state == GameState.MINE
+        applied = self.sim.step(action)
+        if self.recorder is not None:
+            self.recorder.record(self.sim.ticks, action)
             
-    def _move_player(self, dx: int, dy: int) -> None:
-        """Move player and handle digging"""
-        new_x = self.player.position[0] + dx
-        new_y = self.player.position[1] + dy
-        
-        if 0 <= new_x < GRID_WIDTH and 0 <= new_y < GRID_HEIGHT:
-            tile_type = self.mine.get_tile(new_x, new_y)
+        # Update camera
+        if in_mine:
+            self._update_camera()
+        return applied
             
-            if tile_type == TileType.EMPTY:
-                self.player.position = (new_x, new_y)
-            else:
-                if self._dig_tile(new_x, new_y):
-                    self.player.position = (new_x, new_y)
-                    self.mine.reveal_tile(new_x, new_y)
-                    
-    def _dig_tile(self, x: int, y: int) -> bool:
-        """Dig a tile and handle consequences"""
-        tile_type = self.mine.get_tile(x, y)
-        
-        # Handle special tiles
-        if tile_type == TileType.GRANITE:
-            if not self.player.has_equipment(Equipment.DRILL):
-                return False
-            if not self.player.spend_money(150):
-                return False
-        elif tile_type == TileType.WATER:
-            if not self.player.has_equipment(Equipment.BUCKET):
-                return False
-            if not self.player.spend_money(150):
-                return False
-        elif tile_type == TileType.SPRING:
-            self.mine.flood_area(x, y)
-            self.player.take_damage(20)
+    def _auto_dig(self) -> None:
+        """Take the next planned step toward the auto-dig target, giving up when it cannot be taken
+        
+        A move that cannot be paid for or goes nowhere would fail the same
+        way every tick, so the target is dropped and the reason shown.
+        """
+        if self.game_state != GameState.MINE:
+            self.planner.set_target(None)
+            return
+        action = self.planner.next_action()
+        if action is None:
+            self.planner.set_target(None)
         else:
-            # Regular digging
-            cost = self._calculate_dig_cost(tile_type)
-            if not self.player.spend_money(cost):
-                return False
+            position = self.player.position
+            if self._apply_action(action) and self.player.position != position:
+                return
+            self.planner.stop("blocked")
+        if self.planner.stopped:
+            self.renderer.notice = f"Auto-dig: {self.planner.stopped}"
+            
+    @property
+    def animating(self) -> bool:
+        """Whether anything changes without input, so frames must keep coming at FPS"""
+        return (self.profiler.enabled or self.renderer.is_scrolling or not self.sim.water.settled or
+                (self.planner is not None and self.planner.target is not None))
                 
-        # Handle rewards
-        self._handle_tile_rewards(tile_type)
-        
-        # Random cave-in
-        if random.random() < 0.05:
-            self.mine.cave_in(x, y)
-            self.player.take_damage(30)
+    def _wait_for_input(self) -> None:
+        """Sleep until an event arrives or IDLE_TIMEOUT passes, keeping the event for handle_input
+        
+        Ticks that fell due while asleep could not have changed anything, so
+        they are not run.
+        """
+        event = pygame.event.wait(IDLE_TIMEOUT)
+        if event.type != pygame.NOEVENT:
+            self._pending_events.append(event)
+        self._last_update = None
             
-        # Clear the tile
-        self.mine.set_tile(x, y, TileType.EMPTY)
+    def toggle_profiler(self) -> None:
+        """Show or hide the frame-time overlay"""
+        self.show_profiler = not self.show_profiler
+        if self.show_profiler:
+            self.profiler.enable(self, self.renderer)
+        elif not self.profile:
+            self.profiler.disable()
+        self.renderer.invalidate()
+        
+    def load(self, path: str) -> bool:
+        """Restore a saved game, returning whether there was one to load"""
+        if not os.path.exists(path):
+            return False
+        try:
+            restore_simulation(self.sim, load_game(path))
+        except SaveFormatError:
+            return False
+        self.renderer.invalidate()
         return True
         
-    def _calculate_dig_cost(self, tile_type: TileType) -> int:
-        """Calculate dig cost based on tile type and equipment"""
-        base_cost = 20
-        
-        if tile_type == TileType.SANDSTONE:
-            base_cost = 10
-        elif tile_type == TileType.VOLCANIC:
-            base_cost = 30
-            
-        # Equipment bonuses
-        if self.player.has_equipment(Equipment.SHOVEL):
-            base_cost = max(8, base_cost - 12)
-        if self.player.has_equipment(Equipment.PICK):
-            base_cost = max(5, base_cost - 5)
-            
-        return base_cost
-        
-    def _handle_tile_rewards(self, tile_type: TileType) -> None:
-        """Handle rewards from digging tiles"""
-        if tile_type == TileType.SILVER:
-            amount = random.randint(1, 6)
-            self.player.add_mineral('silver', amount)
-        elif tile_type == TileType.GOLD:
-            amount = random.randint(1, 6)
-            self.player.add_mineral('gold', amount)
-        elif tile_type == TileType.PLATINUM:
-            amount = random.randint(1, 6)
-            self.player.add_mineral('platinum', amount)
-        elif tile_type == TileType.DIAMOND:
-            self.player.add_mineral('diamonds', 1)
-        elif tile_type == TileType.RING:
-            self.player.has_ring = True
-            
     def _update_camera(self) -> None:
         """Update camera to follow player"""
-        visible_height = (SCREEN_HEIGHT - TOWN_HEIGHT) // TILE_SIZE
-        
-        if self.player.position[1] > self.player.camera_y + visible_height - 3:
-            self.player.camera_y = self.player.position[1] - visible_height + 3
+        if self.player.position[1] > self.player.camera_y + VISIBLE_ROWS - 3:
+            self.player.camera_y = self.player.position[1] - VISIBLE_ROWS + 3
         if self.player.position[1] < self.player.camera_y + 3:
             self.player.camera_y = max(0, self.player.position[1] - 3)
             
-    def _check_win_condition(self) -> bool:
-        """Check if player has won"""
-        return self.player.has_ring and self.player.money >= 20000
-        
-    def _check_lose_condition(self) -> bool:
-        """Check if player has lost"""
-        return self.player.health <= 0 or self.player.money < -100
-        
-    def _restart_game(self) -> None:
-        """Restart the game"""
-        self.player = Player()
-        self.mine.generate_mine()
-        self.game_state = GameState.TOWN
-        
-    def update(self) -> None:
-        """Update game state"""
-        if self.game_state == GameState.TOWN:
-            if self._check_win_condition():
-                self.game_state = GameState.VICTORY
-            elif self._check_lose_condition():
-                self.game_state = GameState.GAME_OVER
-                
+    def update(self, elapsed: Optional[float] = None) -> None:
+        """Run the simulation ticks that fell due in the `elapsed` seconds since the last update
+        
+        Ticks run at TICK_RATE of game time whatever the frame rate: a slow
+        frame is followed by several ticks before the next one is drawn.
+        `elapsed` is measured with the wall clock when not given.
+        """
+        if elapsed is None:
+            now = time.perf_counter()
+            elapsed = now - self._last_update if self._last_update is not None else 0.0
+            self._last_update = now
+        self._tick_time += elapsed
+        
+        ticks = 0
+        while self._tick_time >= 1 / TICK_RATE:
+            if ticks == MAX_TICKS_PER_FRAME:
+                self._tick_time = 0.0
+                break
+            self._tick_time -= 1 / TICK_RATE
+            self._tick()
+            ticks += 1
+        self.sim.update()
+        if self.publisher is not None:
+            self.publisher.publish()
+        
+    def _tick(self) -> None:
+        """Advance the simulation and the auto-dig walk by one tick"""
+        if (self.planner is not None and self.planner.target is not None and
+                self.sim.ticks % AUTO_DIG_INTERVAL == 0):
+            self._auto_dig()
+        self.sim.tick()
+        
     def render(self) -> None:
         """Render the current game state"""
-        self.screen.fill(Colors.BLACK)
+        # State changes and camera scrolls move everything on screen
+        view = (self.game_state, self.renderer.update_scroll(self.player))
+        if view != self._rendered_view:
+            self._rendered_view = view
+            self.renderer.invalidate()
+            
+        # Repaint the tiles the player left and entered
+        if self.player.position != self._rendered_position:
+            for x, y in (self._rendered_position, self.player.position):
+                self.renderer.mark_tiles_dirty(x, y, x + 1, y + 1)
+            self._rendered_position = self.player.position
+            
+        if not self.renderer.full_redraw:
+            if self.game_state == GameState.TOWN:
+                self.renderer.update_town(self.player)
+            elif self.game_state == GameState.MINE:
+                self.renderer.update_mine(self.player, self.mine)
+            self.renderer.update_hud(self.player, self.game_state, self.mine)
+            return
+            
+        self.renderer.begin_full_redraw()
         
         if self.game_state == GameState.TOWN:
             self.renderer.render_town(self.player)
@@ -718,16 +797,61 @@ class Game:
     def run(self) -> None:
         """Main game loop"""
         while self.running:
+            profiling = self.profiler.enabled
+            if profiling:
+                self.profiler.begin_frame()
+                
             self.handle_input()
             self.update()
             self.render()
-            
-            pygame.display.flip()
-            self.clock.tick(FPS)
-            
+            if self.show_profiler:
+                self.renderer.render_profiler_overlay(self.profiler)
+                
+            self.renderer.present()
+            if self.measure_startup:
+                self._lap('first_frame')
+                print(self.startup_report())
+                self.running = False
+            elif profiling:
+                self.profiler.call('tick', self.clock.tick, FPS)
+            elif self.idle and not self.animating:
+                self._wait_for_input()
+            else:
+                self.clock.tick(FPS)
+            self.frame += 1
+                
+        if self.recorder is not None:
+            save_recording(self.record_path, self.recorder.recording(self.sim))
+        if self.publisher is not None:
+            self.publisher.close()
+        if self.telemetry is not None:
+            self.telemetry.close()
+        if self.profile_dump:
+            self.profiler.dump(self.profile_dump)
         pygame.quit()
         sys.exit()
 
 if __name__ == "__main__":
-    game = Game()
+    parser = argparse.ArgumentParser(description="Miner Tribute - Enhanced Edition")
+    parser.add_argument('--seed', type=int, help="seed for the mine layout")
+    parser.add_argument('--profile', action='store_true', help="record frame timings from the start (F3 shows them)")
+    parser.add_argument('--profile-dump', metavar='PATH', help="write the recorded frame timings as CSV on exit")
+    parser.add_argument('--record', metavar='PATH', help="record the seed and every input for replay.py")
+    parser.add_argument('--depth', type=int, metavar='ROWS',
+                        help="play a mine this many rows deep, generated in chunks as you dig")
+    parser.add_argument('--no-idle', dest='idle', action='store_false',
+                        help="draw every frame even when nothing changes")
+    parser.add_argument('--measure-startup', action='store_true',
+                        help="print how long each startup phase took and quit after the first frame")
+    parser.add_argument('--telemetry', metavar='PATH', help="record gameplay events to PATH for telemetry.py")
+    parser.add_argument('--share', metavar='NAME',
+                        help="publish the live game state in shared memory under NAME (see shared_state.py)")
+    args = parser.parse_args()
+    if args.share and args.depth:
+        parser.error("--share needs a whole mine and cannot be used with --depth")
+    
+    game = Game(args.seed, profile=args.profile or bool(args.profile_dump), profile_dump=args.profile_dump,
+                record=args.record, mine=ChunkedMine(height=args.depth) if args.depth else None,
+                idle=args.idle, share=args.share, measure_startup=args.measure_startup,
+                telemetry=args.telemetry)
     game.run()
\ No newline at end of file
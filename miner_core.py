@@ -0,0 +1,1445 @@
+import numpy as np
+import random
+from collections import OrderedDict
+from enum import Enum, IntEnum
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Callable, Dict, FrozenSet, Iterator, List, Sequence, Tuple, Optional
+
+# Constants
+GRID_WIDTH = 39
+GRID_HEIGHT = 114
+
+# Colors
+class Colors:
+    DIRT = (139, 69, 19)
+    EMPTY = (0, 0, 0)
+    SILVER = (192, 192, 192)
+    GOLD = (255, 215, 0)
+    PLATINUM = (229, 228, 226)
+    DIAMOND = (0, 255, 255)
+    GRANITE = (128, 128, 128)
+    WATER = (0, 0, 255)
+    SPRING = (0, 255, 0)
+    SANDSTONE = (244, 164, 96)
+    VOLCANIC = (255, 0, 0)
+    CLOVER = (0, 128, 0)
+    PUMP = (128, 0, 128)
+    RING = (255, 255, 0)
+    PLAYER = (255, 255, 255)
+    TOWN_BG = (100, 100, 100)
+    WHITE = (255, 255, 255)
+    BLACK = (0, 0, 0)
+    RED = (255, 0, 0)
+    GREEN = (0, 255, 0)
+    YELLOW = (255, 255, 0)
+    GRAY = (100, 100, 100)
+
+# Tile types
+class TileType(Enum):
+    DIRT = 0
+    EMPTY = 1
+    SILVER = 2
+    GOLD = 3
+    PLATINUM = 4
+    DIAMOND = 5
+    GRANITE = 6
+    WATER = 7
+    SPRING = 8
+    SANDSTONE = 9
+    VOLCANIC = 10
+    CLOVER = 11
+    PUMP = 12
+    RING = 13
+
+# Tile types indexed by their id, for converting grid values back to TileType
+TILE_TYPES: Tuple[TileType, ...] = tuple(TileType)
+
+# Display color of each tile type once revealed
+TILE_COLORS: Dict[TileType, Tuple[int, int, int]] = {
+    TileType.DIRT: Colors.DIRT,
+    TileType.EMPTY: Colors.EMPTY,
+    TileType.SILVER: Colors.SILVER,
+    TileType.GOLD: Colors.GOLD,
+    TileType.PLATINUM: Colors.PLATINUM,
+    TileType.DIAMOND: Colors.DIAMOND,
+    TileType.GRANITE: Colors.GRANITE,
+    TileType.WATER: Colors.WATER,
+    TileType.SPRING: Colors.SPRING,
+    TileType.SANDSTONE: Colors.SANDSTONE,
+    TileType.VOLCANIC: Colors.VOLCANIC,
+    TileType.CLOVER: Colors.CLOVER,
+    TileType.PUMP: Colors.PUMP,
+    TileType.RING: Colors.RING,
+}
+
+# TILE_COLORS as a lookup table indexed by tile id
+TILE_PALETTE = np.array([TILE_COLORS[tile_type] for tile_type in TILE_TYPES], dtype=np.uint8)
+
+# Equipment
+class Equipment(Enum):
+    SHOVEL = 'shovel'
+    PICK = 'pick'
+    DRILL = 'drill'
+    LANTERN = 'lantern'
+    BUCKET = 'bucket'
+    DYNAMITE = 'dynamite'
+    TORCH = 'torch'
+
+# Buildings
+class Building(Enum):
+    STORE = 0
+    BANK = 1
+    HOSPITAL = 2
+    SALOON = 3
+
+# Mineral veins: (tile type, count, min length, max length, weight)
+VEIN_CONFIGS = [
+    (TileType.SILVER, 15, 1, 6, 10),
+    (TileType.GOLD, 12, 1, 5, 8),
+    (TileType.PLATINUM, 8, 1, 4, 1),
+    (TileType.DIAMOND, 5, 1, 3, 0.1),
+    (TileType.GRANITE, 10, 2, 8, 5),
+    (TileType.WATER, 8, 1, 4, 3),
+    (TileType.SPRING, 6, 1, 3, 2),
+    (TileType.SANDSTONE, 12, 1, 5, 10),
+    (TileType.VOLCANIC, 8, 1, 4, 5),
+    (TileType.CLOVER, 4, 1, 2, 0.5),
+    (TileType.PUMP, 3, 1, 2, 0.5),
+]
+
+# VEIN_CONFIGS expanded to one entry per vein, in generation order
+VEIN_CONFIG_INDEX = np.repeat(np.arange(len(VEIN_CONFIGS)), [cfg[1] for cfg in VEIN_CONFIGS])
+VEIN_TILES = np.repeat([cfg[0].value for cfg in VEIN_CONFIGS], [cfg[1] for cfg in VEIN_CONFIGS])
+VEIN_MIN_LENGTHS = np.repeat([cfg[2] for cfg in VEIN_CONFIGS], [cfg[1] for cfg in VEIN_CONFIGS])
+VEIN_MAX_LENGTHS = np.repeat([cfg[3] for cfg in VEIN_CONFIGS], [cfg[1] for cfg in VEIN_CONFIGS])
+VEIN_WEIGHTS = np.repeat([cfg[4] for cfg in VEIN_CONFIGS], [cfg[1] for cfg in VEIN_CONFIGS])
+
+# Vein directions as (dx, dy): horizontal, vertical, diagonal
+VEIN_DIRECTIONS = np.array([(1, 0), (0, 1), (1, 1)], dtype=np.int32)
+
+def seeded_uniforms(seeds: Sequence[int], count: int) -> np.ndarray:
+    """Return an (len(seeds), count) array of uniform floats in [0, 1)
+    
+    Row `i` depends only on `seeds[i]`, so a batch reproduces exactly what
+    each seed gives on its own. Uses a counter-based SplitMix64 hash, which
+    lets every row be computed at once instead of seeding a generator per mine.
+    """
+    def mix(z: np.ndarray) -> np.ndarray:
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+        
+    gamma = np.uint64(0x9E3779B97F4A7C15)
+    keys = mix(np.asarray(seeds, dtype=np.uint64) + gamma)
+    counters = np.arange(1, count + 1, dtype=np.uint64) * gamma
+    bits = mix(keys[:, None] + counters[None, :])
+    return (bits >> np.uint64(11)) * (1.0 / (1 << 53))
+
+@dataclass
+class TileData:
+    """Data class for tile information"""
+    type: TileType
+    color: Tuple[int, int, int]
+    dig_cost: int
+    value: int
+    revealed: bool = False
+
+@dataclass
+class EquipmentData:
+    """Data class for equipment information"""
+    name: str
+    cost: int
+    description: str
+    effect: str
+
+class GameState(Enum):
+    TOWN = "town"
+    MINE = "mine"
+    MENU = "menu"
+    GAME_OVER = "game_over"
+    VICTORY = "victory"
+
+class Player:
+    """Player class to manage player state and actions"""
+    
+    def __init__(self):
+        self.money = 1500
+        self.health = 100
+        self.max_health = 100
+        self.inventory: Dict[Equipment, bool] = {}
+        self.minerals: Dict[str, int] = {
+            'silver': 0, 
+            'gold': 0, 
+            'platinum': 0, 
+            'diamonds': 0
+        }
+        self.has_ring = False
+        self.position = (GRID_WIDTH // 2, 0)
+        self.camera_y = 0
+        
+    def add_money(self, amount: int) -> None:
+        """Add money to player's account"""
+        self.money += amount
+        
+    def spend_money(self, amount: int) -> bool:
+        """Spend money if player has enough"""
+        if self.money >= amount:
+            self.money -= amount
+            return True
+        return False
+        
+    def take_damage(self, amount: int) -> None:
+        """Take damage and ensure health doesn't go below 0"""
+        self.health = max(0, self.health - amount)
+        
+    def heal(self, amount: int) -> None:
+        """Heal player up to max health"""
+        self.health = min(self.max_health, self.health + amount)
+        
+    def has_equipment(self, equipment: Equipment) -> bool:
+        """Check if player has specific equipment"""
+        return equipment in self.inventory
+        
+    def add_equipment(self, equipment: Equipment) -> None:
+        """Add equipment to inventory"""
+        self.inventory[equipment] = True
+        
+    def remove_equipment(self, equipment: Equipment) -> None:
+        """Remove used-up equipment from inventory"""
+        self.inventory.pop(equipment, None)
+        
+    def add_mineral(self, mineral_type: str, amount: int) -> None:
+        """Add minerals to inventory"""
+        if mineral_type in self.minerals:
+            self.minerals[mineral_type] += amount
+            
+    def clear_minerals(self) -> None:
+        """Clear all minerals from inventory"""
+        self.minerals = {k: 0 for k in self.minerals}
+        
+    def get_total_mineral_value(self) -> int:
+        """Calculate total value of minerals"""
+        # This would be calculated with current market rates
+        return sum(self.minerals.values()) * 10  # Simplified
+
+class BlastShape(Enum):
+    SQUARE = 'square'
+    DIAMOND = 'diamond'
+    CIRCLE = 'circle'
+
+@dataclass(frozen=True)
+class Blast:
+    """An area effect: which tiles around its centre it reaches and what it does to them
+    
+    Reached tiles become `fill`, except those of a type in `resists`. A
+    player inside the reach takes `damage`. With `chains`, VOLCANIC tiles it
+    destroys set off a VOLCANIC_BLAST of their own and destroyed springs
+    burst, flooding the open tiles around them.
+    """
+    radius: int
+    shape: BlastShape = BlastShape.CIRCLE
+    fill: TileType = TileType.EMPTY
+    resists: FrozenSet[TileType] = frozenset()
+    damage: int = 0
+    chains: bool = False
+    
+    @cached_property
+    def footprint(self) -> np.ndarray:
+        """(2r + 1, 2r + 1) mask of the tiles reached, centred on the blast"""
+        r = self.radius
+        dy, dx = np.mgrid[-r:r + 1, -r:r + 1]
+        if self.shape is BlastShape.SQUARE:
+            return np.ones(dx.shape, dtype=bool)
+        if self.shape is BlastShape.DIAMOND:
+            return np.abs(dx) + np.abs(dy) <= r
+        return dx * dx + dy * dy <= r * r + r
+        
+    @cached_property
+    def breaks(self) -> np.ndarray:
+        """Lookup by tile id of the tile types this blast destroys"""
+        table = np.ones(len(TILE_TYPES), dtype=bool)
+        table[[tile_type.value for tile_type in self.resists]] = False
+        return table
+        
+    def covers(self, cx: int, cy: int, x: int, y: int) -> bool:
+        """Whether a blast centred on (cx, cy) reaches (x, y)"""
+        r = self.radius
+        return abs(x - cx) <= r and abs(y - cy) <= r and bool(self.footprint[y - cy + r, x - cx + r])
+
+# Dynamite goes off DYNAMITE_RANGE tiles ahead of the player
+DYNAMITE_BLAST = Blast(2, BlastShape.CIRCLE, resists=frozenset({TileType.GRANITE, TileType.RING}),
+                       damage=40, chains=True)
+DYNAMITE_RANGE = 3
+
+# Set off by blasts reaching VOLCANIC tiles
+VOLCANIC_BLAST = Blast(1, BlastShape.DIAMOND, resists=frozenset({TileType.GRANITE, TileType.RING}),
+                       damage=20, chains=True)
+
+# Cave-ins bury a 3x3 or 5x5 square, by size
+CAVE_IN_BLASTS = {
+    3: Blast(1, BlastShape.SQUARE, fill=TileType.DIRT, damage=30),
+    5: Blast(2, BlastShape.SQUARE, fill=TileType.DIRT, damage=30),
+}
+
+@dataclass
+class BlastResult:
+    """What a blast and every blast it set off did to the mine"""
+    blasts: List[Tuple[int, int, Blast]]
+    destroyed: Dict[TileType, int]
+    
+    def damage_at(self, x: int, y: int) -> int:
+        """Damage taken at (x, y) from every blast that reached it"""
+        return sum(blast.damage for cx, cy, blast in self.blasts if blast.covers(cx, cy, x, y))
+
+class MineGenerator:
+    """Handles mine generation and tile management
+
+    The grid is stored as a ``uint8`` array of ``TileType`` values indexed
+    ``[y, x]`` and the fog-of-war as a parallel boolean array, so callers that
+    work on whole regions can slice them directly instead of going tile by tile.
+    """
+    
+    def __init__(self, width: int = GRID_WIDTH, height: int = GRID_HEIGHT):
+        self.width = width
+        self.height = height
+        self.grid = np.full((height, width), TileType.DIRT.value, dtype=np.uint8)
+        self.revealed = np.zeros((height, width), dtype=bool)
+        self.tile_data = self._create_tile_data()
+        self.ring_position = (0, 0)
+        self.seed: Optional[int] = None
+        self._listeners: List[Callable[[int, int, int, int], None]] = []
+        
+    def _create_tile_data(self) -> Dict[TileType, TileData]:
+        """Create tile data dictionary"""
+        return {
+            TileType.DIRT: TileData(TileType.DIRT, Colors.DIRT, 20, 0),
+            TileType.EMPTY: TileData(TileType.EMPTY, Colors.EMPTY, 0, 0),
+            TileType.SILVER: TileData(TileType.SILVER, Colors.SILVER, 20, 15),
+            TileType.GOLD: TileData(TileType.GOLD, Colors.GOLD, 20, 50),
+            TileType.PLATINUM: TileData(TileType.PLATINUM, Colors.PLATINUM, 20, 250),
+            TileType.DIAMOND: TileData(TileType.DIAMOND, Colors.DIAMOND, 20, 1000),
+            TileType.GRANITE: TileData(TileType.GRANITE, Colors.GRANITE, 150, 0),
+            TileType.WATER: TileData(TileType.WATER, Colors.WATER, 150, 0),
+            TileType.SPRING: TileData(TileType.SPRING, Colors.SPRING, 20, 0),
+            TileType.SANDSTONE: TileData(TileType.SANDSTONE, Colors.SANDSTONE, 10, 0),
+            TileType.VOLCANIC: TileData(TileType.VOLCANIC, Colors.VOLCANIC, 30, 0),
+            TileType.CLOVER: TileData(TileType.CLOVER, Colors.CLOVER, 20, 0),
+            TileType.PUMP: TileData(TileType.PUMP, Colors.PUMP, 20, 0),
+            TileType.RING: TileData(TileType.RING, Colors.RING, 20, 0),
+        }
+        
+    def generate_mine(self, seed: Optional[int] = None) -> None:
+        """Generate the mine with random mineral deposits
+        
+        The same seed always produces the same mine. Without a seed a fresh
+        one is drawn and kept in `self.seed` so the mine can be recreated.
+        """
+        if seed is None:
+            seed = random.getrandbits(63)
+        self.seed = seed
+        
+        grids, rings = self._generate_grids([seed])
+        self.grid = grids[0]
+        self.revealed = np.zeros((self.height, self.width), dtype=bool)
+        self.ring_position = rings[0]
+        self._notify(0, 0, self.width, self.height)
+        
+    def restore(self, grid: np.ndarray, revealed: np.ndarray, ring_position: Tuple[int, int],
+                seed: Optional[int] = None) -> None:
+        """Replace the mine's contents, e.g. from a save, and notify listeners"""
+        self.height, self.width = grid.shape
+        self.grid = grid
+        self.revealed = revealed
+        self.ring_position = ring_position
+        self.seed = seed
+        self._notify(0, 0, self.width, self.height)
+        
+    def generate_batch(self, n: int, seeds: Optional[Sequence[int]] = None) -> np.ndarray:
+        """Generate `n` mines at once and return them as an (n, height, width) array
+        
+        Mine `i` is identical to the grid `generate_mine(seeds[i])` produces;
+        its ring is the single RING tile in the grid. This instance's own
+        grid is left untouched.
+        """
+        if seeds is None:
+            seeds = [random.getrandbits(63) for _ in range(n)]
+        elif len(seeds) != n:
+            raise ValueError(f"Expected {n} seeds, got {len(seeds)}")
+            
+        grids, _ = self._generate_grids(seeds)
+        return grids
+        
+    def _generate_grids(self, seeds: Sequence[int], height: Optional[int] = None,
+                        place_ring: bool = True) -> Tuple[np.ndarray, List[Tuple[int, int]]]:
+        """Generate one grid per seed, returning the stacked grids and ring positions
+        
+        `height` defaults to the mine's; without `place_ring` no ring is
+        placed and the ring positions list is empty.
+        """
+        height = self.height if height is None else height
+        n = len(seeds)
+        count = len(VEIN_TILES)
+        uniforms = seeded_uniforms(seeds, 5 * count + 2)
+        
+        # Every mine draws from its own seed: per vein (placed, x, y, length,
+        # direction), then the ring position
+        draws = uniforms[:, :5 * count].reshape(n, 5, count)
+        veins = np.empty((n, 5, count), dtype=np.int32)
+        veins[:, 0] = draws[:, 0] <= VEIN_WEIGHTS / 10  # Weight-based probability
+        veins[:, 1] = draws[:, 1] * self.width
+        veins[:, 2] = draws[:, 2] * height
+        veins[:, 3] = VEIN_MIN_LENGTHS + draws[:, 3] * (VEIN_MAX_LENGTHS - VEIN_MIN_LENGTHS + 1)
+        veins[:, 4] = draws[:, 4] * len(VEIN_DIRECTIONS)
+        
+        grids = np.full((n, height, self.width), TileType.DIRT.value, dtype=np.uint8)
+        self._generate_mineral_veins(grids, veins)
+        if not place_ring:
+            return grids, []
+            
+        # Place ring in a random deep location, last so no vein can cover it
+        ring_top = min(50, height - 1)
+        ring_x = (uniforms[:, -2] * self.width).astype(np.int64)
+        ring_y = ring_top + (uniforms[:, -1] * (height - ring_top)).astype(np.int64)
+        grids[np.arange(n), ring_y, ring_x] = TileType.RING.value
+        
+        return grids, list(zip(ring_x.tolist(), ring_y.tolist()))
+        
+    def _generate_mineral_veins(self, grids: np.ndarray, veins: np.ndarray) -> None:
+        """Write every vein of every mine into `grids` with array operations"""
+        n, height, width = grids.shape
+        mine_index, vein_index = np.nonzero(veins[:, 0])
+        start_x, start_y, lengths, directions = veins[mine_index, 1:, vein_index].T
+        
+        # Expand placed veins to one entry per cell, in generation order
+        first_cell = (mine_index * height + start_y) * width + start_x
+        stride = VEIN_DIRECTIONS[directions, 1] * width + VEIN_DIRECTIONS[directions, 0]
+        steps = np.arange(lengths.sum(), dtype=np.int32) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        xs = np.repeat(start_x, lengths) + np.repeat(VEIN_DIRECTIONS[directions, 0], lengths) * steps
+        ys = np.repeat(start_y, lengths) + np.repeat(VEIN_DIRECTIONS[directions, 1], lengths) * steps
+        inside = (xs < width) & (ys < height)
+        cells = (np.repeat(first_cell, lengths) + np.repeat(stride, lengths) * steps)[inside]
+        cell_vein = np.repeat(vein_index, lengths)[inside]
+        
+        # Later veins overwrite earlier ones. Veins from the same config share a
+        # tile type, so writing config by config keeps that order well defined
+        config = VEIN_CONFIG_INDEX[cell_vein]
+        order = np.argsort(config, kind='stable')
+        bounds = np.searchsorted(config[order], np.arange(len(VEIN_CONFIGS) + 1))
+        flat = grids.reshape(-1)
+        for i, (tile_type, *_) in enumerate(VEIN_CONFIGS):
+            flat[cells[order[bounds[i]:bounds[i + 1]]]] = tile_type.value
+        
+    def in_bounds(self, x: int, y: int) -> bool:
+        """Check if a position lies inside the mine"""
+        return 0 <= x < self.width and 0 <= y < self.height
+        
+    def get_tile(self, x: int, y: int) -> TileType:
+        """Get tile type at position"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return TILE_TYPES[self.grid.item(y, x)]
+        return TileType.DIRT
+        
+    def get_tile_id(self, x: int, y: int) -> int:
+        """Get raw tile id at position"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.grid.item(y, x)
+        return TileType.DIRT.value
+        
+    def set_tile(self, x: int, y: int, tile_type: TileType) -> None:
+        """Set tile type at position"""
+        if 0 <= x < self.width and 0 <= y < self.height and self.grid.item(y, x) != tile_type.value:
+            self.grid[y, x] = tile_type.value
+            self._notify(x, y, x + 1, y + 1)
+            
+    def reveal_tile(self, x: int, y: int) -> None:
+        """Reveal a tile"""
+        if 0 <= x < self.width and 0 <= y < self.height and not self.revealed.item(y, x):
+            self.revealed[y, x] = True
+            self._notify(x, y, x + 1, y + 1)
+            
+    def is_revealed(self, x: int, y: int) -> bool:
+        """Check if tile is revealed"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.revealed.item(y, x)
+        return False
+        
+    def clip_region(self, x0: int, y0: int, x1: int, y1: int) -> Tuple[int, int, int, int]:
+        """Clip a half-open region [x0, x1) x [y0, y1) to the grid"""
+        return (max(0, x0), max(0, y0), min(self.width, x1), min(self.height, y1))
+        
+    def get_rows(self, y0: int, y1: int) -> np.ndarray:
+        """Get a view of the tile ids in rows [y0, y1)"""
+        return self.grid[max(0, y0):min(self.height, y1)]
+        
+    def get_region(self, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+        """Get a view of the tile ids in a rectangle, clipped to the grid"""
+        x0, y0, x1, y1 = self.clip_region(x0, y0, x1, y1)
+        return self.grid[y0:y1, x0:x1]
+        
+    def get_revealed_region(self, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+        """Get a view of the revealed mask in a rectangle, clipped to the grid"""
+        x0, y0, x1, y1 = self.clip_region(x0, y0, x1, y1)
+        return self.revealed[y0:y1, x0:x1]
+        
+    def tile_mask(self, tile_type: TileType) -> np.ndarray:
+        """Get a boolean mask of every tile of the given type"""
+        return self.grid == tile_type.value
+        
+    def fill_region(self, x0: int, y0: int, x1: int, y1: int, tile_type: TileType,
+                    where: Optional[TileType] = None) -> None:
+        """Fill a rectangle with a tile type, optionally only over tiles of type `where`"""
+        x0, y0, x1, y1 = self.clip_region(x0, y0, x1, y1)
+        region = self.grid[y0:y1, x0:x1]
+        if where is None:
+            region[...] = tile_type.value
+        else:
+            region[region == where.value] = tile_type.value
+        self._notify(x0, y0, x1, y1)
+            
+    def set_region(self, x0: int, y0: int, tiles: np.ndarray, reveal: Optional[np.ndarray] = None) -> None:
+        """Write a block of tile ids with its top-left corner at (x0, y0), notifying listeners once
+        
+        Tiles where the optional `reveal` mask is set are revealed as well.
+        """
+        height, width = tiles.shape
+        self.grid[y0:y0 + height, x0:x0 + width] = tiles
+        if reveal is not None:
+            self.revealed[y0:y0 + height, x0:x0 + width] |= reveal
+        self._notify(x0, y0, x0 + width, y0 + height)
+        
+    def reveal_region(self, x0: int, y0: int, x1: int, y1: int,
+                      mask: Optional[np.ndarray] = None) -> None:
+        """Reveal a rectangle, optionally only where `mask` is set"""
+        x0, y0, x1, y1 = self.clip_region(x0, y0, x1, y1)
+        region = self.revealed[y0:y1, x0:x1]
+        if mask is None:
+            region[...] = True
+        else:
+            region |= mask
+        self._notify(x0, y0, x1, y1)
+        
+    def add_listener(self, listener: Callable[[int, int, int, int], None]) -> None:
+        """Call `listener(x0, y0, x1, y1)` whenever tiles or fog in that region change"""
+        self._listeners.append(listener)
+        
+    def remove_listener(self, listener: Callable[[int, int, int, int], None]) -> None:
+        """Stop notifying a listener"""
+        self._listeners.remove(listener)
+        
+    def _notify(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        """Tell listeners that the half-open region [x0, x1) x [y0, y1) changed"""
+        if x0 < x1 and y0 < y1:
+            for listener in self._listeners:
+                listener(x0, y0, x1, y1)
+        
+    def flood_area(self, x: int, y: int) -> None:
+        """Flood area around a spring"""
+        self.fill_region(x - 1, y - 1, x + 2, y + 2, TileType.WATER, where=TileType.EMPTY)
+                    
+    def cave_in(self, x: int, y: int, rng: Optional[random.Random] = None) -> BlastResult:
+        """Create a cave-in at position"""
+        return self.blast(x, y, CAVE_IN_BLASTS[(rng or random).choice([3, 5])])
+        
+    def blast(self, x: int, y: int, blast: Blast) -> BlastResult:
+        """Set off a blast at (x, y), with its chain reactions, as one batched change
+        
+        Every blast in the chain is found first, then all of them are applied
+        to one block of tiles, which is written back with a single
+        notification. Tiles blasted open are revealed.
+        """
+        # Follow the chain: VOLCANIC tiles reached by a chaining blast go off too
+        blasts = []
+        pending = [(x, y, blast)]
+        triggered = {(x, y)}
+        while pending:
+            cx, cy, current = pending.pop()
+            blasts.append((cx, cy, current))
+            if not current.chains:
+                continue
+            region, reach = self._blast_reach(cx, cy, current)
+            tiles = self.get_region(*region)
+            ys, xs = np.nonzero(reach & (tiles == TileType.VOLCANIC.value))
+            for vx, vy in zip((xs + region[0]).tolist(), (ys + region[1]).tolist()):
+                if (vx, vy) not in triggered:
+                    triggered.add((vx, vy))
+                    pending.append((vx, vy, VOLCANIC_BLAST))
+                    
+        # One block covering every blast and the floods around it
+        x0, y0, x1, y1 = self.width, self.height, 0, 0
+        for cx, cy, current in blasts:
+            r = current.radius + 1
+            x0, y0 = min(x0, cx - r), min(y0, cy - r)
+            x1, y1 = max(x1, cx + r + 1), max(y1, cy + r + 1)
+        x0, y0, x1, y1 = self.clip_region(x0, y0, x1, y1)
+        before = self.get_region(x0, y0, x1, y1)
+        after = before.copy()
+        struck = np.zeros(before.shape, dtype=bool)
+        opened = burst = None
+        for cx, cy, current in blasts:
+            (rx0, ry0, rx1, ry1), reach = self._blast_reach(cx, cy, current)
+            window = (slice(ry0 - y0, ry1 - y0), slice(rx0 - x0, rx1 - x0))
+            hit = reach & current.breaks[before[window]]
+            after[window][hit] = current.fill.value
+            struck[window] |= hit
+            if current.fill is TileType.EMPTY:
+                if opened is None:
+                    opened = np.zeros(before.shape, dtype=bool)
+                opened[window] |= hit
+            if current.chains:
+                if burst is None:
+                    burst = np.zeros(before.shape, dtype=bool)
+                burst[window] |= hit & (before[window] == TileType.SPRING.value)
+                
+        # Destroyed springs flood the open tiles around them, as when dug
+        if burst is not None and burst.any():
+            flooded = burst.copy()
+            flooded[1:] |= burst[:-1]
+            flooded[:-1] |= burst[1:]
+            flooded[:, 1:] |= flooded[:, :-1].copy()
+            flooded[:, :-1] |= flooded[:, 1:].copy()
+            after[flooded & (after == TileType.EMPTY.value)] = TileType.WATER.value
+            
+        changed = after != before
+        counts = np.bincount(before[changed & struck], minlength=len(TILE_TYPES))
+        destroyed = {TILE_TYPES[tile_id]: int(counts[tile_id]) for tile_id in np.flatnonzero(counts).tolist()}
+        reveal = None
+        if opened is not None:
+            reveal = opened & ~self.get_revealed_region(x0, y0, x1, y1)
+            changed |= reveal
+        ys, xs = np.nonzero(changed)
+        if len(ys):
+            bx0, by0, bx1, by1 = int(xs.min()), int(ys.min()), int(xs.max()) + 1, int(ys.max()) + 1
+            if reveal is not None:
+                reveal = reveal[by0:by1, bx0:bx1]
+            self.set_region(x0 + bx0, y0 + by0, after[by0:by1, bx0:bx1], reveal)
+        return BlastResult(blasts, destroyed)
+        
+    def _blast_reach(self, cx: int, cy: int, blast: Blast) -> Tuple[Tuple[int, int, int, int], np.ndarray]:
+        """The region a blast centred on (cx, cy) covers, clipped to the grid, and its footprint there"""
+        r = blast.radius
+        x0, y0, x1, y1 = self.clip_region(cx - r, cy - r, cx + r + 1, cy + r + 1)
+        return (x0, y0, x1, y1), blast.footprint[y0 - cy + r:y1 - cy + r, x0 - cx + r:x1 - cx + r]
+
+# Water levels: a WATER tile holds up to WATER_FULL with open tiles above it,
+# and each tile further down a flooded column WATER_COMPRESS more. The extra
+# in deep water is its pressure, which pushes water along tunnels and up
+# the far side of a U-bend. Levels never exceed WATER_MAX.
+WATER_FULL = 256
+WATER_COMPRESS = 4
+WATER_MAX = np.iinfo(np.uint16).max
+
+# Each tick a tile passes this fraction of its level difference to each
+# lower tile beside it, so neighbouring levels settle within 2 of each other
+WATER_SPREAD = 3
+
+# Water does not spread or rise thinner than this; any less that a pump
+# leaves behind soaks into the ground
+WATER_TRACE = WATER_FULL // 16
+
+# Water an exposed spring adds per tick to each open tile below or beside
+# it, until that tile reaches SPRING_HEAD
+SPRING_FLOW = WATER_FULL // 4
+SPRING_HEAD = 2 * WATER_FULL
+
+# Water a pump removes per tick from each tile around it
+PUMP_DRAIN = WATER_FULL
+
+# Levels are stored in pages of this many mine rows, kept only while some
+# tile in them holds other than a full tile's worth
+LEVEL_PAGE_ROWS = 64
+
+class WaterFlow:
+    """Water flowing through the mine's tunnels, advanced one tick at a time
+    
+    Every WATER tile holds a level (see WATER_FULL). Each tick water settles
+    between open (EMPTY or WATER) tiles stacked above each other, then
+    evens out with the open tiles beside it. Exposed springs add water below
+    and beside them and pumps drain the tiles around them. Tiles that run
+    dry become EMPTY and open tiles that receive water become WATER.
+    
+    Only the bounding box of what changed on the last tick, or in the mine
+    since, is worked on, with whole-array operations, so settled water
+    costs nothing and a flooding mine at most one pass over the grid. It
+    goes through the region accessors and works on chunked mines too.
+    
+    Levels are kept here rather than in the mine: water tiles that appear
+    from outside (generation, saves, `flood_area`) are full, and a new or
+    restored mine starts out settled. Only pages of LEVEL_PAGE_ROWS rows
+    where some water is not full are stored, so memory follows the water
+    that has moved rather than the depth of the mine.
+    """
+    
+    def __init__(self, mine: MineGenerator):
+        self.mine = mine
+        # Page index to (LEVEL_PAGE_ROWS, width) levels; 0 on a WATER tile means full
+        self._pages: Dict[int, np.ndarray] = {}
+        self._active: Optional[Tuple[int, int, int, int]] = None
+        self._writing = False
+        mine.add_listener(self._on_change)
+        
+    def close(self) -> None:
+        """Stop following the mine"""
+        self.mine.remove_listener(self._on_change)
+        
+    @property
+    def settled(self) -> bool:
+        """Whether no water can move until the mine changes"""
+        return self._active is None
+        
+    def level(self, x: int, y: int) -> int:
+        """Water level of a tile, 0 when it holds no water"""
+        if self.mine.get_tile_id(x, y) != TileType.WATER.value:
+            return 0
+        page = self._pages.get(y // LEVEL_PAGE_ROWS)
+        return (page.item(y % LEVEL_PAGE_ROWS, x) if page is not None else 0) or WATER_FULL
+        
+    @staticmethod
+    def _spans(y0: int, y1: int) -> Iterator[Tuple[int, int, int, int, int]]:
+        """For each page rows [y0, y1) reach into: its index, the rows within it, and the same rows counted from y0"""
+        for index in range(y0 // LEVEL_PAGE_ROWS, (y1 - 1) // LEVEL_PAGE_ROWS + 1):
+            top = index * LEVEL_PAGE_ROWS
+            start, end = max(y0, top), min(y1, top + LEVEL_PAGE_ROWS)
+            yield index, start - top, end - top, start - y0, end - y0
+            
+    def _read_levels(self, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+        """Stored levels of a region, as a new array"""
+        levels = np.zeros((y1 - y0, x1 - x0), dtype=np.uint16)
+        for index, start, end, row0, row1 in self._spans(y0, y1):
+            page = self._pages.get(index)
+            if page is not None:
+                levels[row0:row1] = page[start:end, x0:x1]
+        return levels
+        
+    def _write_levels(self, x0: int, y0: int, levels: np.ndarray, where: np.ndarray) -> None:
+        """Store `levels` at the tiles of a region marked in `where`, dropping pages left all full or dry"""
+        x1 = x0 + levels.shape[1]
+        for index, start, end, row0, row1 in self._spans(y0, y0 + len(levels)):
+            mask = where[row0:row1]
+            values = levels[row0:row1][mask]
+            values[values == WATER_FULL] = 0
+            page = self._pages.get(index)
+            if page is None:
+                if not values.any():
+                    continue
+                page = self._pages[index] = np.zeros((LEVEL_PAGE_ROWS, self.mine.width), dtype=np.uint16)
+            page[start:end, x0:x1][mask] = values
+            if not values.all() and not page.any():
+                del self._pages[index]
+        
+    def _activate(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        """Work on a region on the next tick, with the tiles it can affect in one tick"""
+        x0, y0, x1, y1 = self.mine.clip_region(x0 - 2, y0 - 2, x1 + 2, y1 + 2)
+        if self._active is not None:
+            ax0, ay0, ax1, ay1 = self._active
+            x0, y0, x1, y1 = min(x0, ax0), min(y0, ay0), max(x1, ax1), max(y1, ay1)
+        self._active = (x0, y0, x1, y1)
+        
+    def _on_change(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        """Drop the water of tiles replaced from outside and wake the water around them"""
+        if self._writing:
+            return
+        if (x1 - x0) * (y1 - y0) == self.mine.width * self.mine.height:
+            self._pages.clear()
+            self._active = None
+            return
+            
+        if self._pages:
+            tiles = self.mine.get_region(x0, y0, x1, y1)
+            self._write_levels(x0, y0, np.zeros(tiles.shape, dtype=np.uint16), tiles != TileType.WATER.value)
+        self._activate(x0, y0, x1, y1)
+        
+    @staticmethod
+    def _beside(mask: np.ndarray, above: bool) -> np.ndarray:
+        """Tiles below, left and right of (and with `above`, above) any set tile of `mask`"""
+        near = np.zeros_like(mask)
+        near[1:] |= mask[:-1]
+        near[:, :-1] |= mask[:, 1:]
+        near[:, 1:] |= mask[:, :-1]
+        if above:
+            near[:-1] |= mask[1:]
+        return near
+        
+    def tick(self, blocked: Optional[Tuple[int, int]] = None) -> bool:
+        """Advance the water one tick, returning whether any tile filled or ran dry
+        
+        No water flows into the `blocked` tile (the player's).
+        """
+        if self._active is None:
+            return False
+        x0, y0, x1, y1 = self._active
+        self._active = None
+        
+        tiles = self.mine.get_region(x0, y0, x1, y1)
+        water = tiles == TileType.WATER.value
+        springs = tiles == TileType.SPRING.value
+        if not water.any() and not springs.any():
+            return False
+        open_tiles = water | (tiles == TileType.EMPTY.value)
+        if blocked is not None and x0 <= blocked[0] < x1 and y0 <= blocked[1] < y1:
+            open_tiles[blocked[1] - y0, blocked[0] - x0] = False
+        stored = self._read_levels(x0, y0, x1, y1)
+        before = np.where(water, np.where(stored == 0, WATER_FULL, stored), 0).astype(np.int32)
+        level = before.copy()
+        
+        # Settle each pair of stacked tiles: the lower takes everything up to
+        # WATER_FULL and WATER_COMPRESS more than the upper beyond that, and
+        # all of it when less than WATER_TRACE would be left above. Pairs
+        # starting on even mine rows go first, then odd, so no tile is in two
+        # pairs at once and all flows of a pass come from the same levels
+        height = y1 - y0
+        for first in (y0 % 2, 1 - y0 % 2):
+            upper, lower = level[first:height - 1:2], level[first + 1:height:2]
+            paired = open_tiles[first:height - 1:2] & open_tiles[first + 1:height:2]
+            total = upper + lower
+            settled = np.minimum(np.minimum(total, np.maximum(WATER_FULL, (total + WATER_COMPRESS) // 2)), WATER_MAX)
+            settled = np.where(total - settled < WATER_TRACE, np.minimum(total, WATER_MAX), settled)
+            down = np.where(paired, settled - lower, 0)
+            upper -= down
+            lower += down
+            
+        # Even out sideways, never spreading into a dry tile thinner than
+        # WATER_TRACE; `flow` is the net flow from each tile into the one on its right
+        paired = open_tiles[:, :-1] & open_tiles[:, 1:]
+        difference = level[:, :-1] - level[:, 1:]
+        amount = np.abs(difference) // WATER_SPREAD
+        receiving = np.where(difference > 0, level[:, 1:], level[:, :-1])
+        flow = np.where(paired & (receiving + amount >= WATER_TRACE), np.sign(difference) * amount, 0)
+        level[:, :-1] -= flow
+        level[:, 1:] += flow
+        
+        if springs.any():
+            fed = self._beside(springs, above=False) & open_tiles
+            level[fed] = np.maximum(level[fed], np.minimum(level[fed] + SPRING_FLOW, SPRING_HEAD))
+        pumps = tiles == TileType.PUMP.value
+        if pumps.any():
+            drained = self._beside(pumps, above=True)
+            level[drained] = np.maximum(level[drained] - PUMP_DRAIN, 0)
+        level[level < WATER_TRACE] = 0
+        
+        # Levels that came out the same everywhere will keep doing so, even
+        # where water flowed in and out
+        changed = level != before
+        if not changed.any():
+            return False
+        ys, xs = np.nonzero(changed)
+        self._activate(x0 + int(xs.min()), y0 + int(ys.min()), x0 + int(xs.max()) + 1, y0 + int(ys.max()) + 1)
+        self._write_levels(x0, y0, level, changed)
+        
+        # Write the tiles that filled or ran dry back in one batch
+        flipped = changed & ((level > 0) != water)
+        if not flipped.any():
+            return False
+        ys, xs = np.nonzero(flipped)
+        ry0, ry1, rx0, rx1 = int(ys.min()), int(ys.max()) + 1, int(xs.min()), int(xs.max()) + 1
+        block = tiles[ry0:ry1, rx0:rx1].copy()
+        wet = level[ry0:ry1, rx0:rx1] > 0
+        block[flipped[ry0:ry1, rx0:rx1] & wet] = TileType.WATER.value
+        block[flipped[ry0:ry1, rx0:rx1] & ~wet] = TileType.EMPTY.value
+        self._writing = True
+        try:
+            self.mine.set_region(x0 + rx0, y0 + ry0, block)
+        finally:
+            self._writing = False
+        return True
+
+# Tile types the torch shows within its radius, even behind rock
+TREASURE_TILES = frozenset({TileType.SILVER, TileType.GOLD, TileType.PLATINUM, TileType.DIAMOND, TileType.RING})
+
+@dataclass(frozen=True)
+class Light:
+    """A light the player carries: how far it reaches and what it shows
+    
+    Light spreads from the player through `transparent` tiles and lights the
+    first tile beyond them on every line of sight within `radius`. Tiles of
+    a type in `shows` are lit anywhere within the radius.
+    """
+    radius: int
+    transparent: FrozenSet[TileType] = frozenset({TileType.EMPTY})
+    shows: FrozenSet[TileType] = frozenset()
+    
+    @cached_property
+    def clear(self) -> List[bool]:
+        """Whether light passes through each tile id"""
+        return [tile_type in self.transparent for tile_type in TILE_TYPES]
+        
+    @cached_property
+    def disc(self) -> np.ndarray:
+        """(2r + 1, 2r + 1) mask of the tiles within the radius"""
+        r = self.radius
+        dy, dx = np.mgrid[-r:r + 1, -r:r + 1]
+        return dx * dx + dy * dy <= r * r + r
+        
+    @cached_property
+    def shown(self) -> np.ndarray:
+        """Lookup by tile id of the tile types lit out of sight"""
+        table = np.zeros(len(TILE_TYPES), dtype=bool)
+        table[[tile_type.value for tile_type in self.shows]] = True
+        return table
+
+LANTERN_LIGHT = Light(7)
+TORCH_LIGHT = Light(3, shows=TREASURE_TILES)
+
+# Lights the player carries while owning the equipment
+LIGHTS = {Equipment.LANTERN: LANTERN_LIGHT, Equipment.TORCH: TORCH_LIGHT}
+
+# The eight octants as (xx, xy, yx, yy) transforms from octant to mine coordinates
+OCTANTS = [(1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+           (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1)]
+
+class FieldOfView:
+    """Tiles a light lights from a position, by recursive shadowcasting, cached per position
+    
+    Results are kept for the last `max_cached` (position, light) pairs with
+    the tiles they were computed from. When the mine changes, only results
+    whose radius covers the change are checked, and only those whose tiles
+    really changed are dropped, so revealing tiles or water moving out of
+    sight keeps them. Works on chunked mines too.
+    """
+    
+    def __init__(self, mine: MineGenerator, max_cached: int = 256):
+        self.mine = mine
+        self.max_cached = max_cached
+        self._cache: 'OrderedDict[Tuple[int, int, Light], Tuple[int, int, np.ndarray, np.ndarray]]' = OrderedDict()
+        mine.add_listener(self._on_change)
+        
+    def close(self) -> None:
+        """Stop following the mine"""
+        self.mine.remove_listener(self._on_change)
+        
+    def visible(self, x: int, y: int, light: Light) -> Tuple[int, int, np.ndarray]:
+        """Tiles `light` lights from (x, y), as (x0, y0, mask) with the mask's top-left at (x0, y0)"""
+        key = (x, y, light)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached[:3]
+            
+        r = light.radius
+        x0, y0, x1, y1 = self.mine.clip_region(x - r, y - r, x + r + 1, y + r + 1)
+        tiles = self.mine.get_region(x0, y0, x1, y1).copy()
+        lit = self._shadowcast(tiles, x - x0, y - y0, light)
+        disc = light.disc[y0 - y + r:y1 - y + r, x0 - x + r:x1 - x + r]
+        lit |= disc & light.shown[tiles]
+        
+        self._cache[key] = (x0, y0, lit, tiles)
+        if len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+        return x0, y0, lit
+        
+    @staticmethod
+    def _shadowcast(tiles: np.ndarray, cx: int, cy: int, light: Light) -> np.ndarray:
+        """Mask of the tiles seen from (cx, cy) in a block of tiles, within the light's radius"""
+        height, width = tiles.shape
+        clear = light.clear
+        transparent = [clear[tile_id] for tile_id in tiles.ravel().tolist()]
+        radius = light.radius
+        reach = radius * radius + radius
+        lit = [False] * (width * height)
+        lit[cy * width + cx] = True
+        
+        def cast(row: int, start: float, end: float, xx: int, xy: int, yx: int, yy: int) -> None:
+            # Scan rows of the octant outward from `row`, between slopes
+            # `start` and `end`, recursing past each wall that splits the scan
+            if start < end:
+                return
+            for distance in range(row, radius + 1):
+                blocked = False
+                next_start = start
+                dy = -distance
+                for dx in range(-distance, 1):
+                    right = (dx + 0.5) / (dy - 0.5)
+                    if start < right:
+                        continue
+                    left = (dx - 0.5) / (dy + 0.5)
+                    if end > left:
+                        break
+                    x, y = cx + dx * xx + dy * xy, cy + dx * yx + dy * yy
+                    if 0 <= x < width and 0 <= y < height:
+                        index = y * width + x
+                        if dx * dx + dy * dy <= reach:
+                            lit[index] = True
+                        opaque = not transparent[index]
+                    else:
+                        opaque = True
+                    if blocked:
+                        if opaque:
+                            next_start = right
+                        else:
+                            blocked = False
+                            start = next_start
+                    elif opaque and distance < radius:
+                        blocked = True
+                        cast(distance + 1, start, left, xx, xy, yx, yy)
+                        next_start = right
+                if blocked:
+                    return
+                    
+        for octant in OCTANTS:
+            cast(1, 1.0, 0.0, *octant)
+        return np.array(lit, dtype=bool).reshape(height, width)
+        
+    def _on_change(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        """Drop the results lit through tiles that changed"""
+        if (x1 - x0) * (y1 - y0) == self.mine.width * self.mine.height:
+            self._cache.clear()
+            return
+        stale = []
+        for key, (lx0, ly0, lit, tiles) in self._cache.items():
+            ox0, oy0 = max(x0, lx0), max(y0, ly0)
+            ox1, oy1 = min(x1, lx0 + lit.shape[1]), min(y1, ly0 + lit.shape[0])
+            if ox0 < ox1 and oy0 < oy1 and not np.array_equal(
+                    tiles[oy0 - ly0:oy1 - ly0, ox0 - lx0:ox1 - lx0], self.mine.get_region(ox0, oy0, ox1, oy1)):
+                stale.append(key)
+        for key in stale:
+            del self._cache[key]
+
+class TownManager:
+    """Manages town interactions and buildings"""
+    
+    def __init__(self):
+        self.equipment_costs = {
+            Equipment.SHOVEL: 100,
+            Equipment.PICK: 150,
+            Equipment.DRILL: 250,
+            Equipment.LANTERN: 300,
+            Equipment.BUCKET: 200,
+            Equipment.TORCH: 100,
+            Equipment.DYNAMITE: 300,
+        }
+        
+        self.equipment_descriptions = {
+            Equipment.SHOVEL: "Reduces dig cost by 12",
+            Equipment.PICK: "Reduces dig cost by 5",
+            Equipment.DRILL: "Allows digging through granite",
+            Equipment.LANTERN: "Lights up the tunnels around you",
+            Equipment.BUCKET: "Removes water tiles",
+            Equipment.TORCH: "Helps find hidden treasures",
+            Equipment.DYNAMITE: "Explodes large areas",
+        }
+        
+    def buy_equipment(self, player: Player, equipment: Equipment) -> bool:
+        """Buy equipment from store"""
+        if (equipment in self.equipment_costs and 
+            player.spend_money(self.equipment_costs[equipment]) and
+            not player.has_equipment(equipment)):
+            player.add_equipment(equipment)
+            return True
+        return False
+        
+    def sell_minerals(self, player: Player, rng: Optional[random.Random] = None) -> int:
+        """Sell minerals at bank with random rates"""
+        if not any(player.minerals.values()):
+            return 0
+            
+        # Random market rates
+        rng = rng or random
+        rates = {
+            'silver': rng.uniform(9, 20),
+            'gold': rng.uniform(45, 63),
+            'platinum': rng.uniform(225, 279),
+            'diamonds': 1000
+        }
+        
+        total_value = 0
+        for mineral, amount in player.minerals.items():
+            if amount > 0:
+                value = int(amount * rates[mineral])
+                total_value += value
+                
+        player.add_money(total_value)
+        player.clear_minerals()
+        return total_value
+        
+    def heal_player(self, player: Player) -> bool:
+        """Heal player at hospital"""
+        if player.health >= player.max_health:
+            return False
+            
+        cost = (player.max_health - player.health) * 2
+        if player.spend_money(cost):
+            player.heal(player.max_health - player.health)
+            return True
+        return False
+        
+    def saloon_interaction(self, player: Player, option: str) -> str:
+        """Handle saloon interactions"""
+        if player.money < 5000:
+            return "You need $5000 to enter the saloon!"
+            
+        if option == 'audience':
+            if player.money >= 10000:
+                player.heal(2)
+                return "You enjoyed the show and feel better!"
+            else:
+                return "You need $10000 for the audience!"
+        elif option == 'night':
+            if player.has_equipment(Equipment.SHOVEL):  # Using shovel as condom substitute
+                player.heal(10)
+                return "You had a good night!"
+            else:
+                player.take_damage(20)
+                return "You caught something! Take damage!"
+        return "Invalid option!"
+
+# Player actions understood by Simulation.step
+class Action(IntEnum):
+    MOVE_LEFT = 0
+    MOVE_RIGHT = 1
+    MOVE_UP = 2
+    MOVE_DOWN = 3
+    TELEPORT = 4
+    LEAVE_MINE = 5
+    ENTER_MINE = 6
+    BUY_SHOVEL = 7
+    BUY_PICK = 8
+    BUY_DRILL = 9
+    BUY_LANTERN = 10
+    BUY_BUCKET = 11
+    BUY_TORCH = 12
+    BUY_DYNAMITE = 13
+    SELL = 14
+    HEAL = 15
+    SALOON = 16
+    RESTART = 17
+    DYNAMITE = 18
+
+MOVE_DELTAS: Dict[Action, Tuple[int, int]] = {
+    Action.MOVE_LEFT: (-1, 0),
+    Action.MOVE_RIGHT: (1, 0),
+    Action.MOVE_UP: (0, -1),
+    Action.MOVE_DOWN: (0, 1),
+}
+
+BUY_ACTIONS: Dict[Action, Equipment] = {
+    Action.BUY_SHOVEL: Equipment.SHOVEL,
+    Action.BUY_PICK: Equipment.PICK,
+    Action.BUY_DRILL: Equipment.DRILL,
+    Action.BUY_LANTERN: Equipment.LANTERN,
+    Action.BUY_BUCKET: Equipment.BUCKET,
+    Action.BUY_TORCH: Equipment.TORCH,
+    Action.BUY_DYNAMITE: Equipment.DYNAMITE,
+}
+
+# Gameplay events Simulation reports to its telemetry recorder (see telemetry.py),
+# each with an item and a value whose meaning depends on the event
+class Event(IntEnum):
+    DIG = 0        # item: tile type dug, value: price paid
+    REWARD = 1     # item: tile type collected, value: minerals gained
+    CAVE_IN = 2    # value: damage taken
+    FLOOD = 3      # value: damage taken from the spring
+    PURCHASE = 4   # item: index into EQUIPMENT, value: price paid
+    SALE = 5       # value: payout
+    HEAL = 6       # value: price paid
+    DEATH = 7      # item: index into DAMAGE_CAUSES of the last damage taken
+
+EQUIPMENT = list(Equipment)
+DAMAGE_CAUSES = [None, 'spring', 'cave_in', 'dynamite']
+
+# Cost of taking the elevator down into the mine
+ELEVATOR_COST = 30
+
+# Simulation ticks per second of game time
+TICK_RATE = 10
+
+class RandomStreams:
+    """Independent random number streams for one game, derived from its seed
+    
+    Each kind of randomness draws from its own stream, so the same seed and
+    actions always replay identically and, say, an extra cave-in roll never
+    shifts the market rates.
+    """
+    
+    NAMES = ('mine', 'market', 'cave_in', 'rewards')
+    
+    def __init__(self, seed: int):
+        self.seed = seed
+        self.mine = random.Random(f"{seed}:mine")
+        self.market = random.Random(f"{seed}:market")
+        self.cave_in = random.Random(f"{seed}:cave_in")
+        self.rewards = random.Random(f"{seed}:rewards")
+        
+    def getstate(self) -> Dict[str, tuple]:
+        """State of every stream, by name"""
+        return {name: getattr(self, name).getstate() for name in self.NAMES}
+        
+    def setstate(self, state: Dict[str, tuple]) -> None:
+        """Restore states returned by `getstate`"""
+        for name in self.NAMES:
+            getattr(self, name).setstate(state[name])
+
+class Simulation:
+    """Headless game rules, advanced one action at a time
+    
+    Owns the player, mine and town and applies every game rule without any
+    display or input handling, so it can run as fast as the CPU allows.
+    Actions come from the player; `tick` advances everything that moves on
+    its own, at whatever fixed rate the caller drives it.
+    """
+    
+    def __init__(self, seed: Optional[int] = None, mine: Optional[MineGenerator] = None):
+        if seed is None:
+            seed = random.getrandbits(63)
+        self.seed = seed
+        self.rng = RandomStreams(seed)
+        self.player = Player()
+        self.mine = mine if mine is not None else MineGenerator()
+        self.town = TownManager()
+        self.state = GameState.TOWN
+        self.steps = 0
+        self.last_damage_cause: Optional[str] = None
+        self.facing = (0, 1)  # Direction of the last move, where dynamite is set
+        self.water = WaterFlow(self.mine)
+        self.fov = FieldOfView(self.mine)
+        self.ticks = 0
+        self.telemetry = None  # Gets Event records when set, see telemetry.py
+        
+        self.mine.generate_mine(seed)
+        
+    def step(self, action: Action) -> bool:
+        """Apply one action and return whether it had any effect"""
+        self.steps += 1
+        if self.state is GameState.MINE:
+            applied = self._step_mine(action)
+        elif self.state is GameState.TOWN:
+            applied = self._step_town(action)
+        elif action == Action.RESTART:
+            self._restart_game()
+            applied = True
+        else:
+            applied = False
+            
+        if self.state is GameState.TOWN:
+            self.update()
+        self._light_up()
+        return applied
+        
+    def tick(self) -> None:
+        """Advance hazards that run on their own, such as flowing water, by one tick"""
+        self.ticks += 1
+        if self.water.tick(self.player.position if self.state is GameState.MINE else None):
+            self._light_up()
+        
+    def run_ticks(self, count: int) -> None:
+        """Advance `count` ticks as fast as the CPU allows
+        
+        Once the water has settled the remaining ticks cannot change
+        anything, so they are counted without being run.
+        """
+        end = self.ticks + count
+        while self.ticks < end:
+            if self.water.settled:
+                self.ticks = end
+                return
+            self.tick()
+            
+    def _light_up(self) -> None:
+        """Reveal the tiles lit by the player's lantern and torch"""
+        if self.state is not GameState.MINE:
+            return
+        x, y = self.player.position
+        for equipment, light in LIGHTS.items():
+            if not self.player.has_equipment(equipment):
+                continue
+            x0, y0, lit = self.fov.visible(x, y, light)
+            x1, y1 = x0 + lit.shape[1], y0 + lit.shape[0]
+            unseen = lit & ~self.mine.get_revealed_region(x0, y0, x1, y1)
+            if unseen.any():
+                self.mine.reveal_region(x0, y0, x1, y1, unseen)
+                
+    def _record(self, event: Event, item: int = 0, value: int = 0,
+                position: Optional[Tuple[int, int]] = None) -> None:
+        """Pass an event to the telemetry recorder, if any, at the player's position unless given"""
+        if self.telemetry is not None:
+            x, y = position or self.player.position
+            self.telemetry.record(self.ticks, event, item, value, x, y)
+            
+    def _step_town(self, action: Action) -> bool:
+        """Apply an action while in town"""
+        if action in BUY_ACTIONS:
+            equipment = BUY_ACTIONS[action]
+            if self.town.buy_equipment(self.player, equipment):
+                self._record(Event.PURCHASE, EQUIPMENT.index(equipment), self.town.equipment_costs[equipment])
+                return True
+            return False
+        elif action == Action.SELL:
+            payout = self.town.sell_minerals(self.player, self.rng.market)
+            if payout:
+                self._record(Event.SALE, value=payout)
+            return payout > 0
+        elif action == Action.HEAL:
+            money = self.player.money
+            if self.town.heal_player(self.player):
+                self._record(Event.HEAL, value=money - self.player.money)
+                return True
+            return False
+        elif action == Action.SALOON:
+            health = self.player.health
+            self.town.saloon_interaction(self.player, 'audience')
+            return self.player.health != health
+        elif action == Action.ENTER_MINE:
+            if self.player.spend_money(ELEVATOR_COST):
+                self.state = GameState.MINE
+                return True
+        return False
+        
+    def _step_mine(self, action: Action) -> bool:
+        """Apply an action while in the mine"""
+        delta = MOVE_DELTAS.get(action)
+        if delta is not None:
+            self.facing = delta
+            return self._move_player(*delta)
+        elif action == Action.DYNAMITE:
+            return self._use_dynamite()
+        elif action == Action.TELEPORT:  # Teleport glitch tribute
+            self.player.position = (self.player.position[0], 0)
+            return True
+        elif action == Action.LEAVE_MINE:
+            self.state = GameState.TOWN
+            return True
+        return False
+        
+    def _move_player(self, dx: int, dy: int) -> bool:
+        """Move player and handle digging"""
+        new_x = self.player.position[0] + dx
+        new_y = self.player.position[1] + dy
+        
+        if self.mine.in_bounds(new_x, new_y):
+            if self.mine.get_tile_id(new_x, new_y) == TileType.EMPTY.value:
+                self.player.position = (new_x, new_y)
+                return True
+            else:
+                if self._dig_tile(new_x, new_y):
+                    self.player.position = (new_x, new_y)
+                    self.mine.reveal_tile(new_x, new_y)
+                    return True
+        return False
+                    
+    def _dig_tile(self, x: int, y: int) -> bool:
+        """Dig a tile and handle consequences"""
+        tile_type = self.mine.get_tile(x, y)
+        
+        # Handle special tiles
+        if tile_type == TileType.GRANITE:
+            if not self.player.has_equipment(Equipment.DRILL):
+                return False
+            cost = 150
+            if not self.player.spend_money(cost):
+                return False
+        elif tile_type == TileType.WATER:
+            if not self.player.has_equipment(Equipment.BUCKET):
+                return False
+            cost = 150
+            if not self.player.spend_money(cost):
+                return False
+        elif tile_type == TileType.SPRING:
+            cost = 0
+            self.mine.flood_area(x, y)
+            self.player.take_damage(20)
+            self.last_damage_cause = 'spring'
+            self._record(Event.FLOOD, value=20, position=(x, y))
+        else:
+            # Regular digging
+            cost = self._calculate_dig_cost(tile_type)
+            if not self.player.spend_money(cost):
+                return False
+        self._record(Event.DIG, tile_type.value, cost, (x, y))
+                
+        # Handle rewards
+        self._handle_tile_rewards(tile_type)
+        
+        # Random cave-in
+        if self.rng.cave_in.random() < 0.05:
+            result = self.mine.cave_in(x, y, self.rng.cave_in)
+            damage = self._take_blast_damage(result, 'cave_in')
+            self._record(Event.CAVE_IN, value=damage, position=(x, y))
+            
+        # Clear the tile
+        self.mine.set_tile(x, y, TileType.EMPTY)
+        return True
+        
+    def _use_dynamite(self) -> bool:
+        """Set off the player's dynamite DYNAMITE_RANGE tiles ahead, collecting what it frees"""
+        if not self.player.has_equipment(Equipment.DYNAMITE):
+            return False
+        self.player.remove_equipment(Equipment.DYNAMITE)
+        
+        x, y = self.player.position
+        dx, dy = self.facing
+        result = self.mine.blast(x + dx * DYNAMITE_RANGE, y + dy * DYNAMITE_RANGE, DYNAMITE_BLAST)
+        for tile_type, count in result.destroyed.items():
+            for _ in range(count):
+                self._handle_tile_rewards(tile_type)
+        self._take_blast_damage(result, 'dynamite')
+        return True
+        
+    def _take_blast_damage(self, result: BlastResult, cause: str) -> int:
+        """Hurt the player by every blast that reached them, returning the damage"""
+        damage = result.damage_at(*self.player.position)
+        if damage:
+            self.player.take_damage(damage)
+            self.last_damage_cause = cause
+        return damage
+            
+    def _calculate_dig_cost(self, tile_type: TileType) -> int:
+        """Calculate dig cost based on tile type and equipment"""
+        base_cost = 20
+        
+        if tile_type == TileType.SANDSTONE:
+            base_cost = 10
+        elif tile_type == TileType.VOLCANIC:
+            base_cost = 30
+            
+        # Equipment bonuses
+        if self.player.has_equipment(Equipment.SHOVEL):
+            base_cost = max(8, base_cost - 12)
+        if self.player.has_equipment(Equipment.PICK):
+            base_cost = max(5, base_cost - 5)
+            
+        return base_cost
+        
+    def _handle_tile_rewards(self, tile_type: TileType) -> None:
+        """Handle rewards from digging tiles"""
+        if tile_type == TileType.SILVER:
+            amount = self.rng.rewards.randint(1, 6)
+            self.player.add_mineral('silver', amount)
+        elif tile_type == TileType.GOLD:
+            amount = self.rng.rewards.randint(1, 6)
+            self.player.add_mineral('gold', amount)
+        elif tile_type == TileType.PLATINUM:
+            amount = self.rng.rewards.randint(1, 6)
+            self.player.add_mineral('platinum', amount)
+        elif tile_type == TileType.DIAMOND:
+            amount = 1
+            self.player.add_mineral('diamonds', amount)
+        elif tile_type == TileType.RING:
+            amount = 1
+            self.player.has_ring = True
+        else:
+            return
+        self._record(Event.REWARD, tile_type.value, amount)
+            
+    def _check_win_condition(self) -> bool:
+        """Check if player has won"""
+        return self.player.has_ring and self.player.money >= 20000
+        
+    def _check_lose_condition(self) -> bool:
+        """Check if player has lost"""
+        return self.player.health <= 0 or self.player.money < -100
+        
+    def _restart_game(self, seed: Optional[int] = None) -> None:
+        """Restart the game, in a new mine drawn from the game's seed unless one is given"""
+        self.player = Player()
+        self.mine.generate_mine(seed if seed is not None else self.rng.mine.getrandbits(63))
+        self.state = GameState.TOWN
+        self.last_damage_cause = None
+        self.facing = (0, 1)
+        
+    def update(self) -> None:
+        """Update game state"""
+        if self.state == GameState.TOWN:
+            if self._check_win_condition():
+                self.state = GameState.VICTORY
+            elif self._check_lose_condition():
+                self.state = GameState.GAME_OVER
+                self._record(Event.DEATH, DAMAGE_CAUSES.index(self.last_damage_cause))
@@ -0,0 +1,379 @@
+import argparse
+import importlib
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter
+from multiprocessing import Pool
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from miner_core import (
+    BUY_ACTIONS, ELEVATOR_COST, MOVE_DELTAS, TREASURE_TILES, Action, Equipment, GameState, Player,
+    Simulation, TileType, TownManager,
+)
+from tile_index import TileIndex
+
+# A policy picks the next action for a simulation
+Policy = Callable[[Simulation], Action]
+
+# Runs end as 'stuck' after this many consecutive actions with no effect
+STALL_LIMIT = 200
+
+# Simulation ticks between actions, roughly a player's pace at TICK_RATE
+TICKS_PER_STEP = 3
+
+# Seeds are handed to the worker pool in blocks so huge sweeps never queue
+# every task at once
+TASK_BLOCK = 10000
+
+class RandomPolicy:
+    """Picks uniformly among the actions that make sense in the current state"""
+
+    TOWN_ACTIONS = [Action.ENTER_MINE, Action.SELL, Action.HEAL] + list(BUY_ACTIONS)
+    MINE_ACTIONS = [Action.MOVE_LEFT, Action.MOVE_RIGHT, Action.MOVE_UP,
+                    Action.MOVE_DOWN, Action.TELEPORT, Action.LEAVE_MINE]
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+
+    def __call__(self, sim: Simulation) -> Action:
+        if sim.state == GameState.TOWN:
+            return self.rng.choice(self.TOWN_ACTIONS)
+        return self.rng.choice(self.MINE_ACTIONS)
+
+class BotPolicy:
+    """A simple miner: gear up, dig mostly downward, go back to sell or heal
+
+    It heads back to town while it can still pay for the trip down again,
+    so it runs out of money only when a trip earns nothing.
+    """
+
+    # Equipment bought in order once affordable, keeping some cash for digging
+    SHOPPING_LIST = [Equipment.SHOVEL, Equipment.TORCH, Equipment.PICK, Equipment.DRILL, Equipment.BUCKET]
+    CASH_RESERVE = 300
+
+    # Heal in town below this health, and leave the mine at or below the
+    # other, since a cave-in can take 30
+    HEAL_BELOW = 70
+    LEAVE_AT_HEALTH = 40
+
+    # Leave to sell once money is this low, since a trip needs the elevator
+    # fare and some digging money, and stop digging below the price of a dig
+    LOW_FUNDS = ELEVATOR_COST + 100
+    DIG_FUNDS = 20
+
+    # Relative preference for each direction when digging
+    MOVE_WEIGHTS = [(Action.MOVE_DOWN, 5), (Action.MOVE_LEFT, 2),
+                    (Action.MOVE_RIGHT, 2), (Action.MOVE_UP, 1)]
+
+    # Revealed treasure at most this many moves away is dug toward; once the
+    # tiles around are dug out, the nearest treasure left anywhere is
+    TREASURE_RANGE = 6
+
+    def __init__(self, seed: int):
+        self.rng = random.Random(seed)
+        self.town = TownManager()
+        self.index: Optional[TileIndex] = None
+
+    def __call__(self, sim: Simulation) -> Action:
+        if sim.state == GameState.TOWN:
+            return self._town_action(sim.player)
+        return self._mine_action(sim)
+
+    def _town_action(self, player: Player) -> Action:
+        if any(player.minerals.values()):
+            return Action.SELL
+        heal_cost = (player.max_health - player.health) * 2
+        if player.health < player.max_health and (
+                player.money >= heal_cost + self.CASH_RESERVE or
+                player.health < self.HEAL_BELOW and player.money >= heal_cost + ELEVATOR_COST):
+            return Action.HEAL
+        for action, equipment in BUY_ACTIONS.items():
+            if (equipment in self.SHOPPING_LIST and not player.has_equipment(equipment) and
+                    player.money >= self.town.equipment_costs[equipment] + self.CASH_RESERVE):
+                return action
+        return Action.ENTER_MINE
+
+    def _mine_action(self, sim: Simulation) -> Action:
+        player = sim.player
+        carrying = sum(player.minerals.values())
+        can_heal = player.money >= (player.max_health - player.health) * 2 + ELEVATOR_COST
+        if (player.health <= self.LEAVE_AT_HEALTH and can_heal or carrying >= 40 or
+                carrying and (player.has_ring or player.money < self.LOW_FUNDS) or
+                player.money < self.DIG_FUNDS):
+            return Action.LEAVE_MINE
+
+        moves = [(action, weight) for action, weight in self.MOVE_WEIGHTS
+                 if self._can_enter(sim, action)]
+        toward = self._treasure_moves(sim)
+        if any(action in toward for action, _ in moves):
+            moves = [(action, weight) for action, weight in moves if action in toward]
+        if not moves:
+            return Action.TELEPORT
+        actions, weights = zip(*moves)
+        return self.rng.choices(actions, weights)[0]
+
+    def _treasure_moves(self, sim: Simulation) -> List[Action]:
+        """Moves that get closer to the treasure worth heading for, if any"""
+        if self.index is None or self.index.mine is not sim.mine:
+            if self.index is not None:
+                self.index.close()
+            self.index = TileIndex(sim.mine)
+        x, y = sim.player.position
+        reach = self.TREASURE_RANGE
+        found = [(abs(tx - x) + abs(ty - y), tx, ty)
+                 for tile_type in TREASURE_TILES
+                 for tx, ty in self.index.positions(tile_type, x - reach, y - reach, x + reach + 1, y + reach + 1)
+                 if sim.mine.is_revealed(tx, ty)]
+        found = [treasure for treasure in found if treasure[0] <= reach]
+        if not found and all(sim.mine.get_tile(x + dx, y + dy) == TileType.EMPTY
+                             for dx, dy in MOVE_DELTAS.values() if sim.mine.in_bounds(x + dx, y + dy)):
+            nearest = (self.index.nearest(tile_type, x, y) for tile_type in TREASURE_TILES)
+            found = [(abs(tx - x) + abs(ty - y), tx, ty) for tx, ty in filter(None, nearest)]
+        if not found:
+            return []
+        _, tx, ty = min(found)
+        return [action for action, (dx, dy) in MOVE_DELTAS.items()
+                if abs(tx - x - dx) + abs(ty - y - dy) < abs(tx - x) + abs(ty - y)]
+
+    def _can_enter(self, sim: Simulation, action: Action) -> bool:
+        """Whether moving in a direction would not be refused outright"""
+        dx, dy = MOVE_DELTAS[action]
+        x, y = sim.player.position[0] + dx, sim.player.position[1] + dy
+        if not sim.mine.in_bounds(x, y):
+            return False
+        tile_type = sim.mine.get_tile(x, y)
+        if tile_type == TileType.GRANITE:
+            return sim.player.has_equipment(Equipment.DRILL) and sim.player.money >= 150
+        if tile_type == TileType.WATER:
+            return sim.player.has_equipment(Equipment.BUCKET) and sim.player.money >= 150
+        return True
+
+POLICIES: Dict[str, Callable[[int], Policy]] = {
+    'bot': BotPolicy,
+    'random': RandomPolicy,
+}
+
+def load_policy(spec: str, seed: int) -> Policy:
+    """Build a policy from a built-in name or a `module:factory` path
+
+    A factory is called with the run's seed and must return a callable
+    mapping a Simulation to its next Action.
+    """
+    if spec in POLICIES:
+        return POLICIES[spec](seed)
+    module_name, _, attr = spec.partition(':')
+    if not attr:
+        raise ValueError(f"Unknown policy {spec!r}; use one of {sorted(POLICIES)} or module:factory")
+    return getattr(importlib.import_module(module_name), attr)(seed)
+
+def is_broke(sim: Simulation) -> bool:
+    """Whether the player is in town with nothing to sell and cannot pay the elevator"""
+    return (sim.state == GameState.TOWN and sim.player.money < ELEVATOR_COST and
+            not any(sim.player.minerals.values()))
+
+def run_game(task: Tuple[int, str, int, int, int]) -> dict:
+    """Play one complete game, with `ticks_per_step` ticks after each action, and return its result record"""
+    seed, policy_spec, max_steps, sample_every, ticks_per_step = task
+    sim = Simulation(seed)
+    policy = load_policy(policy_spec, seed)
+    index = TileIndex(sim.mine)
+    if isinstance(policy, BotPolicy):
+        policy.index = index  # One index per game, shared with the ring check below
+
+    money_curve: List[int] = []
+    sales: List[int] = []
+    ring_step: Optional[int] = None
+    ring_seen_step: Optional[int] = None
+    stalled = 0
+    while (sim.state in (GameState.TOWN, GameState.MINE) and sim.steps < max_steps and
+           stalled < STALL_LIMIT and not is_broke(sim)):
+        action = policy(sim)
+        money = sim.player.money
+        stalled = 0 if sim.step(action) else stalled + 1
+        sim.run_ticks(ticks_per_step)
+
+        if action == Action.SELL and sim.player.money > money:
+            sales.append(sim.player.money - money)
+        # A ring dug up unseen is gone from the mine by the time it is revealed
+        if ring_seen_step is None and (sim.player.has_ring or index.ring_revealed()):
+            ring_seen_step = sim.steps
+        if ring_step is None and sim.player.has_ring:
+            ring_step = sim.steps
+        if sim.steps % sample_every == 0:
+            money_curve.append(sim.player.money)
+
+    if sim.state == GameState.VICTORY:
+        outcome = 'win'
+    elif sim.state == GameState.GAME_OVER:
+        outcome = 'death' if sim.player.health <= 0 else 'broke'
+    elif is_broke(sim):
+        outcome = 'broke'
+    elif stalled >= STALL_LIMIT:
+        outcome = 'stuck'
+    else:
+        outcome = 'timeout'
+
+    return {
+        'seed': seed,
+        'outcome': outcome,
+        'steps': sim.steps,
+        'ring_seen_step': ring_seen_step,
+        'ring_step': ring_step,
+        'money': sim.player.money,
+        'health': sim.player.health,
+        'death_cause': sim.last_damage_cause if outcome == 'death' else None,
+        'money_curve': money_curve,
+        'sales': sales,
+    }
+
+class StreamingStats:
+    """Running count/mean/std/min/max plus a bounded reservoir for percentiles"""
+
+    def __init__(self, reservoir_size: int = 10000, seed: int = 0):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.reservoir: List[float] = []
+        self.reservoir_size = reservoir_size
+        self._rng = random.Random(seed)
+
+    def add(self, value: float) -> None:
+        """Fold one sample into the statistics"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+        if len(self.reservoir) < self.reservoir_size:
+            self.reservoir.append(value)
+        else:
+            slot = self._rng.randrange(self.count)
+            if slot < self.reservoir_size:
+                self.reservoir[slot] = value
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Approximate q-th percentile (0-100) from the reservoir"""
+        if not self.reservoir:
+            return None
+        ordered = sorted(self.reservoir)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+    def summary(self) -> dict:
+        """Statistics as a JSON-friendly dict"""
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'std': math.sqrt(self._m2 / self.count),
+            'min': self.min,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+class RunSummary:
+    """Reduces a stream of run records into aggregate statistics"""
+
+    def __init__(self, sample_every: int):
+        self.sample_every = sample_every
+        self.runs = 0
+        self.outcomes: Counter = Counter()
+        self.death_causes: Counter = Counter()
+        self.steps = StreamingStats()
+        self.time_to_ring_seen = StreamingStats()
+        self.time_to_ring = StreamingStats()
+        self.final_money = StreamingStats()
+        self.sale_revenue = StreamingStats()
+        self.money_curve: List[StreamingStats] = []
+
+    def add(self, record: dict) -> None:
+        """Fold one run record into the summary"""
+        self.runs += 1
+        self.outcomes[record['outcome']] += 1
+        if record['death_cause']:
+            self.death_causes[record['death_cause']] += 1
+        self.steps.add(record['steps'])
+        self.final_money.add(record['money'])
+        if record['ring_seen_step'] is not None:
+            self.time_to_ring_seen.add(record['ring_seen_step'])
+        if record['ring_step'] is not None:
+            self.time_to_ring.add(record['ring_step'])
+        for revenue in record['sales']:
+            self.sale_revenue.add(revenue)
+        for i, money in enumerate(record['money_curve']):
+            if i == len(self.money_curve):
+                self.money_curve.append(StreamingStats(reservoir_size=1000))
+            self.money_curve[i].add(money)
+
+    def to_dict(self) -> dict:
+        """Summary as a JSON-friendly dict"""
+        return {
+            'runs': self.runs,
+            'win_rate': self.outcomes['win'] / self.runs if self.runs else 0.0,
+            'outcomes': dict(self.outcomes),
+            'death_causes': dict(self.death_causes),
+            'steps': self.steps.summary(),
+            'time_to_ring_seen': self.time_to_ring_seen.summary(),
+            'time_to_ring': self.time_to_ring.summary(),
+            'ring_found_rate': self.time_to_ring.count / self.runs if self.runs else 0.0,
+            'final_money': self.final_money.summary(),
+            'sale_revenue': self.sale_revenue.summary(),
+            'money_curve': [
+                {'step': (i + 1) * self.sample_every, 'runs': stats.count, 'mean': stats.mean,
+                 'p10': stats.percentile(10), 'p50': stats.percentile(50), 'p90': stats.percentile(90)}
+                for i, stats in enumerate(self.money_curve)
+            ],
+        }
+
+def iter_tasks(args: argparse.Namespace, start: int, stop: int) -> Iterator[Tuple[int, str, int, int, int]]:
+    """Tasks for runs [start, stop)"""
+    for i in range(start, stop):
+        yield (args.seed + i, args.policy, args.max_steps, args.sample_every, args.ticks_per_step)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run many headless games in parallel and summarize them")
+    parser.add_argument('--runs', type=int, default=1000, help="number of games to play")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first run; run i uses seed + i")
+    parser.add_argument('--policy', default='bot',
+                        help="built-in policy (%s) or module:factory" % ', '.join(sorted(POLICIES)))
+    parser.add_argument('--max-steps', type=int, default=20000, help="steps before a run times out")
+    parser.add_argument('--ticks-per-step', type=int, default=TICKS_PER_STEP,
+                        help="simulation ticks (water flow) after each action")
+    parser.add_argument('--sample-every', type=int, default=500, help="steps between money curve samples")
+    parser.add_argument('--out', default='montecarlo_runs.jsonl', help="per-run records, one JSON object per line")
+    parser.add_argument('--summary', help="summary JSON path (default: <out>.summary.json)")
+    args = parser.parse_args(argv)
+
+    summary = RunSummary(args.sample_every)
+    started = time.perf_counter()
+    with open(args.out, 'w') as out, Pool(args.workers) as pool:
+        for start in range(0, args.runs, TASK_BLOCK):
+            stop = min(args.runs, start + TASK_BLOCK)
+            chunksize = max(1, (stop - start) // (args.workers * 8))
+            for record in pool.imap_unordered(run_game, iter_tasks(args, start, stop), chunksize):
+                out.write(json.dumps(record, separators=(',', ':')) + '\n')
+                summary.add(record)
+            out.flush()
+            print(f"{summary.runs}/{args.runs} runs, {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    result = summary.to_dict()
+    with open(args.summary or args.out + '.summary.json', 'w') as f:
+        json.dump(result, f, indent=2)
+
+    print(f"win rate {result['win_rate']:.3f}, ring found {result['ring_found_rate']:.3f}, "
+          f"outcomes {result['outcomes']}, deaths {result['death_causes']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
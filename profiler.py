@@ -0,0 +1,130 @@
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Phases timed by the game loop, in display order. Renderer phases run
+# inside 'render' (and 'update_hud' calls 'render_hud'), so their times
+# overlap with it rather than adding to the frame.
+LOOP_PHASES = ['handle_input', 'update', 'render', 'present', 'tick']
+RENDERER_PHASES = ['render_town', 'update_town', 'render_mine', 'update_mine', '_sync_atlas',
+                   'render_hud', 'update_hud', 'render_game_over']
+
+class FrameProfiler:
+    """Per-phase frame timings kept in a fixed-size ring buffer
+
+    Each recorded frame is one row of seconds: the wall time since the
+    previous frame started, then one column per phase. While disabled the
+    profiler does nothing at all; callers check `enabled` once per frame and
+    instrumented objects get their original methods back.
+    """
+
+    def __init__(self, capacity: int = 600, phases: Sequence[str] = tuple(LOOP_PHASES + RENDERER_PHASES)):
+        self.capacity = capacity
+        self.phases = list(phases)
+        self.columns = ['frame'] + self.phases
+        self.enabled = False
+        self.frames = 0
+        self._column = {phase: i + 1 for i, phase in enumerate(self.phases)}
+        self._buffer = np.zeros((capacity, len(self.columns)), dtype=np.float64)
+        self._current = [0.0] * len(self.columns)
+        self._frame_start: Optional[float] = None
+        self._instrumented: List[tuple] = []
+
+    def enable(self, *targets: Any) -> None:
+        """Start recording, timing the phase-named methods of each target"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self._frame_start = None
+        for target in targets:
+            for phase in self.phases:
+                method = getattr(target, phase, None)
+                if method is not None and callable(method):
+                    self._instrumented.append((target, phase, vars(target).get(phase)))
+                    setattr(target, phase, self._timed(phase, method))
+
+    def disable(self) -> None:
+        """Stop recording and restore instrumented methods"""
+        self.enabled = False
+        for target, phase, original in self._instrumented:
+            if original is None:
+                delattr(target, phase)
+            else:
+                setattr(target, phase, original)
+        self._instrumented.clear()
+
+    def _timed(self, phase: str, method: Callable) -> Callable:
+        """Wrap a bound method so its run time adds to `phase`"""
+        column = self._column[phase]
+        current = self._current
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                current[column] += clock() - start
+        return timed
+
+    def call(self, phase: str, function: Callable, *args) -> Any:
+        """Call `function` and add its run time to `phase`"""
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self._current[self._column[phase]] += time.perf_counter() - start
+
+    def begin_frame(self) -> None:
+        """Close the previous frame, if any, and start timing a new one"""
+        now = time.perf_counter()
+        if self._frame_start is not None:
+            self._current[0] = now - self._frame_start
+            self._buffer[self.frames % self.capacity] = self._current
+            self.frames += 1
+        self._current[:] = [0.0] * len(self.columns)
+        self._frame_start = now
+
+    def history(self) -> np.ndarray:
+        """Recorded frames, oldest first, as a (frames, columns) array of ms"""
+        if self.frames < self.capacity:
+            rows = self._buffer[:self.frames]
+        else:
+            split = self.frames % self.capacity
+            rows = np.concatenate((self._buffer[split:], self._buffer[:split]))
+        return rows * 1000
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Mean, p50 and p99 in ms per column over the buffered frames
+
+        'work' is the frame time less the time spent waiting in 'tick'.
+        """
+        history = self.history()
+        if not len(history):
+            return {}
+        columns = list(self.columns)
+        if 'tick' in self._column:
+            history = np.column_stack((history, history[:, 0] - history[:, self._column['tick']]))
+            columns.append('work')
+        means = history.mean(axis=0)
+        p50, p99 = np.percentile(history, [50, 99], axis=0)
+        return {
+            column: {'mean': float(means[i]), 'p50': float(p50[i]), 'p99': float(p99[i])}
+            for i, column in enumerate(columns)
+        }
+
+    def fps(self) -> float:
+        """Average frames per second over the buffered frames"""
+        history = self.history()
+        total = history[:, 0].sum() if len(history) else 0.0
+        return len(history) * 1000 / total if total else 0.0
+
+    def dump(self, path: str) -> None:
+        """Write the buffered frames as CSV, one row per frame, times in ms"""
+        history = self.history()
+        first = self.frames - len(history)
+        with open(path, 'w') as f:
+            f.write('index,' + ','.join(self.columns) + '\n')
+            for i, row in enumerate(history):
+                f.write(f"{first + i}," + ','.join(f"{value:.4f}" for value in row) + '\n')
@@ -0,0 +1,169 @@
+import argparse
+import hashlib
+import struct
+import sys
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from chunked_mine import ChunkedMine
+from miner_core import GRID_HEIGHT, GRID_WIDTH, Action, MineGenerator, Simulation
+
+# File layout, all little-endian: the HEADER struct, then `count` records
+# of (simulation tick, action) as RECORD_DTYPE. Each action was applied
+# once `tick` ticks had run; the header holds the ticks run in total and
+# the size and kind of mine played.
+MAGIC = b'MREC'
+VERSION = 3
+HEADER = struct.Struct('<4sHH q I I 32s II')
+RECORD_DTYPE = np.dtype([('tick', '<u4'), ('action', 'u1')])
+CHUNK_INDEX = struct.Struct('<I')
+
+FLAG_HAS_DIGEST = 1
+FLAG_CHUNKED = 2
+
+class RecordingFormatError(ValueError):
+    """Raised when a file is not a recording this version can read"""
+
+@dataclass
+class Recording:
+    """A game's seed, its inputs, the ticks it ran for and, once finished, its final state digest"""
+    seed: int
+    ticks: np.ndarray
+    actions: np.ndarray
+    duration: int = 0
+    digest: Optional[bytes] = None
+    width: int = GRID_WIDTH
+    height: int = GRID_HEIGHT
+    chunked: bool = False
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+    def new_mine(self) -> MineGenerator:
+        """An empty mine of the size and kind the recording was played in"""
+        if self.chunked:
+            return ChunkedMine(self.width, self.height)
+        return MineGenerator(self.width, self.height)
+
+class InputRecorder:
+    """Collects the actions applied to a game and the simulation tick each happened on"""
+
+    def __init__(self, seed: int):
+        self.seed = seed
+        self._ticks: List[int] = []
+        self._actions: List[int] = []
+
+    def record(self, tick: int, action: Action) -> None:
+        """Log one applied action"""
+        self._ticks.append(tick)
+        self._actions.append(action)
+
+    def recording(self, sim: Optional[Simulation] = None) -> Recording:
+        """The inputs so far, with the ticks run, mine and final state digest of `sim` if given"""
+        recording = Recording(
+            self.seed,
+            np.array(self._ticks, dtype=np.uint32),
+            np.array(self._actions, dtype=np.uint8),
+            self._ticks[-1] if self._ticks else 0,
+        )
+        if sim is not None:
+            recording.duration = sim.ticks
+            recording.digest = state_digest(sim)
+            recording.width, recording.height = sim.mine.width, sim.mine.height
+            recording.chunked = isinstance(sim.mine, ChunkedMine)
+        return recording
+
+def state_digest(sim: Simulation) -> bytes:
+    """SHA-256 over everything a replay must reproduce
+
+    A chunked mine is hashed through the chunks changed since generation,
+    so no other chunk has to be generated.
+    """
+    player, mine = sim.player, sim.mine
+    h = hashlib.sha256()
+    if isinstance(mine, ChunkedMine):
+        for index, chunk in mine.modified_chunks():
+            h.update(CHUNK_INDEX.pack(index))
+            h.update(chunk.grid.tobytes())
+            h.update(np.packbits(chunk.revealed, axis=None).tobytes())
+    else:
+        h.update(np.ascontiguousarray(mine.grid).tobytes())
+        h.update(np.packbits(mine.revealed, axis=None).tobytes())
+    h.update(repr((
+        mine.width, mine.height, mine.ring_position, mine.seed,
+        player.money, player.health, player.position, player.has_ring,
+        sorted(item.value for item, owned in player.inventory.items() if owned),
+        sorted(player.minerals.items()), sim.state.value, sim.steps,
+    )).encode())
+    return h.digest()
+
+def save_recording(path: str, recording: Recording) -> None:
+    """Write a recording to `path`"""
+    records = np.empty(len(recording), dtype=RECORD_DTYPE)
+    records['tick'] = recording.ticks
+    records['action'] = recording.actions
+    flags = (FLAG_HAS_DIGEST if recording.digest else 0) | (FLAG_CHUNKED if recording.chunked else 0)
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, flags, recording.seed, len(records), recording.duration,
+                            recording.digest or b'', recording.width, recording.height))
+        f.write(records.tobytes())
+
+def load_recording(path: str) -> Recording:
+    """Read a recording written by `save_recording`"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise RecordingFormatError("File too short for a recording header")
+    magic, version, flags, seed, count, duration, digest, width, height = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise RecordingFormatError("Not a recording")
+    if version != VERSION:
+        raise RecordingFormatError(f"Unsupported recording version {version}")
+
+    records = np.frombuffer(data, dtype=RECORD_DTYPE, count=count, offset=HEADER.size)
+    return Recording(seed, records['tick'].copy(), records['action'].copy(), duration,
+                     digest if flags & FLAG_HAS_DIGEST else None, width, height, bool(flags & FLAG_CHUNKED))
+
+def replay(recording: Recording, mine: Optional[MineGenerator] = None) -> Simulation:
+    """Re-run a recording headlessly, as fast as the CPU allows, in a new mine like the recorded one unless given"""
+    sim = Simulation(recording.seed, mine if mine is not None else recording.new_mine())
+    step, run_ticks = sim.step, sim.run_ticks
+    for at, action in zip(recording.ticks.tolist(), recording.actions.tolist()):
+        if sim.ticks < at:
+            run_ticks(at - sim.ticks)
+        step(Action(action))
+    run_ticks(recording.duration - sim.ticks)
+    return sim
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay recorded games headlessly and check their final state")
+    parser.add_argument('recordings', nargs='+', help="recordings made with minerSVGA.py --record")
+    parser.add_argument('--repeat', type=int, default=1, help="replay each recording this many times")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for path in args.recordings:
+        recording = load_recording(path)
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            sim = replay(recording)
+        elapsed = time.perf_counter() - started
+
+        digest = state_digest(sim)
+        if recording.digest is None:
+            verdict = 'no digest'
+        elif digest == recording.digest:
+            verdict = 'ok'
+        else:
+            verdict = 'MISMATCH'
+            failures += 1
+        rate = len(recording) * args.repeat / elapsed if elapsed else float('inf')
+        print(f"{path}: seed {recording.seed}, {len(recording)} actions over {recording.duration} ticks, "
+              f"{rate:,.0f} actions/s, final state {sim.state.value} ${sim.player.money}, {verdict}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+import argparse
+import json
+import mmap
+import struct
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from chunked_mine import ChunkedMine, WholeMineError
+from miner_core import Equipment, GameState, MineGenerator, Player, RandomStreams, Simulation, TileType
+
+# File layout, all little-endian:
+#   header   HEADER struct below
+#   grid     height * width bytes of TileType values, row-major
+#   revealed height * width bits, packed with np.packbits
+#   rng      optional game seed (RNG_SEED) and the Mersenne Twister state
+#            of each RandomStreams stream (RNG_STATE), in NAMES order
+# The header records each block's offset so a reader can map the grid
+# straight out of the file.
+MAGIC = b'MINR'
+VERSION = 2
+HEADER = struct.Struct('<4sHH HHHH q qiiiii BHqqqq BQ bbQ III')
+RNG_SEED = struct.Struct('<q')
+RNG_STATE = struct.Struct('<i625I?d')
+
+GAME_STATES = list(GameState)
+EQUIPMENT = list(Equipment)
+MINERALS = ['silver', 'gold', 'platinum', 'diamonds']
+
+# Header flag bits
+FLAG_HAS_SEED = 1
+FLAG_HAS_RNG = 2
+
+class SaveFormatError(ValueError):
+    """Raised when a file is not a save this version can read"""
+
+@dataclass
+class SaveData:
+    """Everything restored from a save file"""
+    player: Player
+    mine: MineGenerator
+    state: GameState
+    steps: int
+    rng: Optional[RandomStreams] = None
+    facing: Tuple[int, int] = (0, 1)
+    ticks: int = 0
+
+def save_game(path: str, sim: Simulation) -> None:
+    """Write the simulation's player, mine, clock and random streams to `path`"""
+    with open(path, 'wb') as f:
+        f.write(encode(sim.player, sim.mine, sim.state, sim.steps, sim.rng, sim.facing, sim.ticks))
+
+def encode(player: Player, mine: MineGenerator, state: GameState = GameState.TOWN, steps: int = 0,
+           rng: Optional[RandomStreams] = None, facing: Tuple[int, int] = (0, 1), ticks: int = 0) -> bytes:
+    """Serialize game state to the binary save format"""
+    if isinstance(mine, ChunkedMine):
+        raise WholeMineError("Games in chunked (--depth) mines cannot be saved")
+    grid = np.ascontiguousarray(mine.grid, dtype=np.uint8).tobytes()
+    revealed = np.packbits(mine.revealed, axis=None).tobytes()
+    rng_block = _encode_rng(rng) if rng is not None else b''
+
+    flags = (FLAG_HAS_SEED if mine.seed is not None else 0) | (FLAG_HAS_RNG if rng_block else 0)
+    equipment = sum(1 << i for i, item in enumerate(EQUIPMENT) if player.inventory.get(item))
+    grid_offset = HEADER.size
+    revealed_offset = grid_offset + len(grid)
+    rng_offset = revealed_offset + len(revealed) if rng_block else 0
+
+    header = HEADER.pack(
+        MAGIC, VERSION, flags,
+        mine.width, mine.height, mine.ring_position[0], mine.ring_position[1],
+        mine.seed if mine.seed is not None else 0,
+        player.money, player.health, player.max_health,
+        player.position[0], player.position[1], player.camera_y,
+        player.has_ring, equipment, *(player.minerals[name] for name in MINERALS),
+        GAME_STATES.index(state), steps, facing[0], facing[1], ticks,
+        grid_offset, revealed_offset, rng_offset,
+    )
+    return b''.join((header, grid, revealed, rng_block))
+
+def load_game(path: str, use_mmap: bool = True) -> SaveData:
+    """Read a save file
+
+    With `use_mmap` the grid is a copy-on-write view of the mapped file, so
+    restoring costs no parsing and pages are only read when touched.
+    """
+    with open(path, 'rb') as f:
+        if use_mmap:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        else:
+            data = bytearray(f.read())
+    return decode(data)
+
+def decode(data) -> SaveData:
+    """Rebuild game state from a writable buffer holding a save"""
+    if len(data) < HEADER.size:
+        raise SaveFormatError("File too short for a save header")
+    (magic, version, flags, width, height, ring_x, ring_y, seed,
+     money, health, max_health, x, y, camera_y, has_ring, equipment,
+     silver, gold, platinum, diamonds, state, steps, facing_x, facing_y, ticks,
+     grid_offset, revealed_offset, rng_offset) = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SaveFormatError("Not a save file")
+    if version != VERSION:
+        raise SaveFormatError(f"Unsupported save version {version}")
+
+    cells = width * height
+    mine = MineGenerator(width, height)
+    mine.restore(
+        np.frombuffer(data, dtype=np.uint8, count=cells, offset=grid_offset).reshape(height, width),
+        np.unpackbits(np.frombuffer(data, dtype=np.uint8, count=(cells + 7) // 8, offset=revealed_offset),
+                      count=cells).reshape(height, width).astype(bool),
+        (ring_x, ring_y),
+        seed if flags & FLAG_HAS_SEED else None,
+    )
+
+    player = Player()
+    player.money = money
+    player.health = health
+    player.max_health = max_health
+    player.position = (x, y)
+    player.camera_y = camera_y
+    player.has_ring = bool(has_ring)
+    player.inventory = {item: True for i, item in enumerate(EQUIPMENT) if equipment >> i & 1}
+    player.minerals = dict(zip(MINERALS, (silver, gold, platinum, diamonds)))
+
+    rng = _decode_rng(data, rng_offset) if flags & FLAG_HAS_RNG else None
+    return SaveData(player, mine, GAME_STATES[state], steps, rng, (facing_x, facing_y), ticks)
+
+def restore_simulation(sim: Simulation, save: SaveData, restore_rng: bool = True) -> None:
+    """Load a save into an existing simulation
+
+    The mine is updated in place so its listeners (such as a renderer)
+    stay attached and are told the whole mine changed.
+    """
+    if isinstance(sim.mine, ChunkedMine):
+        raise WholeMineError("Saves cannot be loaded into a chunked (--depth) mine")
+    sim.player = save.player
+    sim.mine.restore(save.mine.grid, save.mine.revealed, save.mine.ring_position, save.mine.seed)
+    sim.state = save.state
+    sim.steps = save.steps
+    sim.facing = save.facing
+    sim.ticks = save.ticks
+    sim.last_damage_cause = None
+    if restore_rng and save.rng is not None:
+        sim.seed = save.rng.seed
+        sim.rng = save.rng
+
+def _encode_rng(rng: RandomStreams) -> bytes:
+    blocks = [RNG_SEED.pack(rng.seed)]
+    for name in RandomStreams.NAMES:
+        version, internal, gauss = getattr(rng, name).getstate()
+        blocks.append(RNG_STATE.pack(version, *internal, gauss is not None, gauss or 0.0))
+    return b''.join(blocks)
+
+def _decode_rng(data, offset: int) -> RandomStreams:
+    rng = RandomStreams(RNG_SEED.unpack_from(data, offset)[0])
+    offset += RNG_SEED.size
+    for name in RandomStreams.NAMES:
+        version, *internal, has_gauss, gauss = RNG_STATE.unpack_from(data, offset)
+        getattr(rng, name).setstate((version, tuple(internal), gauss if has_gauss else None))
+        offset += RNG_STATE.size
+    return rng
+
+def to_json(save: SaveData) -> dict:
+    """Human-readable form of a save, for debugging"""
+    mine, player = save.mine, save.player
+    return {
+        'version': VERSION,
+        'state': save.state.value,
+        'steps': save.steps,
+        'ticks': save.ticks,
+        'facing': list(save.facing),
+        'player': {
+            'money': player.money,
+            'health': player.health,
+            'max_health': player.max_health,
+            'position': list(player.position),
+            'camera_y': player.camera_y,
+            'has_ring': player.has_ring,
+            'inventory': [item.value for item in EQUIPMENT if player.inventory.get(item)],
+            'minerals': dict(player.minerals),
+        },
+        'mine': {
+            'width': mine.width,
+            'height': mine.height,
+            'seed': mine.seed,
+            'ring_position': list(mine.ring_position),
+            'legend': {tile.value: tile.name for tile in TileType},
+            'grid': [' '.join(f"{tile:2d}" for tile in row) for row in mine.grid.tolist()],
+            'revealed': [''.join('#' if cell else '.' for cell in row) for row in mine.revealed.tolist()],
+        },
+        'rng': None if save.rng is None else {
+            'seed': save.rng.seed,
+            'streams': {
+                name: {'version': version, 'internal': list(internal), 'gauss_next': gauss}
+                for name, (version, internal, gauss) in save.rng.getstate().items()
+            },
+        },
+    }
+
+def export_json(save_path: str, json_path: str) -> None:
+    """Write a save file's contents as indented JSON"""
+    with open(json_path, 'w') as f:
+        json.dump(to_json(load_game(save_path, use_mmap=False)), f, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a save file as JSON for debugging")
+    parser.add_argument('save', help="save file to read")
+    parser.add_argument('out', help="JSON file to write")
+    args = parser.parse_args()
+    export_json(args.save, args.out)
@@ -0,0 +1,398 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import itertools
+import json
+import random
+import struct
+import sys
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from miner_core import TICK_RATE, Action, Simulation, TileType
+
+# Actions a session can queue, and how many of them are applied per tick
+MAX_QUEUED_ACTIONS = 32
+MAX_ACTIONS_PER_TICK = 4
+
+# Longest client message, in bytes
+MAX_MESSAGE = 4096
+
+# Clients whose unsent output grows past this are too slow and are dropped
+MAX_BUFFERED = 1 << 20
+
+# A diff changing more than this fraction of the mine is sent as a snapshot
+SNAPSHOT_FRACTION = 1 / 8
+
+WEBSOCKET_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+class ConnectionClosed(Exception):
+    """Raised when the client goes away or breaks the protocol"""
+
+class Connection:
+    """A client sending and receiving JSON messages, one per line"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @property
+    def closed(self) -> bool:
+        return self.writer.is_closing()
+
+    def send(self, message: dict) -> None:
+        """Queue a message without waiting; drops clients that stop reading"""
+        if self.writer.is_closing():
+            return
+        if self.writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+            self.writer.close()
+            return
+        self._write(json.dumps(message, separators=(',', ':')).encode())
+
+    def _write(self, data: bytes) -> None:
+        self.writer.write(data + b'\n')
+
+    async def receive(self) -> dict:
+        """The next message from the client"""
+        data = await self._read()
+        try:
+            message = json.loads(data)
+        except (ValueError, RecursionError):  # RecursionError: nested too deeply to decode
+            raise ConnectionClosed("Malformed JSON")
+        if not isinstance(message, dict):
+            raise ConnectionClosed("Messages must be JSON objects")
+        return message
+
+    async def _read(self) -> bytes:
+        try:
+            line = await self.reader.readline()
+        except (ValueError, ConnectionError):
+            raise ConnectionClosed("Read failed")
+        if not line.endswith(b'\n'):
+            raise ConnectionClosed("Connection closed")
+        return line
+
+    def close(self) -> None:
+        self.writer.close()
+
+class WebSocketConnection(Connection):
+    """A client speaking WebSocket (RFC 6455), one JSON message per text frame"""
+
+    async def handshake(self) -> None:
+        """Read the HTTP upgrade request and accept it"""
+        request_line = await self.reader.readline()
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        key = headers.get('sec-websocket-key')
+        if not request_line.startswith(b'GET ') or key is None:
+            self.writer.write(b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n')
+            raise ConnectionClosed("Not a WebSocket upgrade")
+        accept = base64.b64encode(hashlib.sha1(key.encode() + WEBSOCKET_GUID).digest())
+        self.writer.write(b'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n'
+                          b'Connection: Upgrade\r\nSec-WebSocket-Accept: ' + accept + b'\r\n\r\n')
+
+    def _write(self, data: bytes, opcode: int = 0x1) -> None:
+        length = len(data)
+        if length < 126:
+            header = struct.pack('!BB', 0x80 | opcode, length)
+        elif length < 1 << 16:
+            header = struct.pack('!BBH', 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack('!BBQ', 0x80 | opcode, 127, length)
+        self.writer.write(header + data)
+
+    async def _read(self) -> bytes:
+        message = b''
+        while True:
+            try:
+                first, second = await self.reader.readexactly(2)
+                length = second & 0x7F
+                if length == 126:
+                    length, = struct.unpack('!H', await self.reader.readexactly(2))
+                elif length == 127:
+                    length, = struct.unpack('!Q', await self.reader.readexactly(8))
+                if len(message) + length > MAX_MESSAGE or not second & 0x80:
+                    raise ConnectionClosed("Frame too long or unmasked")
+                mask = await self.reader.readexactly(4)
+                payload = await self.reader.readexactly(length)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                raise ConnectionClosed("Connection closed")
+
+            # Unmask by XOR with the 4-byte key repeated over the payload
+            key = int.from_bytes((mask * (length // 4 + 1))[:length], 'big')
+            payload = (int.from_bytes(payload, 'big') ^ key).to_bytes(length, 'big')
+
+            opcode = first & 0x0F
+            if opcode == 0x8:
+                self._write(payload[:2], opcode=0x8)
+                raise ConnectionClosed("Closed by client")
+            if opcode == 0x9:
+                self._write(payload, opcode=0xA)
+            elif opcode in (0x0, 0x1, 0x2):
+                message += payload
+                if first & 0x80:
+                    return message
+
+def visible_tiles(tiles: np.ndarray, revealed: np.ndarray) -> np.ndarray:
+    """Tiles as a player sees them: unrevealed tiles other than EMPTY show as DIRT"""
+    return np.where(revealed | (tiles == TileType.EMPTY.value), tiles, TileType.DIRT.value).astype(np.uint8)
+
+class Session:
+    """One headless game played by a client, with what the client has been sent
+
+    Actions are queued as they arrive and applied at the start of the next
+    tick. After each tick the session reports the visible tiles that changed
+    since the last report, as flat [index, tile id, ...] pairs (index being
+    y * width + x), and the player's status when it changed.
+    """
+
+    def __init__(self, session_id: int, seed: int, connection: Connection):
+        self.id = session_id
+        self.connection = connection
+        self.sim = Simulation(seed)
+        self.actions: Deque[Tuple[Action, Optional[int]]] = deque()
+        self._acked: Optional[int] = None
+        self._dirty: Optional[Tuple[int, int, int, int]] = None
+        self._status: Optional[tuple] = None
+        self.shown = visible_tiles(self.sim.mine.grid, self.sim.mine.revealed)
+        self.sim.mine.add_listener(self._on_change)
+
+    def close(self) -> None:
+        self.sim.mine.remove_listener(self._on_change)
+
+    def _on_change(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        if self._dirty is not None:
+            dx0, dy0, dx1, dy1 = self._dirty
+            x0, y0, x1, y1 = min(x0, dx0), min(y0, dy0), max(x1, dx1), max(y1, dy1)
+        self._dirty = (x0, y0, x1, y1)
+
+    def queue(self, message: dict) -> Optional[str]:
+        """Queue the action in a client message, returning an error message if it is not one"""
+        action = message.get('action')
+        try:
+            action = Action[action] if isinstance(action, str) else Action(action)
+        except (KeyError, ValueError):
+            return f"Unknown action: {action!r}"
+        if len(self.actions) >= MAX_QUEUED_ACTIONS:
+            return "Too many queued actions"
+        seq = message.get('seq')
+        self.actions.append((action, seq if isinstance(seq, int) else None))
+        return None
+
+    def status(self) -> dict:
+        """Everything about the game other than the mine tiles"""
+        player = self.sim.player
+        return {
+            'money': player.money,
+            'health': player.health,
+            'position': list(player.position),
+            'state': self.sim.state.value,
+            'has_ring': player.has_ring,
+            'minerals': player.minerals,
+            'equipment': sorted(item.value for item, owned in player.inventory.items() if owned),
+        }
+
+    def snapshot(self, kind: str = 'snapshot') -> dict:
+        """The whole visible mine and the player's status"""
+        mine = self.sim.mine
+        self.shown = visible_tiles(mine.grid, mine.revealed)
+        self._dirty = None
+        self._status = self._status_key()
+        return {
+            'type': kind, 'session': self.id, 'seed': self.sim.seed, 'tick': self.sim.ticks,
+            'width': mine.width, 'height': mine.height,
+            'tiles': base64.b64encode(self.shown.tobytes()).decode(),
+            'status': self.status(),
+        }
+
+    def _status_key(self) -> tuple:
+        player = self.sim.player
+        return (player.money, player.health, player.position, self.sim.state, player.has_ring,
+                tuple(player.minerals.values()), len(player.inventory))
+
+    def tick(self) -> Optional[dict]:
+        """Apply queued actions, advance one tick and return the update for the client, if any"""
+        sim = self.sim
+        acted = False
+        for _ in range(min(MAX_ACTIONS_PER_TICK, len(self.actions))):
+            action, seq = self.actions.popleft()
+            sim.step(action)
+            acted = True
+            if seq is not None:
+                self._acked = seq
+        sim.tick()
+
+        message = self._diff() if self._dirty is not None else None
+        if acted:
+            key = self._status_key()
+            if key != self._status:
+                self._status = key
+                message = message or self._tick_message()
+                message['status'] = self.status()
+            if self._acked is not None:
+                message = message or self._tick_message()
+                message['ack'] = self._acked
+                self._acked = None
+        return message
+
+    def _tick_message(self) -> dict:
+        return {'type': 'tick', 'tick': self.sim.ticks}
+
+    def _diff(self) -> Optional[dict]:
+        """The changed visible tiles as a tick message, or a snapshot when most of the mine changed"""
+        mine = self.sim.mine
+        x0, y0, x1, y1 = self._dirty
+        self._dirty = None
+        if (x1 - x0) * (y1 - y0) > mine.width * mine.height * SNAPSHOT_FRACTION:
+            view = visible_tiles(mine.grid, mine.revealed)
+            if np.count_nonzero(view != self.shown) > view.size * SNAPSHOT_FRACTION:
+                return self.snapshot()
+            x0, y0, x1, y1 = 0, 0, mine.width, mine.height
+        else:
+            view = visible_tiles(mine.get_region(x0, y0, x1, y1), mine.get_revealed_region(x0, y0, x1, y1))
+
+        shown = self.shown[y0:y1, x0:x1]
+        ys, xs = np.nonzero(view != shown)
+        if not len(ys):
+            return None
+        ids = view[ys, xs]
+        shown[ys, xs] = ids
+        indices = (ys + y0) * mine.width + xs + x0
+        message = self._tick_message()
+        message['tiles'] = np.column_stack((indices, ids)).ravel().tolist()
+        return message
+
+class GameServer:
+    """Hosts game sessions for clients over plain TCP or WebSocket
+
+    TCP clients exchange newline-delimited JSON; WebSocket clients, on
+    their own port, one JSON message per text frame. Each connection plays
+    its own Simulation. Clients send {"action": name or number, "seq": n};
+    the server sends a "welcome" snapshot, then per-tick updates with only
+    the tiles that changed, the player's status when it changed and the
+    last applied "seq" as "ack". Every session ticks together at
+    `tick_rate` on one event loop.
+    """
+
+    def __init__(self, tick_rate: int = TICK_RATE, max_sessions: int = 10000, seed: Optional[int] = None):
+        self.tick_rate = tick_rate
+        self.max_sessions = max_sessions
+        self.seed = seed
+        self.sessions: Dict[int, Session] = {}
+        self.tick_times: Deque[float] = deque(maxlen=10 * tick_rate)
+        self._ids = itertools.count(1)
+
+    async def serve(self, host: str, port: int, ws_port: Optional[int] = None,
+                    stats_interval: float = 0) -> None:
+        """Accept clients and run the tick loop until cancelled"""
+        servers = [await asyncio.start_server(self._handle_tcp, host, port, limit=MAX_MESSAGE)]
+        if ws_port is not None:
+            servers.append(await asyncio.start_server(self._handle_websocket, host, ws_port, limit=MAX_MESSAGE))
+        tasks = [asyncio.ensure_future(self._tick_loop())]
+        if stats_interval:
+            tasks.append(asyncio.ensure_future(self._report(stats_interval)))
+        websocket = f", WebSocket on {ws_port}" if ws_port is not None else ""
+        print(f"Serving TCP on {host}:{port}{websocket} at {self.tick_rate} ticks/s", flush=True)
+        try:
+            await asyncio.gather(*(server.serve_forever() for server in servers))
+        finally:
+            for task in tasks:
+                task.cancel()
+            for server in servers:
+                server.close()
+
+    async def _handle_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await self._run_session(Connection(reader, writer))
+
+    async def _handle_websocket(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        connection = WebSocketConnection(reader, writer)
+        try:
+            await connection.handshake()
+        except (ConnectionClosed, ValueError, ConnectionError):
+            writer.close()
+            return
+        await self._run_session(connection)
+
+    async def _run_session(self, connection: Connection) -> None:
+        """Run one client's session until it disconnects"""
+        session = None
+        try:
+            if len(self.sessions) >= self.max_sessions:
+                connection.send({'type': 'error', 'message': "Server full"})
+                return
+
+            session_id = next(self._ids)
+            seed = self.seed + session_id if self.seed is not None else random.getrandbits(63)
+            session = Session(session_id, seed, connection)
+            self.sessions[session_id] = session
+            connection.send(session.snapshot('welcome'))
+            while not connection.closed:
+                error = session.queue(await connection.receive())
+                if error:
+                    connection.send({'type': 'error', 'message': error})
+        except (ConnectionClosed, ConnectionError):
+            pass
+        finally:
+            if session is not None:
+                del self.sessions[session.id]
+                session.close()
+            connection.close()
+
+    async def _tick_loop(self) -> None:
+        """Tick every session at a fixed rate, catching up without drifting"""
+        loop = asyncio.get_running_loop()
+        interval = 1 / self.tick_rate
+        deadline = loop.time()
+        while True:
+            deadline += interval
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            started = time.perf_counter()
+            self.tick()
+            self.tick_times.append(time.perf_counter() - started)
+
+    def tick(self) -> None:
+        """Advance every session one tick and send each client its update"""
+        for session in list(self.sessions.values()):
+            message = session.tick()
+            if message is not None:
+                session.connection.send(message)
+
+    async def _report(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            times = sorted(self.tick_times)
+            if times:
+                p50, p99 = times[len(times) // 2], times[min(len(times) - 1, int(0.99 * len(times)))]
+                print(f"{len(self.sessions)} sessions, tick p50 {p50 * 1e3:.2f}ms p99 {p99 * 1e3:.2f}ms "
+                      f"({p99 * self.tick_rate:.0%} of a core at p99)", flush=True)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Host headless game sessions over TCP and WebSocket")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    parser.add_argument('--port', type=int, default=8765, help="port for TCP clients")
+    parser.add_argument('--ws-port', type=int, help="port for WebSocket clients (default: none)")
+    parser.add_argument('--tick-rate', type=int, default=TICK_RATE, help="simulation ticks per second")
+    parser.add_argument('--max-sessions', type=int, default=10000, help="sessions to accept at once")
+    parser.add_argument('--seed', type=int, help="base seed; session n plays seed + n")
+    parser.add_argument('--stats', type=float, default=0, metavar='SECONDS',
+                        help="print session count and tick times this often")
+    args = parser.parse_args(argv)
+
+    server = GameServer(args.tick_rate, args.max_sessions, args.seed)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.ws_port, args.stats))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
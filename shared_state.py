@@ -0,0 +1,221 @@
+import argparse
+import struct
+import sys
+import time
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from chunked_mine import ChunkedMine, WholeMineError
+from miner_core import Simulation
+
+# Block layout: the HEADER, a uint64 sequence number, the STATE fields, then
+# the tile grid and the revealed mask as (height, width) uint8 arrays. The
+# sequence number is odd while the game is writing, so a reader that saw the
+# same even number before and after reading got a consistent snapshot.
+MAGIC = b'MSHM'
+VERSION = 1
+HEADER = struct.Struct('<4sH2xII')
+SEQ_OFFSET = HEADER.size
+STATE = struct.Struct('<QQ16siiqii?3x4q')
+STATE_OFFSET = SEQ_OFFSET + 8
+GRID_OFFSET = (STATE_OFFSET + STATE.size + 63) // 64 * 64
+
+MINERALS = ('silver', 'gold', 'platinum', 'diamonds')
+DEFAULT_NAME = 'minerSVGA'
+
+# Blocks published from this process, whose resource tracker entry is the publisher's
+_published = set()
+
+class SharedStateError(ValueError):
+    """Raised when a shared memory block is not a live state this version can read"""
+
+@dataclass
+class LiveState:
+    """One consistent reading of a published game"""
+    version: int
+    ticks: int
+    steps: int
+    state: str
+    position: Tuple[int, int]
+    money: int
+    health: int
+    max_health: int
+    has_ring: bool
+    minerals: Dict[str, int]
+    grid: Optional[np.ndarray] = None
+    revealed: Optional[np.ndarray] = None
+
+def _block_size(width: int, height: int) -> int:
+    return GRID_OFFSET + 2 * width * height
+
+def _views(buf: memoryview, width: int, height: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """The sequence number, grid and revealed mask of a block as arrays over its memory"""
+    seq = np.ndarray((1,), dtype=np.uint64, buffer=buf, offset=SEQ_OFFSET)
+    grid = np.ndarray((height, width), dtype=np.uint8, buffer=buf, offset=GRID_OFFSET)
+    revealed = np.ndarray((height, width), dtype=np.bool_, buffer=buf, offset=GRID_OFFSET + width * height)
+    return seq, grid, revealed
+
+class StatePublisher:
+    """Mirrors a simulation into a named shared memory block for other local processes
+
+    Only the tiles reported changed by the mine's listeners are copied on
+    each `publish`, and nothing is written when nothing changed. The block
+    holds the whole mine, so chunked mines are not supported: mirroring one
+    would generate every chunk.
+    """
+
+    def __init__(self, sim: Simulation, name: str = DEFAULT_NAME):
+        mine = sim.mine
+        if isinstance(mine, ChunkedMine):
+            raise WholeMineError("Chunked (--depth) mines cannot be shared; the block holds the whole mine")
+        self.sim = sim
+        self.width, self.height = mine.width, mine.height
+        self.shm = shared_memory.SharedMemory(name, create=True, size=_block_size(self.width, self.height))
+        HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, self.width, self.height)
+        self._seq, self._grid, self._revealed = _views(self.shm.buf, self.width, self.height)
+        self._seq[0] = 0
+        self._fields: Optional[tuple] = None
+        self._dirty: Optional[List[int]] = [0, 0, self.width, self.height]
+        mine.add_listener(self._on_change)
+        _published.add(self.shm._name)
+        self.publish()
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def _on_change(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        dirty = self._dirty
+        if dirty is None:
+            self._dirty = [x0, y0, x1, y1]
+        else:
+            dirty[0], dirty[1] = min(dirty[0], x0), min(dirty[1], y0)
+            dirty[2], dirty[3] = max(dirty[2], x1), max(dirty[3], y1)
+
+    def publish(self) -> bool:
+        """Write whatever changed since the last call, returning whether anything did"""
+        sim, player = self.sim, self.sim.player
+        fields = (sim.ticks, sim.steps, sim.state.value.encode(), *player.position, player.money,
+                  player.health, player.max_health, player.has_ring,
+                  *(player.minerals[mineral] for mineral in MINERALS))
+        if fields == self._fields and self._dirty is None:
+            return False
+
+        seq = self._seq
+        seq[0] += 1
+        STATE.pack_into(self.shm.buf, STATE_OFFSET, *fields)
+        self._fields = fields
+        if self._dirty is not None:
+            x0, y0, x1, y1 = self._dirty
+            x1, y1 = min(x1, self.width), min(y1, self.height)
+            mine = sim.mine
+            self._grid[y0:y1, x0:x1] = mine.get_region(x0, y0, x1, y1)
+            self._revealed[y0:y1, x0:x1] = mine.get_revealed_region(x0, y0, x1, y1)
+            self._dirty = None
+        seq[0] += 1
+        return True
+
+    def close(self) -> None:
+        """Stop publishing and remove the block; readers already attached keep their mapping"""
+        self.sim.mine.remove_listener(self._on_change)
+        del self._seq, self._grid, self._revealed
+        self.shm.close()
+        self.shm.unlink()
+        _published.discard(self.shm._name)
+
+class StateReader:
+    """Reads a block written by `StatePublisher` without copying or calling into the game
+
+    `grid` and `revealed` are read-only arrays over the shared memory. To
+    use them directly, check them between `begin` and `changed`::
+
+        while True:
+            version = reader.begin()
+            ...read reader.grid...
+            if not reader.changed(version):
+                break
+    """
+
+    def __init__(self, name: str = DEFAULT_NAME):
+        self.shm = shared_memory.SharedMemory(name)
+        # Attaching registers the block with this process's resource tracker,
+        # which would unlink it from under the game when this process exits
+        if self.shm._name not in _published:
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+        if self.shm.size < GRID_OFFSET:
+            raise SharedStateError("Block too small for a live state header")
+        magic, version, self.width, self.height = HEADER.unpack_from(self.shm.buf)
+        if magic != MAGIC:
+            raise SharedStateError("Not a live state block")
+        if version != VERSION:
+            raise SharedStateError(f"Unsupported live state version {version}")
+        self._seq, self.grid, self.revealed = _views(self.shm.buf, self.width, self.height)
+        self.grid.flags.writeable = False
+        self.revealed.flags.writeable = False
+
+    @property
+    def version(self) -> int:
+        """Number of writes so far times two, plus one while a write is under way"""
+        return int(self._seq[0])
+
+    def begin(self) -> int:
+        """Wait out any write under way and return the version about to be read"""
+        while True:
+            version = int(self._seq[0])
+            if not version & 1:
+                return version
+            time.sleep(0)
+
+    def changed(self, version: int) -> bool:
+        """Whether the game wrote since `begin` returned `version`"""
+        return int(self._seq[0]) != version
+
+    def read(self, tiles: bool = False) -> LiveState:
+        """A consistent snapshot of the player's state, with copies of the tiles if `tiles`"""
+        while True:
+            version = self.begin()
+            (ticks, steps, state, x, y, money, health, max_health, has_ring,
+             *minerals) = STATE.unpack_from(self.shm.buf, STATE_OFFSET)
+            grid = self.grid.copy() if tiles else None
+            revealed = self.revealed.copy() if tiles else None
+            if not self.changed(version):
+                return LiveState(version, ticks, steps, state.rstrip(b'\0').decode(), (x, y), money,
+                                 health, max_health, has_ring, dict(zip(MINERALS, minerals)), grid, revealed)
+
+    def close(self) -> None:
+        """Detach from the block"""
+        del self._seq, self.grid, self.revealed
+        self.shm.close()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Follow a game started with minerSVGA.py --share")
+    parser.add_argument('name', nargs='?', default=DEFAULT_NAME, help="shared memory block name")
+    parser.add_argument('--interval', type=float, default=0.5, help="seconds between polls")
+    args = parser.parse_args(argv)
+
+    try:
+        reader = StateReader(args.name)
+    except FileNotFoundError:
+        print(f"No game is sharing its state as {args.name!r}")
+        return 1
+    last = None
+    try:
+        while True:
+            state = reader.read()
+            if state.version != last:
+                last = state.version
+                minerals = ' '.join(f"{mineral} {count}" for mineral, count in state.minerals.items())
+                print(f"tick {state.ticks}: {state.state} at {state.position} ${state.money} "
+                      f"health {state.health}/{state.max_health} {minerals}"
+                      f"{' ring' if state.has_ring else ''}, {int(reader.revealed.sum())} tiles seen")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        reader.close()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+import argparse
+import json
+import struct
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from miner_core import DAMAGE_CAUSES, EQUIPMENT, Event, Simulation, TileType
+
+# File layout, all little-endian: the HEADER, then blocks of a BLOCK header
+# followed by each column of COLUMNS in turn, `count` values apiece. Times
+# are seconds since the recorder started, at the wall-clock time in the header.
+MAGIC = b'MTEL'
+VERSION = 1
+HEADER = struct.Struct('<4sH2xqd')
+BLOCK = struct.Struct('<II')
+COLUMNS = [
+    ('time', np.dtype('<f8')),
+    ('tick', np.dtype('<u4')),
+    ('event', np.dtype('u1')),
+    ('item', np.dtype('u1')),
+    ('x', np.dtype('<i4')),
+    ('y', np.dtype('<i4')),
+    ('value', np.dtype('<i4')),
+]
+ROW_SIZE = sum(dtype.itemsize for _, dtype in COLUMNS)
+
+class TelemetryFormatError(ValueError):
+    """Raised when a file is not a telemetry log this version can read"""
+
+class TelemetryRecorder:
+    """Records a simulation's gameplay events into a ring buffer flushed to a file by a background thread
+
+    `record` only stores numbers into preallocated arrays; all file I/O
+    happens on the flush thread. If the game outruns the flushes, the
+    oldest unflushed events are overwritten and counted in `dropped`.
+    """
+
+    def __init__(self, sim: Simulation, path: str, capacity: int = 1 << 14, flush_interval: float = 1.0):
+        if capacity & (capacity - 1):
+            raise ValueError("capacity must be a power of two")
+        self.sim = sim
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._mask = capacity - 1
+        self._buffers = [np.zeros(capacity, dtype=dtype) for _, dtype in COLUMNS]
+        self._time, self._tick, self._event, self._item, self._x, self._y, self._value = self._buffers
+        self._head = 0     # Events recorded so far
+        self._flushed = 0  # Events written or dropped so far
+        self._started = time.perf_counter()
+
+        self._file = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, sim.seed, time.time()))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='telemetry', daemon=True)
+        self._thread.start()
+        sim.telemetry = self
+
+    def record(self, tick: int, event: Event, item: int, value: int, x: int, y: int) -> None:
+        """Store one event; called by the simulation"""
+        i = self._head & self._mask
+        self._time[i] = time.perf_counter() - self._started
+        self._tick[i] = tick
+        self._event[i] = event
+        self._item[i] = item
+        self._x[i] = x
+        self._y[i] = y
+        self._value[i] = value
+        self._head += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self._flush()
+
+    def _flush(self) -> None:
+        """Write the events recorded since the last flush as one block"""
+        head = self._head
+        start = max(self._flushed, head - self.capacity)
+        if start == head:
+            return
+        slots = np.arange(start, head) & self._mask
+        columns = [buffer[slots] for buffer in self._buffers]
+
+        # Slots the game reused while they were being copied hold newer events
+        lapped = self._head - self.capacity + 1 - start
+        if lapped > 0:
+            columns = [column[lapped:] for column in columns]
+            start += lapped
+        dropped = start - self._flushed
+        self.dropped += dropped
+        self._flushed = head
+        if start == head:
+            return
+
+        self._file.write(BLOCK.pack(head - start, dropped))
+        for column in columns:
+            self._file.write(column.tobytes())
+        self._file.flush()
+
+    def close(self) -> None:
+        """Stop recording, write what is left and close the file"""
+        if self.sim.telemetry is self:
+            self.sim.telemetry = None
+        self._stop.set()
+        self._thread.join()
+        self._flush()
+        self._file.close()
+
+@dataclass
+class TelemetryLog:
+    """The events of one recorded session, as a column array each"""
+    path: str
+    seed: int
+    started: float
+    dropped: int
+    columns: Dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.columns['event'])
+
+def load_log(path: str) -> TelemetryLog:
+    """Read a file written by `TelemetryRecorder`, up to its last complete block"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise TelemetryFormatError("File too short for a telemetry header")
+    magic, version, seed, started = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise TelemetryFormatError("Not a telemetry log")
+    if version != VERSION:
+        raise TelemetryFormatError(f"Unsupported telemetry version {version}")
+
+    blocks: Dict[str, List[np.ndarray]] = {name: [] for name, _ in COLUMNS}
+    dropped = 0
+    offset = HEADER.size
+    while offset + BLOCK.size <= len(data):
+        count, block_dropped = BLOCK.unpack_from(data, offset)
+        if offset + BLOCK.size + count * ROW_SIZE > len(data):
+            break  # Cut short while the game was writing it
+        offset += BLOCK.size
+        dropped += block_dropped
+        for name, dtype in COLUMNS:
+            blocks[name].append(np.frombuffer(data, dtype=dtype, count=count, offset=offset))
+            offset += count * dtype.itemsize
+    columns = {name: np.concatenate(blocks[name]) if blocks[name] else np.zeros(0, dtype=dtype)
+               for name, dtype in COLUMNS}
+    return TelemetryLog(path, seed, started, dropped, columns)
+
+def summarize(log: TelemetryLog) -> Dict[str, object]:
+    """Totals for one session: what was dug, earned, spent and suffered"""
+    columns = log.columns
+    event, item, value = columns['event'], columns['item'], columns['value']
+
+    def total(kind: Event) -> int:
+        return int(value[event == kind].sum())
+
+    def count(kind: Event) -> int:
+        return int((event == kind).sum())
+
+    digs = event == Event.DIG
+    rewards = event == Event.REWARD
+    purchases = event == Event.PURCHASE
+    deaths = item[event == Event.DEATH]
+    return {
+        'path': log.path,
+        'seed': log.seed,
+        'started': log.started,
+        'duration': float(columns['time'][-1]) if len(log) else 0.0,
+        'ticks': int(columns['tick'][-1]) if len(log) else 0,
+        'events': len(log),
+        'dropped': log.dropped,
+        'digs': int(digs.sum()),
+        'dig_cost': total(Event.DIG),
+        'tiles_dug': {TileType(tile).name.lower(): int(n)
+                      for tile, n in zip(*np.unique(item[digs], return_counts=True))},
+        'minerals': {TileType(tile).name.lower(): int(value[rewards & (item == tile)].sum())
+                     for tile in np.unique(item[rewards])},
+        'cave_ins': count(Event.CAVE_IN),
+        'cave_in_damage': total(Event.CAVE_IN),
+        'floods': count(Event.FLOOD),
+        'purchases': dict(Counter(EQUIPMENT[index].value for index in item[purchases].tolist())),
+        'equipment_cost': total(Event.PURCHASE),
+        'sales': count(Event.SALE),
+        'payout': total(Event.SALE),
+        'heals': count(Event.HEAL),
+        'heal_cost': total(Event.HEAL),
+        'deaths': dict(Counter(DAMAGE_CAUSES[index] or 'bankrupt' for index in deaths.tolist())),
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Summarize telemetry recorded with minerSVGA.py --telemetry")
+    parser.add_argument('logs', nargs='+', help="telemetry files, one per session")
+    parser.add_argument('--json', action='store_true', help="print one JSON summary per line")
+    args = parser.parse_args(argv)
+
+    for path in args.logs:
+        summary = summarize(load_log(path))
+        if args.json:
+            print(json.dumps(summary))
+            continue
+        minerals, purchases, deaths = (', '.join(f"{n} {name}" for name, n in summary[key].items()) or 'none'
+                                       for key in ('minerals', 'purchases', 'deaths'))
+        print(f"{path}: seed {summary['seed']}, {summary['duration']:.1f}s over {summary['ticks']} ticks, "
+              f"{summary['events']} events ({summary['dropped']} dropped)")
+        print(f"  {summary['digs']} digs for ${summary['dig_cost']}, minerals: {minerals}")
+        print(f"  {summary['cave_ins']} cave-ins ({summary['cave_in_damage']} damage), {summary['floods']} floods, "
+              f"{summary['heals']} heals for ${summary['heal_cost']}")
+        print(f"  bought {purchases} for ${summary['equipment_cost']}, "
+              f"{summary['sales']} sales for ${summary['payout']}, deaths: {deaths}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
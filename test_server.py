@@ -0,0 +1,34 @@
+import asyncio
+import json
+
+from server import MAX_MESSAGE, GameServer
+
+async def _deeply_nested_payload_closes_connection():
+    loop = asyncio.get_running_loop()
+    errors = []
+    loop.set_exception_handler(lambda loop, context: errors.append(context))
+
+    game = GameServer(seed=1)
+    listener = await asyncio.start_server(game._handle_tcp, '127.0.0.1', 0, limit=MAX_MESSAGE)
+    port = listener.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        welcome = json.loads(await reader.readline())
+        assert welcome['type'] == 'welcome'
+        assert len(game.sessions) == 1
+
+        writer.write(b'[' * 3000 + b'\n')
+        await writer.drain()
+        # The server hangs up without sending anything more
+        assert await asyncio.wait_for(reader.read(), 5) == b''
+        writer.close()
+        await asyncio.sleep(0.05)
+    finally:
+        listener.close()
+        await listener.wait_closed()
+    return game, errors
+
+def test_deeply_nested_json_closes_connection():
+    game, errors = asyncio.run(_deeply_nested_payload_closes_connection())
+    assert not game.sessions
+    assert not errors
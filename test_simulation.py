@@ -0,0 +1,194 @@
+import heapq
+import random
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from chunked_mine import ChunkedMine
+from dig_planner import SPRING_COST, STEP_COST, DigPlanner
+from miner_core import Action, Equipment, GameState, Simulation, TileType
+from montecarlo import BotPolicy
+from replay import InputRecorder, load_recording, replay, save_recording, state_digest
+from savegame import load_game, restore_simulation, save_game
+
+MOVES = [Action.MOVE_LEFT, Action.MOVE_RIGHT, Action.MOVE_UP, Action.MOVE_DOWN]
+
+def play(sim: Simulation, policy, steps: int, recorder: InputRecorder = None, ticks_per_step: int = 3) -> None:
+    """Apply `steps` actions from `policy` with ticks between them, recording them if asked"""
+    for _ in range(steps):
+        action = policy(sim)
+        sim.step(action)
+        if recorder is not None:
+            recorder.record(sim.ticks, action)
+        sim.run_ticks(ticks_per_step)
+
+def wander(seed: int):
+    """A policy that enters the mine and moves at random, for mines a BotPolicy cannot index"""
+    rng = random.Random(seed)
+    def policy(sim: Simulation) -> Action:
+        if sim.state == GameState.TOWN:
+            return Action.ENTER_MINE
+        return rng.choice(MOVES + [Action.MOVE_DOWN] * 2)
+    return policy
+
+def water_volume(sim: Simulation) -> int:
+    mine = sim.mine
+    return sum(sim.water.level(x, y) for y in range(mine.height) for x in range(mine.width))
+
+def dijkstra_cost(sim: Simulation, target) -> float:
+    """Cheapest route cost to `target` by plain Dijkstra, pricing tiles as DigPlanner documents"""
+    player, mine = sim.player, sim.mine
+
+    def enter_cost(x: int, y: int) -> float:
+        tile_type = mine.get_tile(x, y)
+        if tile_type == TileType.EMPTY:
+            cost = 0
+        elif tile_type == TileType.GRANITE:
+            cost = 150 if player.has_equipment(Equipment.DRILL) else None
+        elif tile_type == TileType.WATER:
+            cost = 150 if player.has_equipment(Equipment.BUCKET) else None
+        elif tile_type == TileType.SPRING:
+            cost = SPRING_COST
+        else:
+            cost = sim._calculate_dig_cost(tile_type)
+        return None if cost is None else cost + STEP_COST
+
+    best = {player.position: 0}
+    queue = [(0, player.position)]
+    while queue:
+        cost, (x, y) = heapq.heappop(queue)
+        if (x, y) == target:
+            return cost
+        if cost > best[(x, y)]:
+            continue
+        for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            nx, ny = x + dx, y + dy
+            if not mine.in_bounds(nx, ny):
+                continue
+            step = enter_cost(nx, ny)
+            if step is not None and cost + step < best.get((nx, ny), float('inf')):
+                best[(nx, ny)] = cost + step
+                heapq.heappush(queue, (cost + step, (nx, ny)))
+    return float('inf')
+
+def test_replay_reproduces_digest(tmp_path):
+    sim = Simulation(11)
+    recorder = InputRecorder(11)
+    play(sim, BotPolicy(11), 600, recorder)
+    path = tmp_path / 'game.rec'
+    save_recording(str(path), recorder.recording(sim))
+
+    recording = load_recording(str(path))
+    assert recording.digest == state_digest(sim)
+    assert state_digest(replay(recording)) == recording.digest
+
+def test_replay_reproduces_chunked_digest(tmp_path):
+    sim = Simulation(5, ChunkedMine(40, 1000))
+    recorder = InputRecorder(5)
+    play(sim, wander(5), 400, recorder)
+    path = tmp_path / 'deep.rec'
+    save_recording(str(path), recorder.recording(sim))
+
+    recording = load_recording(str(path))
+    assert recording.chunked
+    assert state_digest(replay(recording)) == recording.digest
+
+def test_save_load_round_trip(tmp_path):
+    sim = Simulation(23)
+    play(sim, BotPolicy(23), 400)
+    path = tmp_path / 'game.sav'
+    save_game(str(path), sim)
+
+    loaded = Simulation(99)
+    restore_simulation(loaded, load_game(str(path)))
+    assert state_digest(loaded) == state_digest(sim)
+    assert (loaded.facing, loaded.ticks) == (sim.facing, sim.ticks)
+    assert np.array_equal(loaded.mine.revealed, sim.mine.revealed)
+
+    # The random streams carry on from where the save left them
+    play(sim, wander(1), 200)
+    play(loaded, wander(1), 200)
+    assert state_digest(loaded) == state_digest(sim)
+
+@pytest.mark.parametrize('seed', [2, 8, 31])
+def test_planner_cost_matches_dijkstra(seed):
+    sim = Simulation(seed)
+    sim.player.money = 100000
+    sim.step(Action.ENTER_MINE)
+    if seed % 2:
+        sim.player.add_equipment(Equipment.DRILL)
+        sim.player.add_equipment(Equipment.BUCKET)
+    planner = DigPlanner(sim)
+    rng = random.Random(seed)
+    mine = sim.mine
+
+    for _ in range(6):
+        target = (rng.randrange(mine.width), rng.randrange(mine.height))
+        planner.set_target(target)
+        assert planner.cost() == dijkstra_cost(sim, target)
+
+        # Walk part of the way, then change the mine, so the search is repaired rather than rebuilt
+        for _ in range(5):
+            if planner.target is None or not planner.step():
+                break
+        x, y = rng.randrange(mine.width), rng.randrange(mine.height)
+        mine.cave_in(x, y, rng)
+        if planner.target is not None:
+            assert planner.cost() == dijkstra_cost(sim, target)
+
+def test_water_settles_and_is_conserved():
+    sim = Simulation(3)
+    mine = sim.mine
+    # No springs or pumps, so no water enters or leaves
+    mine.fill_region(0, 0, mine.width, mine.height, TileType.DIRT, where=TileType.SPRING)
+    mine.fill_region(0, 0, mine.width, mine.height, TileType.DIRT, where=TileType.PUMP)
+    rng = random.Random(3)
+    for _ in range(60):
+        x, y = rng.randrange(mine.width), rng.randrange(mine.height)
+        if rng.random() < 0.5:
+            mine.fill_region(x, y, x + rng.randint(3, 15), y + 1, TileType.EMPTY)
+        else:
+            mine.fill_region(x, y, x + 1, y + rng.randint(3, 15), TileType.EMPTY)
+    mine.fill_region(0, 0, mine.width, mine.height // 3, TileType.WATER, where=TileType.EMPTY)
+
+    volume = water_volume(sim)
+    assert volume > 0
+    for _ in range(5000):
+        sim.tick()
+        if sim.water.settled:
+            break
+    assert sim.water.settled
+    assert water_volume(sim) == volume
+
+def test_water_settles_in_a_shaft():
+    sim = Simulation(7)
+    mine = sim.mine
+    mine.fill_region(0, 0, mine.width, mine.height, TileType.DIRT)
+    mine.fill_region(10, 20, 11, 60, TileType.EMPTY)
+    mine.fill_region(10, 20, 11, 30, TileType.WATER)
+    volume = water_volume(sim)
+
+    sim.run_ticks(5000)
+    assert sim.water.settled
+    assert water_volume(sim) == volume
+    # Ten full tiles of water end up as the bottom ten tiles of the shaft
+    assert [mine.get_tile(10, y) for y in range(50, 60)] == [TileType.WATER] * 10
+    assert mine.get_tile(10, 49) == TileType.EMPTY
+
+def test_deep_chunked_water_uses_bounded_memory():
+    tracemalloc.start()
+    try:
+        sim = Simulation(4, ChunkedMine(height=10_000_000))
+        mine = sim.mine
+        # A flooded shaft deep down, where only a few chunks and level pages are needed
+        mine.fill_region(10, 5_000_000, 11, 5_000_040, TileType.EMPTY)
+        mine.fill_region(10, 5_000_000, 11, 5_000_010, TileType.WATER)
+        volume = sum(sim.water.level(10, y) for y in range(5_000_000, 5_000_040))
+        sim.run_ticks(5000)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert sim.water.settled
+    assert sum(sim.water.level(10, y) for y in range(5_000_000, 5_000_040)) == volume
+    assert peak < 8_000_000
@@ -0,0 +1,108 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from miner_core import TILE_TYPES, MineGenerator, TileType
+
+class TileIndex:
+    """Where every tile type is in a mine, kept current as the mine changes
+
+    Stores, per tile type, a (height, width) boolean mask of where it
+    occurs, and a (height, types) table of per-row counts. It listens to the
+    mine, so generation, `set_tile`, `fill_region` (cave-ins, floods) and
+    `restore` are folded in as they happen by diffing only the changed
+    region. Queries use the row counts to skip rows without the type, then
+    read only the mask rows that hold it.
+
+    Needs a mine with a whole-mine `grid`, not a ChunkedMine.
+    """
+
+    def __init__(self, mine: MineGenerator):
+        self.mine = mine
+        self._grid = np.empty((0, 0), dtype=np.uint8)
+        self._masks = np.zeros((len(TILE_TYPES), 0, 0), dtype=bool)
+        self._row_counts = np.zeros((0, len(TILE_TYPES)), dtype=np.int32)
+        self._rebuild()
+        mine.add_listener(self._on_change)
+
+    def close(self) -> None:
+        """Stop following the mine"""
+        self.mine.remove_listener(self._on_change)
+
+    def _rebuild(self) -> None:
+        """Index the whole grid from scratch"""
+        grid = self.mine.grid
+        self._grid = grid.copy()
+        self._masks = grid[None] == np.arange(len(TILE_TYPES), dtype=np.uint8)[:, None, None]
+        self._row_counts = np.ascontiguousarray(self._masks.sum(axis=2, dtype=np.int32).T)
+
+    def _on_change(self, x0: int, y0: int, x1: int, y1: int) -> None:
+        """Fold a changed region of the mine into the index"""
+        grid = self.mine.grid
+        if grid.shape != self._grid.shape or (x1 - x0) * (y1 - y0) == grid.size:
+            self._rebuild()
+            return
+
+        old = self._grid[y0:y1, x0:x1]
+        new = grid[y0:y1, x0:x1]
+        changed_y, changed_x = np.nonzero(old != new)
+        if not len(changed_y):
+            return
+
+        ys, xs = changed_y + y0, changed_x + x0
+        old_ids, new_ids = old[changed_y, changed_x], new[changed_y, changed_x]
+        self._masks[old_ids, ys, xs] = False
+        self._masks[new_ids, ys, xs] = True
+        np.subtract.at(self._row_counts, (ys, old_ids), 1)
+        np.add.at(self._row_counts, (ys, new_ids), 1)
+        old[...] = new
+
+    def count(self, tile_type: TileType, y0: int = 0, y1: Optional[int] = None) -> int:
+        """Number of tiles of a type in rows [y0, y1)"""
+        return int(self._row_counts[max(0, y0):y1, tile_type.value].sum())
+
+    def row_counts(self, tile_type: TileType) -> np.ndarray:
+        """Per-row counts of a type, as a read-only (height,) view"""
+        view = self._row_counts[:, tile_type.value]
+        view.flags.writeable = False
+        return view
+
+    def positions(self, tile_type: TileType, x0: int = 0, y0: int = 0,
+                  x1: Optional[int] = None, y1: Optional[int] = None) -> List[Tuple[int, int]]:
+        """(x, y) of every tile of a type in [x0, x1) x [y0, y1), row by row"""
+        x1 = self.mine.width if x1 is None else x1
+        y1 = self.mine.height if y1 is None else y1
+        x0, y0 = max(0, x0), max(0, y0)
+        occupied = np.flatnonzero(self._row_counts[y0:y1, tile_type.value]) + y0
+        ys, xs = np.nonzero(self._masks[tile_type.value, occupied, x0:x1])
+        return list(zip((xs + x0).tolist(), occupied[ys].tolist()))
+
+    def nearest(self, tile_type: TileType, x: int, y: int,
+                max_distance: Optional[int] = None) -> Optional[Tuple[int, int]]:
+        """Closest tile of a type to (x, y) by Manhattan distance, or None
+
+        Rows are visited outward from `y`, skipping rows without the type,
+        and the search stops once no remaining row can be closer.
+        """
+        occupied = np.flatnonzero(self._row_counts[:, tile_type.value])
+        if not len(occupied):
+            return None
+        masks = self._masks[tile_type.value]
+        by_distance = occupied[np.argsort(np.abs(occupied - y), kind='stable')].tolist()
+
+        best: Optional[Tuple[int, int]] = None
+        best_distance = max_distance + 1 if max_distance is not None else None
+        for row in by_distance:
+            dy = abs(row - y)
+            if best_distance is not None and dy >= best_distance:
+                break
+            columns = np.flatnonzero(masks[row])
+            column = int(columns[np.abs(columns - x).argmin()])
+            distance = dy + abs(column - x)
+            if best_distance is None or distance < best_distance:
+                best, best_distance = (column, row), distance
+        return best
+
+    def ring_revealed(self) -> bool:
+        """Whether any ring tile still in the mine has been revealed"""
+        return any(self.mine.is_revealed(x, y) for x, y in self.positions(TileType.RING))